@@ -0,0 +1,114 @@
+"""
+Benchmark embedded-JSON extraction on profile HTML pages.
+
+Compares the original regex + recursive search with services.html_extract.
+
+    python3 scraper/benchmarks/bench_html_extract.py                       # synthetic page
+    python3 scraper/benchmarks/bench_html_extract.py --html page.html --username someone
+"""
+import argparse
+import json
+import re
+import time
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.html_extract import extract_user_from_scripts
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def legacy_find_user(data, username):
+    """The recursive search instagram_html used before html_extract"""
+    if isinstance(data, dict):
+        if data.get('username') == username and ('edge_followed_by' in data or 'follower_count' in data):
+            return data
+        for value in data.values():
+            result = legacy_find_user(value, username)
+            if result:
+                return result
+    elif isinstance(data, list):
+        for item in data:
+            result = legacy_find_user(item, username)
+            if result:
+                return result
+    return None
+
+
+def legacy_extract(html, username):
+    """The regex-based extraction instagram_html used before html_extract"""
+    pattern = r'<script type="application/json"[^>]*>({.+?})</script>'
+    for match in re.findall(pattern, html, re.DOTALL):
+        try:
+            data = json.loads(match)
+        except json.JSONDecodeError:
+            continue
+        user_data = legacy_find_user(data, username)
+        if user_data:
+            return user_data
+    return None
+
+
+def synthetic_page(username, data_file):
+    """Build a multi-megabyte profile page from a saved {username}_data.json dump"""
+    with open(data_file, encoding='utf-8') as f:
+        posts = json.load(f)["posts"]
+
+    scripts = []
+    # Unrelated bundles that a real page ships before the profile blob
+    for i in range(20):
+        filler = {"require": [["ScheduledServerJS", "handle", None, [{"__bbox": {"posts": posts, "chunk": i}}]]]}
+        scripts.append(json.dumps(filler))
+
+    user = {
+        "username": username,
+        "full_name": "Benchmark User",
+        "edge_followed_by": {"count": 123456},
+        "edge_follow": {"count": 42},
+        "edge_owner_to_timeline_media": {"count": len(posts), "edges": [{"node": p} for p in posts]},
+    }
+    profile = {"require": [["PolarisProfilePageContentQuery", {"__bbox": {"result": {"data": {"user": user}}}}]]}
+    scripts.append(json.dumps(profile))
+
+    body = "".join(f'<script type="application/json" data-sjs>{s}</script>\n' for s in scripts)
+    return f"<!DOCTYPE html><html><head></head><body>{body}</body></html>"
+
+
+def bench(func, html, username, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func(html, username)
+        timings.append(time.perf_counter() - started)
+    assert result and result["username"] == username, f"{func.__name__} did not find @{username}"
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--html", nargs="*", help="Saved profile HTML pages")
+    parser.add_argument("--username", default="lilbieber", help="Username the pages belong to")
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "lilbieber_data.json"),
+                        help="Data dump used to build a synthetic page when --html is not given")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    pages = []
+    if args.html:
+        for path in args.html:
+            with open(path, encoding='utf-8') as f:
+                pages.append((path, f.read()))
+    else:
+        pages.append(("synthetic", synthetic_page(args.username, args.data)))
+
+    for name, html in pages:
+        legacy = bench(legacy_extract, html, args.username, args.rounds)
+        fast = bench(extract_user_from_scripts, html, args.username, args.rounds)
+        print(f"{name}: {len(html) / 1e6:.1f} MB")
+        print(f"  legacy regex+recursive: {legacy * 1000:8.1f} ms/page")
+        print(f"  html_extract:           {fast * 1000:8.1f} ms/page  ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Micro-benchmark for decoding GraphQL timeline pages.
+
+Compares the JsonDecoder backends (full decode) and msgspec projection in
+pages/sec, CPU time per page and bytes allocated per page (tracemalloc peak),
+then checks each result maps to the same InstagramPosts.
+
+    python3 scraper/benchmarks/bench_json_decode.py --pages 2000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.json_codec import JsonDecoder, available_backends, msgspec
+from services.post_mapper import map_nodes
+from benchmarks.bench_post_mapping import to_feed_node
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+PAGE_SIZE = 12
+
+
+def with_unused_fields(node, i):
+    """
+    Pad a feed node with the kind of sub-trees real v1 nodes carry but the
+    mappers never read (owner, sharing info, clips metadata, more candidates)
+    """
+    node = dict(node)
+    user = {
+        "pk": str(1000 + i), "username": "benchmark", "full_name": "Benchmark", "is_private": False,
+        "profile_pic_url": "https://scontent.example/v/t51.2885-19/" + "x" * 120, "is_verified": False,
+        "friendship_status": {"following": False, "is_bestie": False, "is_restricted": False},
+    }
+    node.update({
+        "pk": str(3_000_000_000 + i),
+        "user": user,
+        "owner": user,
+        "has_liked": False,
+        "can_viewer_reshare": True,
+        "organic_tracking_token": "eyJ2ZXJzaW9uIjo1" + "A" * 300,
+        "sharing_friction_info": {"should_have_sharing_friction": False, "bloks_app_url": None},
+        "clips_metadata": {
+            "audio_type": "original_sound", "music_info": None,
+            "original_sound_info": {"audio_asset_id": str(i), "progressive_download_url": "https://x.example/" + "a" * 150},
+        },
+        "top_likers": ["friend_a", "friend_b"],
+        "preview_comments": [{"pk": str(j), "text": "nice " * 8, "user": user} for j in range(2)],
+    })
+
+    def pad(item):
+        if "image_versions2" in item:
+            candidates = item["image_versions2"]["candidates"]
+            item["image_versions2"] = {"candidates": [
+                {**c, "height": c["width"], "url": c["url"] + "?stp=dst-jpg_e35&_nc_ht=scontent&oh=" + "0" * 64}
+                for c in candidates * 2
+            ]}
+        return item
+
+    if "carousel_media" in node:
+        node["carousel_media"] = [pad(dict(item)) for item in node["carousel_media"]]
+    return pad(node)
+
+
+def measure(decode, bodies):
+    """(pages/sec, CPU seconds per page, peak bytes allocated per page)"""
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for body in bodies:
+        decode(body)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    tracemalloc.start()
+    peaks = []
+    for body in bodies[:50]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        data = decode(body)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        del data
+    tracemalloc.stop()
+
+    return len(bodies) / elapsed, cpu / len(bodies), sum(peaks) / len(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "lilbieber_data.json"))
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.data, encoding='utf-8') as f:
+        saved = json.load(f)["posts"]
+
+    bodies = []
+    for page in range(args.pages):
+        nodes = [
+            with_unused_fields(to_feed_node(saved[(page * PAGE_SIZE + i) % len(saved)]), page * PAGE_SIZE + i)
+            for i in range(PAGE_SIZE)
+        ]
+        body = {
+            "data": {"xdt_api__v1__feed__user_timeline_graphql_connection": {
+                "edges": [{"node": node, "cursor": str(i)} for i, node in enumerate(nodes)],
+                "page_info": {"has_next_page": True, "end_cursor": f"cursor_{page}"},
+            }},
+            "extensions": {"is_final": True},
+        }
+        bodies.append(json.dumps(body).encode())
+    print(f"{args.pages} pages of {PAGE_SIZE} posts, {sum(map(len, bodies)) / len(bodies) / 1024:.1f} KiB per page\n")
+
+    decoders = [(name, JsonDecoder(name)) for name in reversed(available_backends())]
+    if msgspec is not None:
+        decoders.append(("projected", JsonDecoder("msgspec", projection=True)))
+    else:
+        print("(install msgspec to compare projection)\n")
+
+    def posts(data):
+        timeline = data["data"]["xdt_api__v1__feed__user_timeline_graphql_connection"]
+        return [post.model_dump() for post in map_nodes([e["node"] for e in timeline["edges"]], "benchmark", set())[0]]
+
+    expected = posts(json.loads(bodies[0]))
+    baseline = None
+    for name, decoder in decoders:
+        assert posts(decoder.decode(bodies[0], "graphql")) == expected, f"{name} changed the mapped posts"
+        rate, cpu, allocated = measure(lambda body: decoder.decode(body, "graphql"), bodies)
+        baseline = baseline or (cpu, allocated)
+        print(
+            f"{name:10s} {rate:9,.0f} pages/sec  {cpu * 1e6:7.0f} us CPU/page ({baseline[0] / cpu:.1f}x)  "
+            f"{allocated / 1024:7.1f} KiB allocated/page ({allocated / baseline[1]:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark for turning GraphQL timeline nodes into InstagramPost models.
+
+Compares the post_mapper validation modes (strict / batch; trusted is an alias of batch) in posts/sec.
+
+    python3 scraper/benchmarks/bench_post_mapping.py
+"""
+import argparse
+import json
+import time
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.post_mapper import VALIDATION_MODES, map_nodes, node_fields
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def to_feed_node(post):
+    """Rebuild a v1 feed node (the shape GraphQL pages return) from a saved InstagramPost dump"""
+    node = {
+        "code": post["post_id"],
+        "id": post["instagram_id"],
+        "taken_at": post["timestamp"],
+        "like_count": post["like_count"],
+        "comment_count": post["comment_count"],
+        "view_count": post["view_count"],
+        "media_type": {"IMAGE": 1, "VIDEO": 2, "CAROUSEL": 8}.get(post["media_type"], 2),
+        "product_type": "clips" if post["media_type"] == "REEL" else "feed",
+        "caption": {"text": post["caption"]} if post["caption"] else None,
+        "location": post["location"],
+    }
+
+    def media(display_url, video_url):
+        # Real nodes carry several image candidates; only the first is used
+        item = {"image_versions2": {"candidates": [{"url": display_url, "width": w} for w in (1080, 750, 640, 480, 320)]}}
+        if video_url:
+            item["video_versions"] = [{"url": video_url, "type": t} for t in (101, 102, 103)]
+        return item
+
+    urls = list(zip(post["display_urls"], post["video_urls"] + [None] * len(post["display_urls"])))
+    if post["media_type"] == "CAROUSEL":
+        node["carousel_media"] = [media(d, v) for d, v in urls]
+    elif urls:
+        node.update(media(*urls[0]))
+    return node
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "lilbieber_data.json"))
+    parser.add_argument("--posts", type=int, default=20000, help="Total posts to convert per mode")
+    parser.add_argument("--page-size", type=int, default=12)
+    args = parser.parse_args()
+
+    with open(args.data, encoding='utf-8') as f:
+        saved = json.load(f)["posts"]
+
+    nodes = [to_feed_node(saved[i % len(saved)]) for i in range(args.posts)]
+    # Unique ids so dedupe doesn't skip repeats of the sample data
+    for i, node in enumerate(nodes):
+        node["code"] = f"{node['code']}_{i}"
+    pages = [nodes[i:i + args.page_size] for i in range(0, len(nodes), args.page_size)]
+
+    started = time.perf_counter()
+    for node in nodes:
+        node_fields(node, "benchmark")
+    print(f"{'mapping':8s} {args.posts / (time.perf_counter() - started):10,.0f} posts/sec  (node_fields only, no models)")
+
+    baseline = None
+    for mode in VALIDATION_MODES:
+        seen_ids = set()
+        started = time.perf_counter()
+        for page in pages:
+            map_nodes(page, "benchmark", seen_ids, mode)
+        elapsed = time.perf_counter() - started
+
+        rate = args.posts / elapsed
+        baseline = baseline or rate
+        print(f"{mode:8s} {rate:10,.0f} posts/sec  ({rate / baseline:.2f}x strict)")
+
+
+if __name__ == "__main__":
+    main()
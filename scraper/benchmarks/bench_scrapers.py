@@ -0,0 +1,156 @@
+"""
+End-to-end throughput benchmark for both scrapers against the local mock server.
+
+Each scraper runs in its own forked process (so peak RSS is its own) and
+scrapes the mock accounts from a thread pool. Reported per scraper:
+requests/sec, posts/sec, p50/p99 request latency, peak RSS and the status
+codes seen. The HTML scraper only fetches profiles, so it reports no posts.
+
+    python3 scraper/benchmarks/bench_scrapers.py
+    python3 scraper/benchmarks/bench_scrapers.py --latency 0.05 --jitter 0.05 --rate-429 0.02 --rate-5xx 0.01
+    python3 scraper/benchmarks/bench_scrapers.py --scraper html --html-filler 40 --concurrency 32 --parse-workers 4
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.mock_instagram import MockInstagram, base_url, REPO_ROOT
+from services.rate_limiter import AdaptiveRateLimiter
+from services import instagram_api, instagram_html
+from services.html_parse_pool import HtmlParsePool
+
+SCRAPERS = ("api", "html")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_scraper(name, url, usernames, args, results):
+    """Child process: scrape every username and report the measurements"""
+    limiter = AdaptiveRateLimiter(initial_rate=args.rate, max_rate=args.rate, burst=args.concurrency)
+    latencies = []
+    statuses = {}
+
+    def on_response(resp, *_, **__):
+        latencies.append(resp.elapsed.total_seconds())
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    parse_pool = None
+    if name == "api":
+        scraper = instagram_api.InstagramScraper(
+            base_url=url, rate_limiter=limiter, pool_maxsize=args.concurrency, validation=args.validation
+        )
+        scraper.session_pool.get(None).hooks["response"].append(on_response)
+
+        def scrape(username):
+            profile, posts = scraper.get_profile_with_posts(username, max_posts=args.max_posts)
+            return profile is not None, len(posts)
+    else:
+        parse_pool = HtmlParsePool(args.parse_workers) if args.parse_workers else None
+        scraper = instagram_html.InstagramScraper(base_url=url, rate_limiter=limiter, parse_pool=parse_pool)
+        scraper.session.hooks["response"].append(on_response)
+
+        def scrape(username):
+            return scraper.get_profile(username) is not None, 0
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    # The scrapers print progress per page/attempt; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(scrape, usernames))
+    elapsed = time.perf_counter() - started
+    if parse_pool:
+        parse_pool.close()
+
+    results.put({
+        "scraper": name,
+        "elapsed": elapsed,
+        "accounts_ok": sum(ok for ok, _ in outcomes),
+        "posts": sum(count for _, count in outcomes),
+        "requests": len(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "rss_start": rss_before,
+        "rss_peak": peak_rss_mb(),
+        "statuses": dict(sorted(statuses.items())),
+    })
+
+
+def report(result, accounts):
+    elapsed = result["elapsed"]
+    posts = f"{result['posts'] / elapsed:10,.1f}" if result["scraper"] == "api" else f"{'-':>10s}"
+    print(f"{result['scraper']:5s} "
+          f"{result['accounts_ok']:>4d}/{accounts:<4d} "
+          f"{result['requests'] / elapsed:10,.1f} "
+          f"{posts} "
+          f"{result['p50'] * 1000:9.1f} "
+          f"{result['p99'] * 1000:9.1f} "
+          f"{result['rss_peak']:9.1f}  "
+          f"{result['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scraper", choices=SCRAPERS + ("both",), default="both")
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "lilbieber_data.json"))
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=60, help="Posts per fixture account")
+    parser.add_argument("--max-posts", type=int, default=None, help="Posts to fetch per account (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads per scraper")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Rate limiter requests/sec")
+    parser.add_argument("--validation", default="strict", help="InstagramScraper validation mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay (seconds)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 500/502/503")
+    parser.add_argument("--html-filler", type=int, default=5, help="Unrelated JSON scripts per profile page")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse HTML in this many processes (0 = inline)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mock = MockInstagram(
+        args.data, args.accounts, args.posts, args.latency, args.jitter, args.rate_429, args.rate_5xx,
+        html_filler_scripts=args.html_filler, seed=args.seed,
+    )
+    server = mock.serve()
+    url = base_url(server)
+    usernames = mock.usernames()
+
+    print(f"mock server {url}: {args.accounts} accounts x {args.posts} posts, "
+          f"latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms, "
+          f"429 {args.rate_429:.1%}, 5xx {args.rate_5xx:.1%}, concurrency {args.concurrency}")
+    print(f"{'':5s} {'accounts':>9s} {'req/s':>10s} {'posts/s':>10s} {'p50 ms':>9s} {'p99 ms':>9s} {'RSS MB':>9s}  statuses")
+
+    # fork keeps the child cheap; the server thread stays in the parent only
+    context = multiprocessing.get_context("fork")
+    names = SCRAPERS if args.scraper == "both" else (args.scraper,)
+    for name in names:
+        results = context.Queue()
+        child = context.Process(target=run_scraper, args=(name, url, usernames, args, results))
+        child.start()
+        result = results.get()
+        child.join()
+        report(result, len(usernames))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Local stand-in for the instagram.com endpoints the scrapers use, for offline benchmarks.
+
+Serves fixtures generated from a saved {username}_data.json dump:
+    /api/v1/users/web_profile_info/?username=   profile + first timeline page
+    /graphql/query?doc_id=&variables=            timeline pages, cursor = offset
+    /{username}/                                 profile HTML with embedded JSON
+
+Every request can be delayed and answered with an injected 429 or 5xx.
+
+    python3 scraper/benchmarks/mock_instagram.py --port 8765 --latency 0.05 --rate-429 0.02
+    # then InstagramScraper(base_url="http://127.0.0.1:8765")
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, List
+from urllib.parse import urlsplit, parse_qs
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.bench_post_mapping import to_feed_node
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+PAGE_SIZE = 12
+
+
+def to_web_node(post):
+    """GraphQL-shaped node as embedded in web_profile_info (shortcode, edge_* counts)"""
+    node = {
+        "__typename": {"CAROUSEL": "GraphSidecar", "IMAGE": "GraphImage"}.get(post["media_type"], "GraphVideo"),
+        "shortcode": post["post_id"],
+        "id": post["instagram_id"],
+        "taken_at_timestamp": post["timestamp"],
+        "is_video": post["media_type"] in ("VIDEO", "REEL"),
+        "display_url": post["display_urls"][0] if post["display_urls"] else None,
+        "edge_liked_by": {"count": post["like_count"]},
+        "edge_media_to_comment": {"count": post["comment_count"]},
+        "video_view_count": post["view_count"],
+        "edge_media_to_caption": {"edges": [{"node": {"text": post["caption"]}}] if post["caption"] else []},
+        "location": post["location"],
+    }
+    if post["video_urls"]:
+        node["video_url"] = post["video_urls"][0]
+    if post["media_type"] == "CAROUSEL":
+        node["edge_sidecar_to_children"] = {"edges": [
+            {"node": {"display_url": url}} for url in post["display_urls"]
+        ]}
+    return node
+
+
+class MockInstagram:
+    """
+    Fixture accounts bench_user_0 .. bench_user_{accounts-1}, each with
+    posts_per_account posts cycled from the saved dump (ids made unique per account).
+    """
+
+    def __init__(
+        self,
+        data_file: str = os.path.join(REPO_ROOT, "lilbieber_data.json"),
+        accounts: int = 100,
+        posts_per_account: int = 60,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        html_filler_scripts: int = 5,
+        seed: Optional[int] = None,
+    ):
+        with open(data_file, encoding='utf-8') as f:
+            self.saved_posts = json.load(f)["posts"]
+
+        self.accounts = accounts
+        self.posts_per_account = posts_per_account
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.html_filler_scripts = html_filler_scripts
+        self.random = random.Random(seed)
+
+        self.status_counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._html_cache: Dict[str, bytes] = {}
+
+    def usernames(self) -> List[str]:
+        return [f"bench_user_{i}" for i in range(self.accounts)]
+
+    def has_user(self, username: str) -> bool:
+        prefix, _, index = username.rpartition("_")
+        return prefix == "bench_user" and index.isdigit() and int(index) < self.accounts
+
+    def _posts(self, username: str, start: int, count: int) -> List[dict]:
+        posts = []
+        for i in range(start, min(start + count, self.posts_per_account)):
+            post = dict(self.saved_posts[i % len(self.saved_posts)])
+            post["post_id"] = f"{post['post_id']}_{username}_{i}"
+            post["instagram_id"] = f"{post['instagram_id']}_{username}_{i}"
+            # Newest first, one hour apart
+            post["timestamp"] = 1769315643 - i * 3600
+            posts.append(post)
+        return posts
+
+    def _page_info(self, end: int) -> dict:
+        has_next = end < self.posts_per_account
+        return {"has_next_page": has_next, "end_cursor": str(end) if has_next else None}
+
+    def _user(self, username: str) -> dict:
+        return {
+            "username": username,
+            "full_name": f"Benchmark {username}",
+            "biography": "Fixture account served by mock_instagram",
+            "edge_followed_by": {"count": 123456},
+            "edge_follow": {"count": 42},
+            "is_verified": False,
+            "profile_pic_url": "https://example.invalid/pic.jpg",
+            "edge_owner_to_timeline_media": {
+                "count": self.posts_per_account,
+                "page_info": self._page_info(PAGE_SIZE),
+                "edges": [{"node": to_web_node(p)} for p in self._posts(username, 0, PAGE_SIZE)],
+            },
+        }
+
+    def profile_info(self, username: str) -> dict:
+        return {"status": "ok", "data": {"user": self._user(username)}}
+
+    def timeline_page(self, variables: dict) -> dict:
+        username = variables["username"]
+        start = int(variables.get("after") or 0)
+        count = variables.get("data", {}).get("count", PAGE_SIZE)
+        posts = self._posts(username, start, count)
+        connection = {
+            "edges": [{"node": to_feed_node(p)} for p in posts],
+            "page_info": self._page_info(start + len(posts)),
+        }
+        return {"data": {"xdt_api__v1__feed__user_timeline_graphql_connection": connection}, "status": "ok"}
+
+    def profile_html(self, username: str) -> bytes:
+        """Profile page: unrelated JSON bundles followed by the one holding the user object"""
+        page = self._html_cache.get(username)
+        if page:
+            return page
+
+        scripts = []
+        for i in range(self.html_filler_scripts):
+            filler = {"require": [["ScheduledServerJS", "handle", None, [{"__bbox": {"chunk": i, "posts": self.saved_posts[:20]}}]]]}
+            scripts.append(json.dumps(filler))
+        profile = {"require": [["PolarisProfilePageContentQuery", {"__bbox": {"result": {"data": {"user": self._user(username)}}}}]]}
+        scripts.append(json.dumps(profile))
+
+        body = "".join(f'<script type="application/json" data-sjs>{s}</script>\n' for s in scripts)
+        page = f"<!DOCTYPE html><html><head></head><body>{body}</body></html>".encode("utf-8")
+        self._html_cache[username] = page
+        return page
+
+    def injected_fault(self) -> Optional[int]:
+        """Status code to fail this request with, if any"""
+        with self._lock:
+            roll = self.random.random()
+            if roll < self.rate_429:
+                return 429
+            if roll < self.rate_429 + self.rate_5xx:
+                return self.random.choice((500, 502, 503))
+            return None
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self.random.uniform(0, self.jitter)
+
+    def record(self, status: int):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=()):
+                mock.record(status)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                delay = mock.delay()
+                if delay:
+                    time.sleep(delay)
+
+                fault = mock.injected_fault()
+                if fault:
+                    self._send(fault, json.dumps({"status": "fail", "message": "injected"}).encode("utf-8"))
+                    return
+
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+
+                if url.path == "/":
+                    # Home page: hands out the cookies IdentityPool warm-ups collect
+                    token = "%032x" % mock.random.getrandbits(128)
+                    self._send(200, b"<!DOCTYPE html><html></html>", "text/html; charset=utf-8", [
+                        ("Set-Cookie", f"csrftoken={token}; Path=/; SameSite=Lax"),
+                        ("Set-Cookie", f"mid=mock{token[:12]}; Path=/; HttpOnly"),
+                    ])
+                    return
+
+                if url.path == "/api/v1/users/web_profile_info/":
+                    username = query.get("username", [""])[0]
+                    if not mock.has_user(username):
+                        self._send(404, b'{"status": "fail"}')
+                        return
+                    self._send(200, json.dumps(mock.profile_info(username)).encode("utf-8"),
+                               headers=[("x-ig-set-www-claim", "hmac.mock")])
+                    return
+
+                if url.path == "/graphql/query":
+                    variables = json.loads(query.get("variables", ["{}"])[0])
+                    if not mock.has_user(variables.get("username", "")):
+                        self._send(404, b'{"status": "fail"}')
+                        return
+                    self._send(200, json.dumps(mock.timeline_page(variables)).encode("utf-8"))
+                    return
+
+                username = url.path.strip("/")
+                if mock.has_user(username):
+                    self._send(200, mock.profile_html(username), "text/html; charset=utf-8")
+                    return
+
+                self._send(404, b"Not found", "text/plain")
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+        """Start serving on a background thread; port 0 picks a free port"""
+        server = ThreadingHTTPServer((host, port), self.handler_class())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, "lilbieber_data.json"))
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=60, help="Posts per fixture account")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay (seconds)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 500/502/503")
+    args = parser.parse_args()
+
+    mock = MockInstagram(args.data, args.accounts, args.posts, args.latency, args.jitter, args.rate_429, args.rate_5xx)
+    server = mock.serve(args.host, args.port)
+    print(f"Serving {args.accounts} accounts at {base_url(server)} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
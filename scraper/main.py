@@ -1,53 +1,151 @@
+"""
+Scrape profiles and posts for a list of accounts.
+
+    python3 scraper/main.py usernames.txt --workers 8 --proxies proxies.txt --output out --format ndjson
+    cat usernames.txt | python3 scraper/main.py --resume
+    python3 scraper/main.py -u instagram -u natgeo --format json
+    python3 scraper/main.py usernames.txt --refresh-days 7
+
+Usernames are read one per line (blank lines and # comments skipped) from the
+file, or stdin when it is "-" or omitted. With --resume, accounts finished in
+the previous run are skipped and interrupted ones continue from their last
+written page.
+
+--refresh-days N only re-polls the counters of posts under N days old,
+diffing them against <output>/instagram_store.db (run once with --format
+store first) and appending the changes to <output>/deltas.ndjson.
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from services.instagram_api import InstagramScraper
-from services.instagram_html import InstagramScraper as InstagramScraperHTML
-# from services.instagram_api import save_profile_and_posts
-import json
-# Uncomment to Test Real Proxies
-proxies = []
-# proxies = [
-#     {
-#         "http": "http://51.159.66.158:3128",
-#         "https": "http://51.159.66.158:3128"
-#     }
-# ]
-
-
-scraper = InstagramScraper(proxies=proxies)
-scraperHtml = InstagramScraperHTML()
-username = "imperio_dos_salgados_99"
-max_posts = 50
-# Get profile - returns InstagramProfile model
-profile = scraper.get_profile(username = username)
-print(f"profile: {profile}")
-
-get_posts = scraper.get_posts(username = username, max_posts = max_posts)
-
-scraper.save_profile_and_posts(profile, get_posts, username)
-
-# profile2 = scraperHtml.get_profile(username)
-
-
-############### testing HTML Embedding - Not Working
-# if profile2:
-#     print(f"\n{'='*60}")
-#     print("PROFILE DATA:")
-#     print(f"{'='*60}")
-    
-#     # Print formatted profile
-#     profile_dict = profile2.to_dict()
-#     print(json.dumps(profile_dict, indent=2, ensure_ascii=False))
-    
-#     # Save to file
-#     output_file = f"{username}_profile.json"
-#     with open(output_file, 'w', encoding='utf-8') as f:
-#         json.dump(profile_dict, f, indent=2, ensure_ascii=False)
-    
-#     print(f"\n✅ Profile saved to: {output_file}")
-# else:
-#     print(f"\n❌ Failed to scrape profile for @{username}")
-
-
-# # Get posts - returns List[InstagramPost] and InstagramPagination
-# posts, pagination = scraper.get_posts("cristiano", count=12)
-# for post in posts:
-#     print(f"{post.media_type}: {post.like_count:,} likes")
\ No newline at end of file
+from services.batch_runner import BatchRunner
+from services.checkpoint_store import CheckpointStore
+from services.engagement_refresh import EngagementRefresher, DeltaLog
+from services.metrics import configure_logging
+from services.writers import get_writer
+
+FORMATS = ["ndjson", "ndjson.gz", "ndjson.zst", "parquet", "sqlite", "store", "json"]
+
+
+def read_lines(path: str):
+    """Non-empty, non-comment lines of a file ("-" = stdin)"""
+    f = sys.stdin if path == "-" else open(path, encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def load_proxies(path: str):
+    """One proxy URL per line; host:port means an HTTP proxy"""
+    proxies = []
+    for line in read_lines(path):
+        url = line if "://" in line else f"http://{line}"
+        proxies.append({"http": url, "https": url})
+    return proxies
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("usernames", nargs="?", default="-", help="File of usernames, one per line (default: stdin)")
+    parser.add_argument("-u", "--username", action="append", default=[], help="Scrape this account (repeatable)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Accounts scraped concurrently")
+    parser.add_argument("--proxies", help="File of proxy URLs, one per line")
+    parser.add_argument("-o", "--output", default="output", help="Output directory")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="ndjson", help="Output format")
+    parser.add_argument("--max-posts", type=int, default=50, help="Posts per account (0 = all)")
+    parser.add_argument("--resume", action="store_true", help="Continue the previous run from its checkpoints")
+    parser.add_argument("--checkpoints", help="Checkpoint database (default: <output>/checkpoints.db)")
+    parser.add_argument("--refresh-days", type=float, help="Only refresh counters of posts newer than this")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--json-logs", action="store_true", help="Log one JSON object per line")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    # {username}_data.json files are only written on close, so there is nothing to resume
+    if args.resume and args.format == "json":
+        parser.error("--resume needs an incrementally written format, not json")
+    return args
+
+
+def refresh(args, scraper: InstagramScraper, usernames) -> int:
+    """Engagement refresh mode: deltas for recent posts instead of full scrapes"""
+    store = get_writer("store", args.output)
+    refresher = EngagementRefresher(scraper, store, window_days=args.refresh_days)
+    failed = 0
+
+    def run(username):
+        try:
+            return refresher.refresh(username)
+        except Exception as e:
+            scraper.metrics.event(
+                "account_failed", f"Error: @{username} failed - {e!r}", logging.ERROR, username=username, error=repr(e),
+            )
+            return None
+
+    try:
+        with DeltaLog(args.output) as log, ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for result in pool.map(run, usernames):
+                if result is None:
+                    failed += 1
+                    continue
+                deltas, complete = result
+                log.write(deltas)
+                if not complete:
+                    failed += 1
+    finally:
+        store.close()
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO, json_logs=args.json_logs)
+
+    usernames = [name.lstrip("@") for name in args.username]
+    if not usernames or args.usernames != "-":
+        usernames += [name.lstrip("@") for name in read_lines(args.usernames)]
+    if not usernames:
+        print("No usernames given", file=sys.stderr)
+        return 2
+
+    proxies = load_proxies(args.proxies) if args.proxies else []
+    scraper = InstagramScraper(proxies=proxies, pool_maxsize=max(10, args.workers))
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.refresh_days:
+        return refresh(args, scraper, usernames)
+
+    writer = get_writer(args.format, args.output)
+    checkpoints = None
+    if args.format != "json":
+        checkpoints = CheckpointStore(args.checkpoints or os.path.join(args.output, "checkpoints.db"))
+
+    runner = BatchRunner(
+        scraper,
+        writer,
+        checkpoints,
+        workers=args.workers,
+        max_posts=args.max_posts or None,
+        resume=args.resume,
+        progress_interval=args.progress_interval,
+    )
+    try:
+        stats = runner.run(usernames)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with --resume to continue", file=sys.stderr)
+        return 130
+    finally:
+        writer.close()
+        if checkpoints:
+            checkpoints.close()
+
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
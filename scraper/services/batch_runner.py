@@ -0,0 +1,249 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Callable
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.instagram_api import InstagramScraper
+from services.checkpoint_store import CheckpointStore
+from services.writers import OutputWriter
+
+
+class BatchRunner:
+    """
+    Scrapes a list of accounts (profile plus posts) across a thread pool.
+
+    After every written page the writer is flushed and the account's
+    checkpoint (end_cursor, posts written) saved, so with resume=True a
+    crashed run skips finished accounts and continues the rest from their last
+    page. A page can be written twice if the crash lands between the flush and
+    the checkpoint: append-only formats (ndjson) may then hold one duplicate
+    page, upserting ones (sqlite, store) don't. Batched writers (parquet) are
+    not flushed per page; their checkpoints are held back and saved from the
+    writer's on_flush hook once the rows are on disk.
+
+    Progress (accounts/min, posts/sec, request error rate) is logged as a
+    "progress" event every progress_interval seconds.
+    """
+
+    def __init__(
+        self,
+        scraper: InstagramScraper,
+        writer: OutputWriter,
+        checkpoints: Optional[CheckpointStore] = None,
+        workers: int = 4,
+        max_posts: Optional[int] = None,
+        resume: bool = False,
+        progress_interval: float = 10.0,
+    ):
+        self.scraper = scraper
+        self.writer = writer
+        self.checkpoints = checkpoints
+        self.workers = workers
+        self.max_posts = max_posts
+        self.resume = resume
+        self.progress_interval = progress_interval
+
+        self._writer_lock = threading.Lock()
+        # Checkpoint updates waiting for a batched writer's next flush, per username
+        self._pending: Dict[str, List[Tuple[Callable, tuple, dict]]] = {}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reset_stats(0)
+
+    def _reset_stats(self, total: int):
+        self._stats = {
+            "accounts": total, "done": 0, "failed": 0, "skipped": 0,
+            "posts": 0, "requests": 0, "request_errors": 0,
+        }
+        self._started = time.monotonic()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _on_event(self, event: str, fields: Dict[str, Any]):
+        """Metrics hook: every HTTP exchange arrives as a "request" event"""
+        if event != "request":
+            return
+        status = fields.get("status")
+        failed = status == "error" or (isinstance(status, int) and status >= 400)
+        self._count(requests=1, request_errors=int(failed))
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts so far plus accounts/min, posts/sec and request error rate"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        finished = stats["done"] + stats["failed"]
+        stats["elapsed"] = round(elapsed, 1)
+        stats["accounts_per_min"] = round(finished / elapsed * 60, 2)
+        stats["posts_per_sec"] = round(stats["posts"] / elapsed, 2)
+        stats["error_rate"] = round(stats["request_errors"] / stats["requests"], 4) if stats["requests"] else 0.0
+        return stats
+
+    def _report(self, event: str = "progress", level: int = logging.INFO):
+        stats = self.stats()
+        finished = stats["done"] + stats["failed"] + stats["skipped"]
+        self.scraper.metrics.event(
+            event,
+            f"{finished}/{stats['accounts']} accounts ({stats['failed']} failed), "
+            f"{stats['accounts_per_min']:.1f} accounts/min, {stats['posts_per_sec']:.1f} posts/sec, "
+            f"{stats['error_rate']:.1%} request errors",
+            level, **stats,
+        )
+
+    def _progress(self, finished: threading.Event):
+        while not finished.wait(self.progress_interval):
+            self._report()
+
+    def _write(self, profile=None, posts: Optional[List] = None):
+        with self._writer_lock:
+            if profile:
+                self.writer.write_profile(profile)
+            if posts:
+                self.writer.write_posts(posts)
+            # A checkpoint must never get ahead of the data on disk
+            if self.checkpoints and not self.writer.batched:
+                self.writer.flush()
+
+    def _defer(self, username: str, update: Callable, *args, **kwargs) -> bool:
+        """Hold a checkpoint update until the batched writer flushes; False if it can be applied now"""
+        if not self.writer.batched:
+            return False
+        with self._writer_lock:
+            if update == self.checkpoints.save:
+                # A later save supersedes the earlier ones
+                self._pending[username] = [(update, (username,) + args, kwargs)]
+            elif username in self._pending:
+                self._pending[username].append((update, (username,) + args, kwargs))
+            else:
+                return False
+        return True
+
+    def _commit_checkpoints(self):
+        """Writer on_flush hook (called under the writer lock): everything buffered is now on disk"""
+        pending, self._pending = self._pending, {}
+        for updates in pending.values():
+            for update, args, kwargs in updates:
+                update(*args, **kwargs)
+
+    def _save(self, username: str, *args, **kwargs):
+        if self.checkpoints and not self._defer(username, self.checkpoints.save, *args, **kwargs):
+            self.checkpoints.save(username, *args, **kwargs)
+
+    def _fail(self, username: str, error: str):
+        if self.checkpoints and not self._defer(username, self.checkpoints.fail, error):
+            self.checkpoints.fail(username, error)
+        self._count(failed=1)
+        self.scraper.metrics.event(
+            "account_failed", f"Error: @{username} failed - {error}", logging.ERROR, username=username, error=error,
+        )
+
+    def _scrape(self, username: str) -> bool:
+        checkpoint = self.checkpoints.get(username) if self.checkpoints and self.resume else None
+        if checkpoint and checkpoint["status"] == "done":
+            self._count(skipped=1)
+            return True
+
+        resumed = bool(checkpoint and checkpoint["profile_done"])
+        if resumed:
+            end_cursor, total, pages = checkpoint["end_cursor"], checkpoint["posts"], checkpoint["pages"]
+            self.scraper.metrics.event(
+                "account_resumed", f"Resuming @{username} after {total} posts from cursor {end_cursor}",
+                username=username, end_cursor=end_cursor, posts=total,
+            )
+        else:
+            end_cursor, total, pages = None, 0, 0
+
+        complete = True
+        if not resumed or (end_cursor and not self._reached_limit(total)):
+            # Without a cursor the first page is the profile with its embedded posts
+            page_iter = self.scraper.iter_pages(
+                username, self.max_posts - total if self.max_posts else None, end_cursor
+            )
+            while True:
+                try:
+                    profile, page_posts, pagination = next(page_iter)
+                except StopIteration as stop:
+                    complete = stop.value
+                    break
+
+                self._write(profile, page_posts)
+                end_cursor = pagination.end_cursor if pagination.has_next_page else None
+                total += len(page_posts)
+                pages += 1
+                self._count(posts=len(page_posts))
+                self._save(username, end_cursor, total, pages)
+
+                if self._stop.is_set():
+                    page_iter.close()
+                    return False
+
+            if not pages:
+                self._fail(username, "profile unavailable")
+                return False
+
+        # A failed page (or the 100-page cap) leaves the cursor in the checkpoint for --resume
+        if not complete and end_cursor and not self._reached_limit(total):
+            self._fail(username, f"stopped after {total} posts; resume from cursor {end_cursor}")
+            return False
+
+        self._save(username, end_cursor, total, pages, status="done")
+        self._count(done=1)
+        return True
+
+    def _reached_limit(self, total: int) -> bool:
+        return bool(self.max_posts) and total >= self.max_posts
+
+    def _process(self, username: str) -> bool:
+        if self._stop.is_set():
+            return False
+        try:
+            return self._scrape(username)
+        except Exception as e:
+            self._fail(username, repr(e))
+            return False
+
+    def run(self, usernames: Iterable[str]) -> Dict[str, Any]:
+        """
+        Scrape every username; returns the final stats(). On KeyboardInterrupt
+        in-flight accounts stop after their current page and the checkpoints
+        are left for a resumed run.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        if self.checkpoints and not self.resume:
+            self.checkpoints.reset()
+
+        self._stop.clear()
+        self._reset_stats(len(usernames))
+        self.scraper.metrics.add_hook(self._on_event)
+        if self.checkpoints and self.writer.batched:
+            self.writer.on_flush = self._commit_checkpoints
+        finished = threading.Event()
+        reporter = threading.Thread(target=self._progress, args=(finished,), daemon=True)
+        reporter.start()
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            list(executor.map(self._process, usernames))
+        except KeyboardInterrupt:
+            self._stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            if self.checkpoints and self.writer.batched:
+                # Write out the last batch so its held-back checkpoints are saved
+                with self._writer_lock:
+                    self.writer.flush()
+                    self.writer.on_flush = None
+            finished.set()
+            reporter.join()
+            self.scraper.metrics.remove_hook(self._on_event)
+            self._report("batch_finished")
+
+        return self.stats()
@@ -0,0 +1,77 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+_MAGIC = b"IGBLOOM1"
+_HEADER = struct.Struct("<8sQQQ")  # magic, bit count, hash count, capacity
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter backed by a memory-mapped file.
+
+    Sized on creation for `capacity` items at `error_rate` false positives
+    (50M handles at 0.1% is ~86 MB); the OS pages the bit array in and out, so
+    worker RSS stays small and the set survives restarts. Reopening an existing
+    file keeps the size it was created with.
+    """
+
+    def __init__(self, path: str = "discovery.bloom", capacity: int = 50_000_000, error_rate: float = 0.001):
+        self.path = path
+
+        if os.path.exists(path) and os.path.getsize(path) >= _HEADER.size:
+            with open(path, "rb") as f:
+                magic, self.bits, self.hashes, self.capacity = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+        else:
+            self.capacity = capacity
+            self.bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+            self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, self.capacity))
+                f.truncate(_HEADER.size + (self.bits + 7) // 8)
+
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str):
+        # Kirsch-Mitzenmacher: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns True if it was (definitely) not in the set before"""
+        added = False
+        with self._lock:
+            for position in self._positions(item):
+                index = _HEADER.size + (position >> 3)
+                mask = 1 << (position & 7)
+                byte = self._map[index]
+                if not byte & mask:
+                    self._map[index] = byte | mask
+                    added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        with self._lock:
+            return all(
+                self._map[_HEADER.size + (position >> 3)] & (1 << (position & 7))
+                for position in self._positions(item)
+            )
+
+    def flush(self):
+        with self._lock:
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
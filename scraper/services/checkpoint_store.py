@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, Set
+
+STATUSES = ("in_progress", "done", "failed")
+
+
+class CheckpointStore:
+    """
+    SQLite-backed progress per username for batch runs.
+
+    Records whether the profile was written, the end_cursor after the last
+    written page and how many posts were written, so a crashed run can skip
+    finished accounts and continue the others from their last page.
+    """
+
+    def __init__(self, path: str = "checkpoints.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    username TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    profile_done INTEGER NOT NULL DEFAULT 0,
+                    end_cursor TEXT,
+                    posts INTEGER NOT NULL DEFAULT 0,
+                    pages INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        """Return {"status", "profile_done", "end_cursor", "posts", "pages", "error"}, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, profile_done, end_cursor, posts, pages, error FROM checkpoints WHERE username = ?",
+                (username,),
+            ).fetchone()
+
+        if not row:
+            return None
+        return {
+            "status": row[0], "profile_done": bool(row[1]), "end_cursor": row[2],
+            "posts": row[3], "pages": row[4], "error": row[5],
+        }
+
+    def save(
+        self,
+        username: str,
+        end_cursor: Optional[str],
+        posts: int,
+        pages: int,
+        profile_done: bool = True,
+        status: str = "in_progress",
+        error: Optional[str] = None,
+    ):
+        """Record progress after a profile or page has been written"""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown checkpoint status: {status}")
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO checkpoints
+                    (username, status, profile_done, end_cursor, posts, pages, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (username, status, int(profile_done), end_cursor, posts, pages, error, time.time()),
+            )
+
+    def fail(self, username: str, error: str):
+        """Mark an account failed, keeping its cursor and counts so --resume retries from there"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO checkpoints (username, status, error, updated_at) VALUES (?, 'failed', ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    status = 'failed', error = excluded.error, updated_at = excluded.updated_at
+                """,
+                (username, error, time.time()),
+            )
+
+    def done(self) -> Set[str]:
+        """Usernames finished in earlier runs"""
+        with self._lock:
+            rows = self._conn.execute("SELECT username FROM checkpoints WHERE status = 'done'").fetchall()
+        return {row[0] for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM checkpoints GROUP BY status").fetchall()
+        return dict(rows)
+
+    def reset(self):
+        """Forget every checkpoint (a fresh run)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
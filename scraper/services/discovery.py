@@ -0,0 +1,138 @@
+import re
+import threading
+from typing import Optional, List, Dict, Set, Callable, Iterable
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.bloom_filter import BloomFilter
+from services.scheduler import ScrapeQueue
+from services.post_mapper import get_caption, get_location
+from services.metrics import Instrumentation
+
+# Instagram handles: letters, digits, "." and "_", at most 30 characters
+MENTION_PATTERN = re.compile(r"(?<![\w.@])@([A-Za-z0-9._]{1,30})")
+
+
+def normalize_handle(handle: str) -> Optional[str]:
+    """Lower-case a handle; trailing dots are sentence punctuation, not part of it"""
+    handle = handle.lower().rstrip(".")
+    if not handle or ".." in handle:
+        return None
+    return handle
+
+
+def _tagged_users(node: dict) -> Iterable[str]:
+    # v1 feed shape
+    for tag in (node.get("usertags") or {}).get("in", []):
+        yield (tag.get("user") or {}).get("username")
+    for producer in node.get("coauthor_producers") or []:
+        yield producer.get("username")
+    # GraphQL shape
+    for edge in (node.get("edge_media_to_tagged_user") or {}).get("edges", []):
+        yield ((edge.get("node") or {}).get("user") or {}).get("username")
+
+
+def extract_candidates(node: dict) -> Dict[str, Set[str]]:
+    """
+    Candidate usernames and locations referenced by a timeline node.
+
+    Returns {"mentions": caption @handles, "tagged": tagged users and co-authors
+    (carousel items included), "locations": location ids}.
+    """
+    mentions = set()
+    caption = get_caption(node)
+    if caption and "@" in caption:
+        for match in MENTION_PATTERN.findall(caption):
+            handle = normalize_handle(match)
+            if handle:
+                mentions.add(handle)
+
+    tagged = set()
+    items = [node] + list(node.get("carousel_media") or []) + [
+        edge.get("node", {}) for edge in (node.get("edge_sidecar_to_children") or {}).get("edges", [])
+    ]
+    for item in items:
+        for username in _tagged_users(item):
+            handle = normalize_handle(username) if username else None
+            if handle:
+                tagged.add(handle)
+
+    locations = set()
+    location = get_location(node)
+    if location and location.get("id"):
+        locations.add(str(location["id"]))
+
+    return {"mentions": mentions, "tagged": tagged, "locations": locations}
+
+
+class DiscoveryCrawler:
+    """
+    Feeds the discovery queue from the posts the scrapers parse.
+
+    Pass it to InstagramScraper(discovery=...) and every parsed timeline node is
+    scanned for @mentions, tagged users and locations. Handles go through a
+    BloomFilter first, so only never-seen handles cost a queue write (a rare
+    false positive means a handle is skipped, never enqueued twice). Locations
+    have no queue yet; new ones go to on_location if given.
+    """
+
+    def __init__(
+        self,
+        queue: ScrapeQueue,
+        bloom: Optional[BloomFilter] = None,
+        on_location: Optional[Callable[[str, str], None]] = None,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        self.queue = queue
+        self.bloom = bloom or BloomFilter()
+        self.on_location = on_location
+        self.metrics = metrics or Instrumentation()
+
+        self._candidates = self.metrics.registry.counter(
+            "scraper_discovery_candidates_total", "Handles and locations seen in parsed posts, by source and novelty"
+        )
+        self._lock = threading.Lock()
+
+    def mark_known(self, usernames: Iterable[str]):
+        """Seed the filter with accounts that are already tracked"""
+        for username in usernames:
+            handle = normalize_handle(username)
+            if handle:
+                self.bloom.add(handle)
+
+    def observe(self, nodes: List[dict], source_username: Optional[str] = None) -> List[str]:
+        """Scan parsed nodes; returns the handles newly pushed to the discovery queue"""
+        source = normalize_handle(source_username) if source_username else None
+        new_handles = []
+
+        for node in nodes:
+            candidates = extract_candidates(node)
+
+            for kind in ("mentions", "tagged"):
+                for handle in candidates[kind]:
+                    if handle == source:
+                        continue
+                    # Marked seen only once enqueued, so a failed write is retried on the next sighting
+                    with self._lock:
+                        is_new = handle not in self.bloom
+                        if is_new:
+                            self.queue.add(handle, queue="discovery", tier="discovery")
+                            self.bloom.add(handle)
+                    self._candidates.inc(source=kind, new=str(is_new).lower())
+                    if is_new:
+                        new_handles.append(handle)
+
+            for location_id in candidates["locations"]:
+                key = f"location:{location_id}"
+                with self._lock:
+                    is_new = key not in self.bloom
+                    if is_new:
+                        if self.on_location:
+                            self.on_location(location_id, source_username)
+                        self.bloom.add(key)
+                self._candidates.inc(source="location", new=str(is_new).lower())
+
+        return new_handles
+
+    def close(self):
+        self.bloom.close()
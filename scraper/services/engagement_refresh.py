@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Dict, Tuple
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramPost
+from services.instagram_api import InstagramScraper
+from services.post_store import PostStore, POST_METRICS
+
+
+@dataclass
+class EngagementDelta:
+    """One counter of one post that changed between two scrapes"""
+    instagram_id: str
+    post_id: str
+    owner_username: str
+    field: str
+    old: Optional[int]
+    new: Optional[int]
+    observed_at: float
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class EngagementRefresher:
+    """
+    Re-polls like/comment/view counts of an account's recent posts.
+
+    Only the timeline pages covering posts younger than window_days are
+    fetched: pagination stops at the first page whose oldest post is past the
+    window, or once every known post has been seen. Each counter that moved
+    becomes an EngagementDelta (posts not seen before get old=None).
+
+    Previous counts come from `known` or, by default, the PostStore, which
+    also records the refreshed counts as new engagement snapshots.
+    """
+
+    def __init__(
+        self,
+        scraper: InstagramScraper,
+        store: Optional[PostStore] = None,
+        window_days: float = 7.0,
+    ):
+        self.scraper = scraper
+        self.store = store
+        self.window_days = window_days
+
+    def known_counts(self, username: str, since: float) -> Dict[str, Dict[str, Optional[int]]]:
+        """instagram_id -> last stored counters for the user's posts taken since `since`"""
+        if not self.store:
+            return {}
+        return {
+            post.instagram_id: {field: getattr(post, field) for field in POST_METRICS}
+            for post in self.store.posts_by(username, since=int(since))
+        }
+
+    def refresh(
+        self,
+        username: str,
+        known: Optional[Dict[str, Dict[str, Optional[int]]]] = None,
+        now: Optional[float] = None,
+    ) -> Tuple[List[EngagementDelta], bool]:
+        """
+        Fetch the user's posts inside the window and diff their counters.
+        Pages always come from Instagram, never from the response cache.
+
+        Args:
+            username: Instagram username
+            known: instagram_id -> {"like_count", "comment_count", "view_count"}; default from the store
+            now: Scrape time recorded on deltas and snapshots (default time.time())
+
+        Returns:
+            (one EngagementDelta per changed counter, whether the window was fully covered)
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.window_days * 86400
+        if known is None:
+            known = self.known_counts(username, cutoff)
+        pending = set(known)
+
+        refreshed: List[InstagramPost] = []
+        pages = 0
+        complete = True
+        page_iter = self.scraper.iter_pages(username, with_profile=False, use_cache=False)
+        while True:
+            try:
+                _, page_posts, _ = next(page_iter)
+            except StopIteration as stop:
+                complete = stop.value
+                break
+
+            pages += 1
+            refreshed.extend(post for post in page_posts if post.timestamp is None or post.timestamp >= cutoff)
+            pending.difference_update(post.instagram_id for post in page_posts)
+
+            # Pinned posts sit at the top, so the page's last post tells whether the window is covered
+            timestamps = [post.timestamp for post in page_posts if post.timestamp is not None]
+            if (timestamps and timestamps[-1] < cutoff) or (known and not pending):
+                page_iter.close()
+                break
+
+        deltas = []
+        for post in refreshed:
+            previous = known.get(post.instagram_id, {})
+            for field in POST_METRICS:
+                old, new = previous.get(field), getattr(post, field)
+                if old != new:
+                    deltas.append(EngagementDelta(
+                        post.instagram_id, post.post_id, post.owner_username, field, old, new, now,
+                    ))
+
+        if self.store and refreshed:
+            self.store.write_posts(refreshed, scraped_at=now)
+
+        self.scraper.metrics.event(
+            "engagement_refreshed",
+            f"Refreshed {len(refreshed)} recent posts of @{username} in {pages} pages: {len(deltas)} changes",
+            username=username, pages=pages, posts=len(refreshed), deltas=len(deltas), complete=complete,
+        )
+        if not complete:
+            self.scraper.metrics.event(
+                "refresh_incomplete", f"Warning: engagement refresh of @{username} stopped early", logging.WARNING,
+                username=username, pages=pages,
+            )
+        return deltas, complete
+
+
+class DeltaLog:
+    """Append-only deltas.ndjson, one EngagementDelta per line"""
+
+    def __init__(self, output_dir: str = "."):
+        os.makedirs(output_dir, exist_ok=True)
+        self._file = open(os.path.join(output_dir, "deltas.ndjson"), "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, deltas: List[EngagementDelta]):
+        with self._lock:
+            self._file.writelines(json.dumps(delta.to_dict()) + "\n" for delta in deltas)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,82 @@
+from typing import Optional, Dict, Any, Iterator
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.json_codec import loads
+
+SCRIPT_OPEN = '<script type="application/json"'
+SCRIPT_CLOSE = '</script>'
+FOLLOWER_KEYS = ('"edge_followed_by"', '"follower_count"')
+
+
+def iter_json_scripts(html: str) -> Iterator[str]:
+    """
+    Yield the body of every <script type="application/json"> tag in one pass.
+
+    Uses str.find instead of a DOTALL regex so each byte of the page is
+    scanned once and no lazy-match backtracking happens on large blobs.
+    """
+    pos = 0
+    while True:
+        start = html.find(SCRIPT_OPEN, pos)
+        if start == -1:
+            return
+
+        body_start = html.find('>', start + len(SCRIPT_OPEN))
+        if body_start == -1:
+            return
+        body_start += 1
+
+        body_end = html.find(SCRIPT_CLOSE, body_start)
+        if body_end == -1:
+            return
+
+        pos = body_end + len(SCRIPT_CLOSE)
+        yield html[body_start:body_end]
+
+
+def might_contain_user(blob: str, username: str) -> bool:
+    """Cheap substring pre-check run before paying for a JSON decode"""
+    if f'"{username}"' not in blob:
+        return False
+    return any(key in blob for key in FOLLOWER_KEYS)
+
+
+def find_user_in_json(data: Any, username: str) -> Optional[Dict[str, Any]]:
+    """
+    Search nested JSON for the user profile object without Python recursion.
+    Visits nodes in the same depth-first order as the recursive search did.
+    """
+    stack = [data]
+
+    while stack:
+        item = stack.pop()
+
+        if isinstance(item, dict):
+            if item.get('username') == username and ('edge_followed_by' in item or 'follower_count' in item):
+                return item
+            stack.extend(reversed([v for v in item.values() if isinstance(v, (dict, list))]))
+
+        elif isinstance(item, list):
+            stack.extend(reversed([v for v in item if isinstance(v, (dict, list))]))
+
+    return None
+
+
+def extract_user_from_scripts(html: str, username: str) -> Optional[Dict[str, Any]]:
+    """Find the profile object inside the page's application/json script tags"""
+    for blob in iter_json_scripts(html):
+        blob = blob.strip()
+        if not blob.startswith('{') or not might_contain_user(blob, username):
+            continue
+
+        try:
+            data = loads(blob)
+        except ValueError:
+            continue
+
+        user_data = find_user_in_json(data, username)
+        if user_data:
+            return user_data
+
+    return None
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Tuple, Union
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.instagram_html import InstagramProfile, parse_profile_html
+from services.metrics import Instrumentation
+
+
+class HtmlParsePool:
+    """
+    Parses profile HTML in worker processes so extraction (script scan, JSON
+    decode, user search) runs on every core instead of under the fetch
+    threads' GIL.
+
+    At most max_pending bodies are queued or parsing at once; submit() blocks
+    past that, so fetch threads wait for parsers rather than piling fetched
+    pages up in memory.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.metrics = metrics or Instrumentation()
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._wait = self.metrics.registry.histogram(
+            "scraper_parse_queue_wait_seconds", "Time fetched HTML waited for a free parser slot"
+        )
+
+    def submit(self, body: Union[str, bytes], username: str, encoding: Optional[str] = None) -> Future:
+        """Queue one page; the future resolves to parse_profile_html's (profile, method, parse seconds)"""
+        started = time.perf_counter()
+        self._slots.acquire()
+        self._wait.observe(time.perf_counter() - started)
+        try:
+            future = self._executor.submit(parse_profile_html, body, username, encoding)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def parse(
+        self,
+        body: Union[str, bytes],
+        username: str,
+        encoding: Optional[str] = None,
+    ) -> Tuple[Optional[InstagramProfile], Optional[str], float]:
+        """Parse one page in a worker process and wait for the result"""
+        return self.submit(body, username, encoding).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
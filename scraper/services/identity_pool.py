@@ -0,0 +1,309 @@
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable
+import requests
+from requests.adapters import HTTPAdapter
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.session_pool import proxy_key, TimedHTTPAdapter
+from services.proxy_pool import ProxyPool
+from services.rate_limiter import AdaptiveRateLimiter
+from services.metrics import Instrumentation, proxy_label
+
+# Header sets that belong together: a Chrome UA with Firefox client hints is a giveaway
+FINGERPRINTS = [
+    {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0",
+        "Sec-CH-UA": '"Microsoft Edge";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+        "Sec-CH-UA-Mobile": "?0",
+        "Sec-CH-UA-Platform": '"Windows"',
+        "Accept-Language": "en-US,en;q=0.9",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+        "Sec-CH-UA": '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+        "Sec-CH-UA-Mobile": "?0",
+        "Sec-CH-UA-Platform": '"Windows"',
+        "Accept-Language": "en-US,en;q=0.9",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+        "Sec-CH-UA": '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+        "Sec-CH-UA-Mobile": "?0",
+        "Sec-CH-UA-Platform": '"macOS"',
+        "Accept-Language": "en-GB,en;q=0.9",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:133.0) Gecko/20100101 Firefox/133.0",
+        "Accept-Language": "en-US,en;q=0.5",
+    },
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/18.1 Safari/605.1.15",
+        "Accept-Language": "en-US,en;q=0.9",
+    },
+]
+
+# Responses that say the identity (not the profile) is the problem
+BURN_STATUSES = (401, 403, 429)
+
+
+class Identity:
+    """One consistent client: a fingerprint's headers, its own cookie jar and a fixed proxy"""
+
+    def __init__(self, identity_id: int, fingerprint: Dict[str, str], proxy: Optional[Dict[str, str]],
+                 session: requests.Session, max_requests: int):
+        self.id = identity_id
+        self.fingerprint = fingerprint
+        self.proxy = proxy
+        self.session = session
+        self.max_requests = max_requests
+        self.created = time.monotonic()
+        self.warmed = False
+        self.retired: Optional[str] = None
+        self.claim = "0"
+        self.requests = 0
+        self.strikes = 0
+
+    @property
+    def csrftoken(self) -> Optional[str]:
+        return self.session.cookies.get("csrftoken")
+
+    def api_headers(self) -> Dict[str, str]:
+        """Fingerprint plus the per-identity XHR headers (CSRF token, WWW-Claim)"""
+        headers = {**self.fingerprint, "X-IG-WWW-Claim": self.claim}
+        token = self.csrftoken
+        if token:
+            headers["X-CSRFToken"] = token
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "proxy": proxy_label(proxy_key(self.proxy)),
+            "user_agent": self.fingerprint["User-Agent"],
+            "warmed": self.warmed,
+            "cookies": sorted(self.session.cookies.keys()),
+            "requests": self.requests,
+            "strikes": self.strikes,
+            "age": round(time.monotonic() - self.created, 1),
+        }
+
+
+class IdentityPool:
+    """
+    Pool of warmed-up client identities for the scrapers.
+
+    Each identity pairs a fingerprint (UA + matching client hints) with its own
+    session/cookie jar and a proxy picked from the ProxyPool when it is created.
+    New identities load the home page in the background first, so requests go
+    out with csrftoken/mid cookies like a browser's. Identities are used round
+    robin, rotated out after ~rotate_every requests (jittered so they don't all
+    rotate at once), and retired early once max_strikes 401/403/429s or soft
+    blocks arrive in a row; a fresh identity replaces each one.
+    """
+
+    def __init__(
+        self,
+        proxy_pool: Optional[ProxyPool] = None,
+        size: int = 4,
+        rotate_every: int = 200,
+        max_strikes: int = 3,
+        base_url: str = "https://www.instagram.com",
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        fingerprints: Optional[List[Dict[str, str]]] = None,
+        warmup_timeout: float = 15.0,
+        pool_maxsize: int = 10,
+        on_connect: Optional[Callable[[str, float], None]] = None,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        self.proxy_pool = proxy_pool or ProxyPool()
+        self.size = size
+        self.rotate_every = rotate_every
+        self.max_strikes = max_strikes
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = rate_limiter
+        self.fingerprints = fingerprints or FINGERPRINTS
+        self.warmup_timeout = warmup_timeout
+        self.pool_maxsize = pool_maxsize
+        self.on_connect = on_connect
+        self.metrics = metrics or Instrumentation()
+
+        self._identities: List[Identity] = []
+        self._ids = itertools.count(1)
+        self._turn = 0
+        self._warmup_failures = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._warmed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(size, 4)))
+        self._events = self.metrics.registry.counter(
+            "scraper_identity_events_total", "Identity lifecycle events (created, warmed, rotated, burned, ...)"
+        )
+
+        with self._lock:
+            for _ in range(size):
+                self._spawn()
+
+    def __len__(self) -> int:
+        return len(self._identities)
+
+    def _new_session(self, proxy: Optional[Dict[str, str]]) -> requests.Session:
+        session = requests.Session()
+        if self.on_connect:
+            adapter = TimedHTTPAdapter(self.on_connect, pool_maxsize=self.pool_maxsize)
+        else:
+            adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if proxy:
+            session.proxies.update(proxy)
+        return session
+
+    def _spawn(self):
+        """Create an identity and warm it up in the background; caller holds the lock"""
+        proxy = self.proxy_pool.acquire()
+        jitter = max(1, self.rotate_every // 4)
+        identity = Identity(
+            next(self._ids),
+            random.choice(self.fingerprints),
+            proxy,
+            self._new_session(proxy),
+            self.rotate_every + random.randint(-jitter, jitter),
+        )
+        self._identities.append(identity)
+        self._events.inc(event="created")
+        self._executor.submit(self._warm_up, identity)
+
+    def _warm_up(self, identity: Identity):
+        """Load the home page like a first visit to collect csrftoken / mid / ig_did cookies"""
+        # Back off while warm-ups keep failing (e.g. every proxy is blocked)
+        if self._warmup_failures:
+            time.sleep(min(60.0, 2.0 ** self._warmup_failures))
+        if identity.retired or self._closed:
+            return
+
+        key = proxy_key(identity.proxy)
+        if self.rate_limiter:
+            self.rate_limiter.acquire(key)
+
+        headers = {
+            **identity.fingerprint,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+        }
+        error = None
+        try:
+            resp = identity.session.get(f"{self.base_url}/", headers=headers, timeout=15)
+            status = resp.status_code
+        except requests.exceptions.RequestException as e:
+            status = None
+            error = repr(e)
+
+        with self._lock:
+            if status is not None and status < 400:
+                identity.warmed = True
+                self._warmup_failures = 0
+                self._events.inc(event="warmed")
+                self._warmed.notify_all()
+                warmed = True
+            else:
+                self._warmup_failures += 1
+                self._retire(identity, "warmup_failed")
+                warmed = False
+
+        if warmed:
+            self.metrics.event(
+                "identity_warmed", f"Identity {identity.id} warmed up via {proxy_label(key)}", logging.DEBUG,
+                identity=identity.id, proxy=proxy_label(key), cookies=sorted(identity.session.cookies.keys()),
+            )
+        else:
+            if status == 429 and self.rate_limiter:
+                self.rate_limiter.on_throttle(key)
+            self.metrics.event(
+                "identity_warmup_failed", f"Warning: identity warm-up via {proxy_label(key)} failed ({status or error})",
+                logging.WARNING, identity=identity.id, proxy=proxy_label(key), status=status,
+            )
+
+    def _retire(self, identity: Identity, reason: str):
+        """Drop an identity and start its replacement; caller holds the lock"""
+        if identity.retired:
+            return
+        identity.retired = reason
+        self._identities.remove(identity)
+        self._events.inc(event=reason)
+        # In-flight requests keep the session; it closes once nothing references it
+        if not self._closed:
+            self._spawn()
+
+    def acquire(self, wait: bool = True) -> Identity:
+        """
+        Next identity, round robin over the warmed ones. Until one is warm,
+        waits up to warmup_timeout (no wait with wait=False, e.g. on an event
+        loop) and then uses a cold one.
+        """
+        with self._lock:
+            deadline = time.monotonic() + (self.warmup_timeout if wait else 0.0)
+            while True:
+                ready = [identity for identity in self._identities if identity.warmed]
+                remaining = deadline - time.monotonic()
+                if ready or remaining <= 0:
+                    break
+                self._warmed.wait(remaining)
+
+            candidates = ready or self._identities
+            self._turn += 1
+            identity = candidates[self._turn % len(candidates)]
+            identity.requests += 1
+
+            if identity.requests >= identity.max_requests:
+                # Serve this request, but stop handing the identity out
+                self._retire(identity, "rotated")
+            return identity
+
+    def report(self, identity: Identity, ok: bool, status_code: Optional[int] = None,
+               response: Optional[requests.Response] = None):
+        """
+        Record how a request made with identity went. ok=False without a
+        status (e.g. a login wall instead of data) counts as a soft block.
+        """
+        claim = response.headers.get("x-ig-set-www-claim") if response is not None else None
+        with self._lock:
+            if claim:
+                identity.claim = claim
+            if ok:
+                identity.strikes = 0
+                return
+            if status_code is not None and status_code not in BURN_STATUSES:
+                return
+
+            identity.strikes += 1
+            if identity.strikes >= self.max_strikes and not identity.retired:
+                self._retire(identity, "burned")
+                burned = True
+            else:
+                burned = False
+
+        if burned:
+            self.metrics.event(
+                "identity_burned", f"Warning: retiring identity {identity.id} after {identity.strikes} blocks",
+                logging.WARNING, identity=identity.id, proxy=proxy_label(proxy_key(identity.proxy)), requests=identity.requests,
+            )
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """Snapshot of the active identities"""
+        with self._lock:
+            return {identity.id: identity.to_dict() for identity in self._identities}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            identities, self._identities = self._identities, []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for identity in identities:
+            identity.session.close()
@@ -1,16 +1,163 @@
 import requests
 import json
-from typing import Optional, List, Dict
+import logging
+import threading
+from typing import Optional, List, Dict, Iterator, Generator, Tuple, TYPE_CHECKING
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from models.instagram import InstagramProfile, InstagramPost
+from models.instagram import InstagramProfile, InstagramPost, InstagramPagination
+from services.session_pool import SessionPool, proxy_key
+from services.rate_limiter import AdaptiveRateLimiter
+from services.proxy_pool import ProxyPool
+from services.writers import OutputWriter
+from services.response_cache import ResponseCache
+from services.metrics import Instrumentation
+from services.retry import RetryEngine, FetchError
+from services.json_codec import JsonDecoder
+from services.identity_pool import IdentityPool, Identity
+from services.post_mapper import (
+    VALIDATION_MODES, map_nodes, get_media_type, get_caption, get_display_url, get_video_url, get_location
+)
 import time
+from services.state_store import ScrapeStateStore
+
+if TYPE_CHECKING:
+    # discovery -> scheduler -> instagram_api would be circular at runtime
+    from services.discovery import DiscoveryCrawler
+
+
+class TimelineWalk:
+    """
+    Per-page decisions of timeline pagination, shared by the sync and async scrapers.
+
+    The caller fetches posts_data for variables() and hands it to advance(), which
+    parses it, applies max_posts and the high-water mark, emits the page events
+    and decides whether to stop; only the I/O differs between the two scrapers.
+    Once done is set, complete tells whether the end or known posts were reached.
+    """
+    
+    def __init__(
+        self,
+        scraper: "InstagramScraper",
+        username: str,
+        max_posts: Optional[int],
+        end_cursor: Optional[str],
+        high_water: Optional[dict],
+        seen_ids: Optional[set] = None,
+    ):
+        self.scraper = scraper
+        self.username = username
+        self.max_posts = max_posts
+        self.end_cursor = end_cursor
+        self.high_water = high_water
+        self.seen_ids = seen_ids if seen_ids is not None else set()
+        self.total = 0
+        self.page = 1
+        self.consecutive_empty_pages = 0
+        self.newest: Optional[InstagramPost] = None
+        self.complete = False
+        self.done = False
+    
+    def variables(self) -> dict:
+        """GraphQL variables for the next page; retries reuse them, so a failed page resumes from the last good cursor"""
+        return self.scraper._build_posts_variables(self.username, self.end_cursor)
+    
+    def _finish(self, complete: bool):
+        self.complete = complete
+        self.done = True
+    
+    def advance(self, posts_data: Optional[dict]) -> Optional[Tuple[List[InstagramPost], InstagramPagination]]:
+        """Take one fetched page (None = it failed); returns the page to yield, or None"""
+        scraper, username, metrics = self.scraper, self.username, self.scraper.metrics
+        
+        if not posts_data:
+            metrics.event(
+                "page_failed",
+                f"Error: Failed to fetch posts page {self.page} for @{username}; resume from cursor {self.end_cursor}",
+                logging.ERROR, username=username, page=self.page, end_cursor=self.end_cursor,
+            )
+            self._finish(False)
+            return None
+        
+        edges = posts_data.get("edges", [])
+        page_info = posts_data.get("page_info", {})
+        
+        if not edges:
+            self.consecutive_empty_pages += 1
+            if self.consecutive_empty_pages >= 3:
+                self._finish(True)
+            else:
+                self.page += 1
+            return None
+        
+        self.consecutive_empty_pages = 0
+        
+        parse_started = time.perf_counter()
+        page_posts, reached_known = scraper._parse_page(edges, username, self.seen_ids, self.high_water)
+        parse_time = time.perf_counter() - parse_started
+        
+        has_next_page = page_info.get("has_next_page", False)
+        self.end_cursor = page_info.get("end_cursor")
+        pagination = InstagramPagination(has_next_page=has_next_page, end_cursor=self.end_cursor)
+        
+        if self.max_posts and self.total + len(page_posts) >= self.max_posts:
+            truncated = self.total + len(page_posts) > self.max_posts
+            page_posts = page_posts[:self.max_posts - self.total]
+            self.newest = scraper._newest_post(self.newest, page_posts)
+            metrics.record_page(username, self.page, len(page_posts), parse_time, has_next_page, self.end_cursor)
+            self._finish(reached_known and not truncated)
+            return page_posts, pagination
+        
+        self.newest = scraper._newest_post(self.newest, page_posts)
+        self.total += len(page_posts)
+        metrics.record_page(username, self.page, len(page_posts), parse_time, has_next_page, self.end_cursor)
+        
+        if reached_known:
+            metrics.event("reached_known", f"Reached previously scraped posts for @{username}", username=username)
+            self._finish(True)
+        elif not has_next_page:
+            self._finish(True)
+        elif not self.end_cursor:
+            metrics.event(
+                "missing_cursor", f"Warning: has_next_page=True but no cursor provided for @{username}",
+                logging.WARNING, username=username, page=self.page,
+            )
+            self._finish(False)
+        else:
+            self.page += 1
+            if self.page > 100:
+                self._finish(False)
+        
+        return page_posts, pagination
 
 
 class InstagramScraper:
     
-    def __init__(self, proxies: Optional[List[Dict[str, str]]] = None):
+    def __init__(
+        self,
+        proxies: Optional[List[Dict[str, str]]] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        idle_timeout: float = 90.0,
+        state_store: Optional[ScrapeStateStore] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+        response_cache: Optional[ResponseCache] = None,
+        validation: str = "strict",
+        base_url: str = "https://www.instagram.com",
+        metrics: Optional[Instrumentation] = None,
+        discovery: Optional["DiscoveryCrawler"] = None,
+        retry: Optional[RetryEngine] = None,
+        decoder: Optional[JsonDecoder] = None,
+        identities: Optional[IdentityPool] = None,
+    ):
+        # Override to point at a mirror or the benchmark mock server
+        self.base_url = base_url.rstrip("/")
+        
+        # Request/page metrics, structured events and profiler hooks; share one across scrapers
+        self.metrics = metrics or Instrumentation()
+        
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0",
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0",
@@ -29,304 +176,668 @@ class InstagramScraper:
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-origin",
-            "Referer": "https://www.instagram.com/",
-            "Origin": "https://www.instagram.com",
+            "Referer": f"{self.base_url}/",
+            "Origin": self.base_url,
         }
         
-        self.proxies = proxies or []
-        self.current_proxy_index = 0
+        # Health-scored proxy selection; pass the same pool to other scrapers to share it
+        self.proxy_pool = proxy_pool or ProxyPool(proxies)
+        
+        # Warmed-up UA + cookie jar + proxy bundles; without one, requests go through session_pool
+        self.identities = identities
         self.doc_id = "34579740524958711"
+        
+        # One keep-alive session per proxy; base headers live on the session
+        self.session_pool = SessionPool(
+            headers=self.base_headers,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            idle_timeout=idle_timeout,
+            on_connect=self.metrics.record_connect,
+        )
+        # Close a proxy's pooled connections when it is removed from the pool
+        self.proxy_pool.add_remove_hook(self.session_pool.remove)
+        
+        # High-water marks used by incremental scrapes
+        self.state_store = state_store
+        
+        # Paces requests per proxy; pass the same instance to other scrapers to share it
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        
+        # Status-aware retries, deadlines and the global retry budget; share it like the rate limiter
+        self.retry = retry or RetryEngine(metrics=self.metrics)
+        
+        # Optional on-disk cache of web_profile_info / GraphQL responses
+        self.response_cache = response_cache
+        
+        # orjson/msgspec when installed; JsonDecoder(projection=True) keeps only the fields we map
+        self.decoder = decoder or JsonDecoder()
+        
+        # Scans parsed nodes for @mentions / tagged users and feeds the discovery queue
+        self.discovery = discovery
+        
+        # How GraphQL nodes become InstagramPost: "strict", "batch" or "trusted" (see post_mapper)
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {validation}")
+        self.validation = validation
     
     def _get_next_proxy(self) -> Optional[Dict[str, str]]:
-        """Get next proxy from rotation pool"""
-        if not self.proxies:
+        """Get next proxy from the health-scored pool"""
+        return self.proxy_pool.acquire()
+    
+    def get_profile(
+        self,
+        username: str,
+        raise_not_found: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[InstagramProfile]:
+        """
+        Fetch Instagram profile data.
+        
+        Args:
+            username: Instagram username
+            raise_not_found: Raise the FetchError (status_code 404) for a missing profile instead of returning None
+            cancel: When set (e.g. another strategy already won), stop before the next attempt
+        """
+        user = self._load_profile_user(username, raise_not_found, cancel)
+        if not user:
             return None
         
-        proxy = self.proxies[self.current_proxy_index]
-        self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxies)
-        return proxy
+        return self._parse_profile(user)
     
-    def get_profile(self, username: str) -> Optional[InstagramProfile]:
-        """Fetch Instagram profile data"""
-        url = f"https://www.instagram.com/api/v1/users/web_profile_info/?username={username}&hl=en"
+    def _load_profile_user(
+        self,
+        username: str,
+        raise_not_found: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[dict]:
+        """Profile user object from the cache, or paced requests retried through the retry engine"""
+        user = self._cached_profile_user(username)
+        if user:
+            return user
         
-        headers = self.base_headers.copy()
-        headers["Referer"] = f"https://www.instagram.com/{username}/"
+        try:
+            return self.retry.call(
+                self._paced, self._fetch_profile_user, cancel, username,
+                endpoint="web_profile_info", can_rotate=len(self.proxy_pool) > 1, cancel=cancel,
+            )
+        except FetchError as e:
+            if not (cancel and cancel.is_set()):
+                self._gave_up("web_profile_info", e, username)
+            if raise_not_found and e.status_code == 404:
+                raise
+            return None
+    
+    def _paced(self, fetch, cancel: Optional[threading.Event], *args):
+        """
+        One attempt: the next identity or proxy, a rate limiter token, then fetch(*args, proxy, identity).
+        Raises FetchError instead of sending once cancel is set.
+        """
+        identity = self.identities.acquire() if self.identities else None
+        proxy = identity.proxy if identity else self._get_next_proxy()
+        self.rate_limiter.acquire(proxy_key(proxy))
+        if cancel and cancel.is_set():
+            raise FetchError("Cancelled")
+        return fetch(*args, proxy, identity)
+    
+    def _route(self, proxy: Optional[Dict[str, str]], identity: Optional[Identity], headers: Dict[str, str]):
+        """Session and request headers for one request, through identity when given"""
+        if identity:
+            return identity.session, {**self.base_headers, **identity.api_headers(), **headers}
+        return self.session_pool.get(proxy), headers
+    
+    def _report_identity(
+        self,
+        identity: Optional[Identity],
+        ok: bool,
+        status_code: Optional[int] = None,
+        resp: Optional[requests.Response] = None,
+    ):
+        if identity:
+            self.identities.report(identity, ok, status_code, resp)
+    
+    def _profile_request(self, username: str) -> Tuple[str, Optional[dict]]:
+        """URL and params for web_profile_info"""
+        return f"{self.base_url}/api/v1/users/web_profile_info/?username={username}&hl=en", None
+    
+    def _cached_profile_user(self, username: str) -> Optional[dict]:
+        """Profile user object from the response cache, if cached"""
+        if not self.response_cache:
+            return None
         
-        proxy = self._get_next_proxy()
+        url, params = self._profile_request(username)
+        data = self.response_cache.get("web_profile_info", url, params)
+        return self._extract_profile_user(data) if data else None
+    
+    def _fetch_profile_user(
+        self,
+        username: str,
+        proxy: Optional[Dict[str, str]] = None,
+        identity: Optional[Identity] = None,
+    ) -> dict:
+        """Fetch the raw user object from web_profile_info; raises FetchError on failure"""
+        url, params = self._profile_request(username)
+        
+        proxy = proxy or self._get_next_proxy()
+        session, headers = self._route(proxy, identity, {"Referer": f"{self.base_url}/{username}/"})
+        started = time.monotonic()
+        resp = None
         
         try:
-            resp = requests.get(url, headers=headers, proxies=proxy, timeout=10)
+            with self.metrics.stage("fetch", endpoint="web_profile_info"):
+                resp = session.get(url, params=params, headers=headers, timeout=10)
+            self.metrics.record_response("web_profile_info", proxy_key(proxy), resp, started)
             resp.raise_for_status()
             
-            data = resp.json()
-            
-            if data.get("status") != "ok":
-                print(f"Error: {data.get('message', 'Unknown error')}")
-                return None
+            with self.metrics.stage("decode", endpoint="web_profile_info"):
+                data = self.decoder.decode(resp.content, "web_profile_info")
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=True)
             
-            user = data["data"]["user"]
-            
-            profile = InstagramProfile(
-                username=user["username"],
-                full_name=user.get("full_name"),
-                biography=user.get("biography"),
-                follower_count=user.get("edge_followed_by", {}).get("count", 0),
-                following_count=user.get("edge_follow", {}).get("count", 0),
-                posts_count=user.get("edge_owner_to_timeline_media", {}).get("count", 0),
-                profile_picture_url=user.get("profile_pic_url_hd") or user.get("profile_pic_url"),
-                is_verified=user.get("is_verified", False),
-                category=user.get("category_name") or user.get("business_category_name"),
-                external_url=user.get("external_url"),
-            )
+            user = self._extract_profile_user(data)
+            if not user:
+                self._report_identity(identity, ok=False)
+                raise FetchError(f"web_profile_info returned no user for @{username}")
             
-            return profile
+            self._report_identity(identity, ok=True, resp=resp)
+            self.rate_limiter.on_success(proxy_key(proxy))
+            if self.response_cache:
+                self.response_cache.set("web_profile_info", url, params, data)
+            return user
             
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code
+            # A 404 is the profile's fault, not the proxy's
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=status_code == 404, status_code=status_code)
+            if status_code == 429:
+                self.rate_limiter.on_throttle(proxy_key(proxy))
+            self._report_identity(identity, ok=False, status_code=status_code)
+            self._http_error("web_profile_info", status_code, username)
+            raise FetchError(f"HTTP {status_code} from web_profile_info", status_code) from e
+        except FetchError:
+            raise
         except Exception as e:
-            print(f"Error: {e}")
+            self._request_error("web_profile_info", proxy, started, resp, e, username)
+            raise FetchError(str(e)) from e
+    
+    def _extract_profile_user(self, data: dict) -> Optional[dict]:
+        """Pull the user object out of a web_profile_info response"""
+        if data.get("status") != "ok":
+            message = data.get('message', 'Unknown error')
+            self.metrics.event("api_error", f"Error: {message}", logging.ERROR, message=message)
             return None
+        
+        return data["data"]["user"]
     
-    def get_posts(self, username: str, max_posts: Optional[int] = 100) -> List[InstagramPost]:
+    def _parse_profile(self, user: dict) -> InstagramProfile:
+        """Build an InstagramProfile from a web_profile_info user object"""
+        return InstagramProfile(
+            username=user["username"],
+            full_name=user.get("full_name"),
+            biography=user.get("biography"),
+            follower_count=user.get("edge_followed_by", {}).get("count", 0),
+            following_count=user.get("edge_follow", {}).get("count", 0),
+            posts_count=user.get("edge_owner_to_timeline_media", {}).get("count", 0),
+            profile_picture_url=user.get("profile_pic_url_hd") or user.get("profile_pic_url"),
+            is_verified=user.get("is_verified", False),
+            category=user.get("category_name") or user.get("business_category_name"),
+            external_url=user.get("external_url"),
+        )
+    
+    def get_posts(self, username: str, max_posts: Optional[int] = 100, incremental: bool = False) -> List[InstagramPost]:
         """
         Fetch posts from Instagram profile using GraphQL with pagination.
         
         Args:
             username: Instagram username
             max_posts: Maximum number of posts to fetch (None = all posts)
+            incremental: Stop at posts already recorded in the state store
             
         Returns:
             List of InstagramPost objects
         """
         all_posts = []
-        seen_ids = set()
-        has_next_page = True
-        end_cursor = None
-        page = 1
-        consecutive_empty_pages = 0
-        
-        while has_next_page:
-            variables = {
-                "data": {
-                    "count": 12,
-                    "include_reel_media_seen_timestamp": True,
-                    "include_relationship_info": True,
-                    "latest_besties_reel_media": True,
-                    "latest_reel_media": True
-                },
-                "username": username
-            }
-            
-            if end_cursor:
-                variables["after"] = end_cursor
-            
-            posts_data = self._fetch_posts_page(variables)
-            
-            if not posts_data:
-                print("Error: Failed to fetch posts page")
-                break
-            
-            edges = posts_data.get("edges", [])
-            page_info = posts_data.get("page_info", {})
-            
-            new_posts_count = 0
+        for page_posts, _ in self.iter_posts(username, max_posts=max_posts, incremental=incremental):
+            all_posts.extend(page_posts)
+        
+        return all_posts
+    
+    def iter_posts(
+        self,
+        username: str,
+        max_posts: Optional[int] = None,
+        end_cursor: Optional[str] = None,
+        incremental: bool = False,
+    ) -> Iterator[Tuple[List[InstagramPost], InstagramPagination]]:
+        """
+        Stream posts page by page so callers can persist each page as it arrives.
+        
+        Args:
+            username: Instagram username
+            max_posts: Maximum number of posts to yield (None = all posts)
+            end_cursor: Cursor to resume pagination from (None = newest posts)
+            incremental: Stop at posts already recorded in the state store
             
-            if not edges:
-                consecutive_empty_pages += 1
-                if consecutive_empty_pages >= 3:
-                    break
-                page += 1
-                continue
+        Yields:
+            (posts on this page, pagination state after this page)
+        """
+        high_water = None
+        if incremental and self.state_store:
+            high_water = self.state_store.get(username)
+        
+        complete, newest = yield from self._iter_post_pages(username, max_posts, end_cursor, high_water)
+        self._commit_high_water(username, newest, complete, high_water)
+    
+    def iter_pages(
+        self,
+        username: str,
+        max_posts: Optional[int] = None,
+        end_cursor: Optional[str] = None,
+        with_profile: bool = True,
+        use_cache: bool = True,
+    ) -> Generator[Tuple[Optional[InstagramProfile], List[InstagramPost], InstagramPagination], None, bool]:
+        """
+        Stream an account page by page, starting from its profile or from a saved cursor.
+        
+        Without end_cursor the first item carries the InstagramProfile and the posts
+        embedded in web_profile_info; GraphQL pages follow with profile=None. With
+        end_cursor (or with_profile=False) the profile is skipped and GraphQL
+        pagination starts from that cursor (None = newest posts). Closing the
+        generator stops after the current page.
+        
+        Args:
+            username: Instagram username
+            max_posts: Maximum number of posts to yield (None = all posts)
+            end_cursor: Cursor to resume pagination from (None = start with the profile)
+            with_profile: Fetch the profile first when there is no end_cursor
+            use_cache: False to fetch every page live, bypassing the response cache
             
-            consecutive_empty_pages = 0
+        Yields:
+            (profile or None, posts on this page, pagination state after this page)
             
-            for edge in edges:
-                node = edge["node"]
-                post_id = node.get("code") or node.get("id") or node.get("pk")
-                
-                if post_id in seen_ids:
-                    continue
-                
-                seen_ids.add(post_id)
-                
-                # Collect display and video URLs for carousel items
-                display_urls = []
-                video_urls = []
-                carousel_items = node.get("carousel_media", [])
-                
-                if carousel_items:
-                    for item in carousel_items:
-                        display_url = self._get_display_url(item)
-                        video_url = self._get_video_url(item)
-                        if display_url:
-                            display_urls.append(display_url)
-                        if video_url:
-                            video_urls.append(video_url)
-                else:
-                    display_url = self._get_display_url(node)
-                    video_url = self._get_video_url(node)
-                    if display_url:
-                        display_urls.append(display_url)
-                    if video_url:
-                        video_urls.append(video_url)
-                
-                post = InstagramPost(
-                    post_id=node.get("code"),
-                    instagram_id=node.get("id") or node.get("pk"),
-                    media_type=self._get_media_type(node),
-                    caption=self._get_caption(node),
-                    like_count=node.get("like_count", 0),
-                    comment_count=node.get("comment_count", 0),
-                    timestamp=node.get("taken_at"),
-                    display_urls=display_urls,
-                    video_urls=video_urls,
-                    view_count=node.get("view_count"),
-                    location=self._get_location(node),
-                    owner_username=username,
-                )
-                
-                all_posts.append(post)
-                new_posts_count += 1
-                
-                if max_posts and len(all_posts) >= max_posts:
-                    return all_posts
+        Returns:
+            False if the profile or a page failed to load before the end (or max_posts)
+        """
+        seen_ids = set()
+        
+        if end_cursor is None and with_profile:
+            user = self._load_profile_user(username)
+            if not user:
+                return False
             
-            print(f"Fetched {new_posts_count} posts on page {page}")
+            timeline = user.get("edge_owner_to_timeline_media", {})
+            posts, _ = self._parse_page(timeline.get("edges", []), username, seen_ids)
+            if max_posts:
+                posts = posts[:max_posts]
             
+            page_info = timeline.get("page_info", {})
             has_next_page = page_info.get("has_next_page", False)
-            end_cursor = page_info.get("end_cursor")
+            end_cursor = page_info.get("end_cursor") if has_next_page else None
+            yield self._parse_profile(user), posts, InstagramPagination(has_next_page=has_next_page, end_cursor=end_cursor)
             
-            print(f"  has_next_page: {has_next_page}, cursor: {end_cursor[:20] if end_cursor else 'None'}...")
+            if not end_cursor or (max_posts and len(posts) >= max_posts):
+                return True
+            max_posts = max_posts - len(posts) if max_posts else None
+        
+        pages = self._iter_post_pages(username, max_posts, end_cursor, None, seen_ids, use_cache=use_cache)
+        while True:
+            try:
+                page_posts, pagination = next(pages)
+            except StopIteration as stop:
+                complete, _ = stop.value
+                return complete
+            yield None, page_posts, pagination
+    
+    def get_profile_with_posts(
+        self,
+        username: str,
+        max_posts: Optional[int] = 100,
+        incremental: bool = False,
+        raise_not_found: bool = False,
+    ) -> Tuple[Optional[InstagramProfile], List[InstagramPost]]:
+        """
+        Fetch profile and posts, reusing the first page of posts embedded in
+        web_profile_info and paginating GraphQL from its end_cursor.
+        
+        Args:
+            username: Instagram username
+            max_posts: Maximum number of posts to fetch (None = all posts)
+            incremental: Stop at posts already recorded in the state store
+            raise_not_found: Raise the FetchError (status_code 404) for a missing profile instead of returning None
             
-            if not has_next_page:
-                break
+        Returns:
+            (InstagramProfile or None, list of InstagramPost)
+        """
+        user = self._load_profile_user(username, raise_not_found)
+        if not user:
+            return None, []
+        
+        profile = self._parse_profile(user)
+        
+        high_water = None
+        if incremental and self.state_store:
+            high_water = self.state_store.get(username)
+        
+        seen_ids = set()
+        posts, complete, end_cursor = self._embedded_page(user, username, max_posts, high_water, seen_ids)
+        newest = self._newest_post(None, posts)
+        
+        if end_cursor:
+            remaining = max_posts - len(posts) if max_posts else None
+            pages = self._iter_post_pages(username, remaining, end_cursor, high_water, seen_ids)
             
-            if has_next_page and end_cursor:
-                time.sleep(2)
-            else:
-                print("  Warning: has_next_page=True but no cursor provided")
-                break
+            while True:
+                try:
+                    page_posts, _ = next(pages)
+                except StopIteration as stop:
+                    complete, tail_newest = stop.value
+                    break
+                posts.extend(page_posts)
             
-            page += 1
+            newest = self._newest_post(newest, [tail_newest] if tail_newest else [])
+        
+        self._commit_high_water(username, newest, complete, high_water)
+        return profile, posts
+    
+    def _embedded_page(
+        self,
+        user: dict,
+        username: str,
+        max_posts: Optional[int],
+        high_water: Optional[dict],
+        seen_ids: set,
+    ) -> Tuple[List[InstagramPost], bool, Optional[str]]:
+        """
+        Posts embedded in a web_profile_info user object.
+        
+        Returns:
+            (posts, whether the timeline is complete, cursor to paginate from or None when no more pages are needed)
+        """
+        timeline = user.get("edge_owner_to_timeline_media", {})
+        posts, reached_known = self._parse_page(timeline.get("edges", []), username, seen_ids, high_water)
+        
+        if max_posts and len(posts) >= max_posts:
+            truncated = len(posts) > max_posts
+            return posts[:max_posts], reached_known and not truncated, None
+        
+        page_info = timeline.get("page_info", {})
+        complete = reached_known or not page_info.get("has_next_page", False)
+        return posts, complete, None if complete else page_info.get("end_cursor")
+    
+    def _commit_high_water(
+        self,
+        username: str,
+        newest: Optional[InstagramPost],
+        complete: bool,
+        high_water: Optional[dict],
+    ):
+        """Advance the state store mark, but only when nothing between it and newest was skipped"""
+        if self.state_store and newest and (complete or not high_water):
+            self.state_store.update(username, newest.instagram_id, newest.timestamp)
+    
+    def _iter_post_pages(
+        self,
+        username: str,
+        max_posts: Optional[int],
+        end_cursor: Optional[str],
+        high_water: Optional[dict],
+        seen_ids: Optional[set] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Pagination loop behind iter_posts; returns (reached end or known posts, newest post).
+        With use_cache=False every page is fetched live (fresh responses still refill the cache).
+        """
+        walk = TimelineWalk(self, username, max_posts, end_cursor, high_water, seen_ids)
+        while not walk.done:
+            page = walk.advance(self._load_posts_page(walk.variables(), use_cache))
+            if page:
+                yield page
+        return walk.complete, walk.newest
+    
+    def _parse_page(
+        self,
+        edges: List[dict],
+        username: str,
+        seen_ids: set,
+        high_water: Optional[dict] = None,
+    ) -> Tuple[List[InstagramPost], bool]:
+        """
+        Parse one page of edges.
+        
+        Returns:
+            (new posts, whether a post at or below the high-water mark was reached)
+        """
+        posts, nodes = map_nodes([edge["node"] for edge in edges], username, seen_ids, self.validation)
+        if self.discovery:
+            self.discovery.observe(nodes, username)
+        if not high_water:
+            return posts, False
+        
+        page_posts = []
+        
+        for node, post in zip(nodes, posts):
+            if self._is_known(post, high_water):
+                # Pinned posts sit above newer posts, so they don't end the scan
+                if self._is_pinned(node):
+                    continue
+                return page_posts, True
             
-            if page > 100:
-                break
+            page_posts.append(post)
         
-        return all_posts
+        return page_posts, False
+    
+    def _is_known(self, post: InstagramPost, high_water: dict) -> bool:
+        """Check whether a post is at or older than the high-water mark"""
+        if post.instagram_id == high_water["instagram_id"]:
+            return True
+        return post.timestamp is not None and post.timestamp <= high_water["timestamp"]
+    
+    def _is_pinned(self, node: dict) -> bool:
+        """Check whether a timeline node is pinned to the top of the profile"""
+        return bool(node.get("timeline_pinned_user_ids") or node.get("pinned_for_users"))
     
-    def _fetch_posts_page(self, variables: dict) -> Optional[dict]:
-        """Fetch a single page of posts using GraphQL with doc_id"""
+    def _newest_post(self, current: Optional[InstagramPost], posts: List[InstagramPost]) -> Optional[InstagramPost]:
+        """Return whichever post has the latest timestamp"""
+        for post in posts:
+            if post.timestamp is None:
+                continue
+            if current is None or post.timestamp > current.timestamp:
+                current = post
+        return current
+    
+    def _build_posts_variables(self, username: str, end_cursor: Optional[str] = None) -> dict:
+        """Build GraphQL variables for one timeline page"""
+        variables = {
+            "data": {
+                "count": 12,
+                "include_reel_media_seen_timestamp": True,
+                "include_relationship_info": True,
+                "latest_besties_reel_media": True,
+                "latest_reel_media": True
+            },
+            "username": username
+        }
         
-        url = "https://www.instagram.com/graphql/query"
+        if end_cursor:
+            variables["after"] = end_cursor
         
+        return variables
+    
+    def _parse_post(self, node: dict, username: str, seen_ids: set) -> Optional[InstagramPost]:
+        """Convert a timeline node into an InstagramPost, skipping ids already in seen_ids"""
+        posts, _ = map_nodes([node], username, seen_ids, self.validation)
+        return posts[0] if posts else None
+    
+    def _load_posts_page(self, variables: dict, use_cache: bool = True) -> Optional[dict]:
+        """Timeline page from the cache, or paced requests retried through the retry engine"""
+        if use_cache:
+            posts_data = self._cached_posts_page(variables)
+            if posts_data:
+                return posts_data
+        
+        try:
+            return self.retry.call(
+                self._paced, self._fetch_posts_page, None, variables,
+                endpoint="graphql", can_rotate=len(self.proxy_pool) > 1,
+            )
+        except FetchError as e:
+            self._gave_up("graphql", e, variables["username"])
+            return None
+    
+    def _posts_request(self, variables: dict) -> Tuple[str, dict]:
+        """URL and params for a GraphQL timeline page"""
         params = {
             "doc_id": self.doc_id,
             "variables": json.dumps(variables)
         }
+        return f"{self.base_url}/graphql/query", params
+    
+    def _cached_posts_page(self, variables: dict) -> Optional[dict]:
+        """Timeline page from the response cache, if cached"""
+        if not self.response_cache:
+            return None
+        
+        url, params = self._posts_request(variables)
+        data = self.response_cache.get("graphql", url, params)
+        return self._extract_posts_page(data) if data else None
+    
+    def _fetch_posts_page(
+        self,
+        variables: dict,
+        proxy: Optional[Dict[str, str]] = None,
+        identity: Optional[Identity] = None,
+    ) -> dict:
+        """Fetch a single page of posts using GraphQL with doc_id; raises FetchError on failure"""
         
-        headers = self.base_headers.copy()
-        headers["Referer"] = f"https://www.instagram.com/{variables['username']}/"
+        url, params = self._posts_request(variables)
         
-        proxy = self._get_next_proxy()
+        proxy = proxy or self._get_next_proxy()
+        session, headers = self._route(proxy, identity, {"Referer": f"{self.base_url}/{variables['username']}/"})
+        started = time.monotonic()
+        resp = None
         
         try:
-            resp = requests.get(
-                url, 
-                params=params,
-                headers=headers, 
-                proxies=proxy, 
-                timeout=15
-            )
+            with self.metrics.stage("fetch", endpoint="graphql"):
+                resp = session.get(
+                    url, 
+                    params=params,
+                    headers=headers, 
+                    timeout=15
+                )
+            self.metrics.record_response("graphql", proxy_key(proxy), resp, started)
             
             resp.raise_for_status()
             
-            data = resp.json()
-            
-            if "errors" in data:
-                print(f"Error: GraphQL errors - {data['errors']}")
-                return None
+            with self.metrics.stage("decode", endpoint="graphql"):
+                data = self.decoder.decode(resp.content, "graphql")
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=True)
             
-            if "data" in data:
-                xdt_data = data.get("data", {}).get("xdt_api__v1__feed__user_timeline_graphql_connection")
-                if xdt_data:
-                    return xdt_data
-                
-                user_data = data.get("data", {}).get("user")
-                if user_data:
-                    timeline_media = user_data.get("edge_owner_to_timeline_media")
-                    if timeline_media:
-                        return timeline_media
+            posts_data = self._extract_posts_page(data)
+            if not posts_data:
+                self._report_identity(identity, ok=False)
+                raise FetchError("GraphQL response had no timeline")
             
-            print(f"Error: Unexpected response structure")
-            return None
+            self._report_identity(identity, ok=True, resp=resp)
+            self._record_page_outcome(proxy, posts_data)
+            if self.response_cache and posts_data.get("edges"):
+                self.response_cache.set("graphql", url, params, data)
+            return posts_data
                 
         except requests.exceptions.HTTPError as e:
-            print(f"Error: HTTP {e.response.status_code}")
-            return None
+            status_code = e.response.status_code
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=False, status_code=status_code)
+            if status_code == 429:
+                self.rate_limiter.on_throttle(proxy_key(proxy))
+            self._report_identity(identity, ok=False, status_code=status_code)
+            self._http_error("graphql", status_code, variables["username"])
+            raise FetchError(f"HTTP {status_code} from graphql", status_code) from e
+        except FetchError:
+            raise
         except Exception as e:
-            print(f"Error: {e}")
+            self._request_error("graphql", proxy, started, resp, e, variables["username"])
+            raise FetchError(str(e)) from e
+    
+    def _http_error(self, endpoint: str, status_code: int, username: str):
+        self.metrics.event(
+            "http_error", f"Warning: HTTP {status_code} from {endpoint} for @{username}", logging.WARNING,
+            endpoint=endpoint, status=status_code, username=username,
+        )
+    
+    def _gave_up(self, endpoint: str, error: FetchError, username: str):
+        """Every attempt failed, or the policy dropped the request"""
+        # A missing profile is an answer, not a failure of the scraper
+        level = logging.WARNING if error.status_code == 404 else logging.ERROR
+        self.metrics.event(
+            "request_failed", f"Error: {endpoint} for @{username} failed - {error}", level,
+            endpoint=endpoint, username=username, status=error.status_code, error=str(error),
+        )
+    
+    def _request_error(
+        self,
+        endpoint: str,
+        proxy: Optional[Dict[str, str]],
+        started: float,
+        resp: Optional[requests.Response],
+        error: Exception,
+        username: str,
+    ):
+        """Failure other than an HTTP status: no response at all, or one that didn't decode"""
+        self.proxy_pool.report(proxy, time.monotonic() - started, ok=False)
+        if resp is None:
+            self.metrics.record_request(endpoint, proxy_key(proxy), "error", None, time.monotonic() - started)
+        self.metrics.event(
+            "request_error", f"Warning: {error}", logging.WARNING,
+            endpoint=endpoint, username=username, error=repr(error),
+        )
+    
+    def _extract_posts_page(self, data: dict) -> Optional[dict]:
+        """Pull the timeline connection (edges + page_info) out of a GraphQL response"""
+        if "errors" in data:
+            self.metrics.event(
+                "graphql_error", f"Error: GraphQL errors - {data['errors']}", logging.ERROR, errors=data["errors"]
+            )
             return None
+        
+        if "data" in data:
+            xdt_data = data.get("data", {}).get("xdt_api__v1__feed__user_timeline_graphql_connection")
+            if xdt_data:
+                return xdt_data
+            
+            user_data = data.get("data", {}).get("user")
+            if user_data:
+                timeline_media = user_data.get("edge_owner_to_timeline_media")
+                if timeline_media:
+                    return timeline_media
+        
+        self.metrics.event("unexpected_response", "Error: Unexpected response structure", logging.ERROR)
+        return None
+    
+    def _record_page_outcome(self, proxy: Optional[Dict[str, str]], posts_data: dict):
+        """Feed the rate limiter: empty pages are treated like soft throttling"""
+        if posts_data.get("edges"):
+            self.rate_limiter.on_success(proxy_key(proxy))
+        else:
+            self.rate_limiter.on_throttle(proxy_key(proxy))
     
     def _get_media_type(self, node: dict) -> str:
         """Determine media type from node data"""
-        product_type = node.get("product_type", "")
-        if product_type == "clips":
-            return "REEL"
-        
-        media_type = node.get("media_type")
-        if media_type == 2:
-            return "VIDEO"
-        elif media_type == 8:
-            return "CAROUSEL"
-        elif media_type == 1:
-            return "IMAGE"
-        
-        if node.get("is_video"):
-            return "VIDEO"
-        elif node.get("carousel_media_count") or node.get("carousel_media"):
-            return "CAROUSEL"
-        
-        return "IMAGE"
+        return get_media_type(node)
     
     def _get_caption(self, node: dict) -> Optional[str]:
         """Extract caption from node data"""
-        caption = node.get("caption")
-        if caption:
-            if isinstance(caption, dict):
-                return caption.get("text")
-            return caption
-        
-        edges = node.get("edge_media_to_caption", {}).get("edges", [])
-        if edges and len(edges) > 0:
-            return edges[0].get("node", {}).get("text")
-        
-        return None
+        return get_caption(node)
     
     def _get_display_url(self, node: dict) -> Optional[str]:
         """Extract display URL from node data"""
-        img_versions = node.get("image_versions2", {}).get("candidates", [])
-        if img_versions:
-            return img_versions[0].get("url")
-        
-        return node.get("display_url")
+        return get_display_url(node)
     
     def _get_video_url(self, node: dict) -> Optional[str]:
         """Extract video URL from node data"""
-        video_versions = node.get("video_versions", [])
-        if video_versions:
-            return video_versions[0].get("url")
-        
-        return node.get("video_url")
+        return get_video_url(node)
     
     def _get_location(self, node: dict) -> Optional[dict]:
         """Extract location from node data"""
-        location = node.get("location")
-        if location:
-            return {
-                "id": location.get("id"),
-                "name": location.get("name"),
-                "slug": location.get("slug")
-            }
-        return None
+        return get_location(node)
     
     def save_profile_and_posts(self, profile: InstagramProfile, posts: List[InstagramPost], username: str):
         """Save profile and posts in one JSON file"""
@@ -336,4 +847,10 @@ class InstagramScraper:
         }
         
         with open(f"{username}_data.json", 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    def save_with_writer(self, writer: OutputWriter, profile: Optional[InstagramProfile], posts: List[InstagramPost]):
+        """Send profile and posts to a pluggable writer (ndjson, parquet, ...) as separate streams"""
+        if profile:
+            writer.write_profile(profile)
+        writer.write_posts(posts)
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Iterable, Tuple, AsyncIterator
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramProfile, InstagramPost, InstagramPagination
+from services.instagram_api import InstagramScraper, TimelineWalk
+from services.state_store import ScrapeStateStore
+from services.session_pool import proxy_key
+from services.rate_limiter import AdaptiveRateLimiter
+from services.proxy_pool import ProxyPool
+from services.response_cache import ResponseCache
+from services.metrics import Instrumentation
+from services.discovery import DiscoveryCrawler
+from services.retry import RetryEngine, FetchError
+from services.json_codec import JsonDecoder
+from services.identity_pool import IdentityPool
+
+
+class AsyncInstagramScraper:
+    """
+    Asyncio front-end for InstagramScraper that scrapes many usernames at once.
+
+    Blocking requests run on a thread pool sized to the global concurrency cap,
+    so the same parsing code produces the same InstagramProfile/InstagramPost models.
+    """
+
+    def __init__(
+        self,
+        proxies: Optional[List[Dict[str, str]]] = None,
+        max_concurrency: int = 50,
+        per_proxy_concurrency: int = 4,
+        state_store: Optional[ScrapeStateStore] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+        response_cache: Optional[ResponseCache] = None,
+        validation: str = "strict",
+        base_url: str = "https://www.instagram.com",
+        metrics: Optional[Instrumentation] = None,
+        discovery: Optional[DiscoveryCrawler] = None,
+        retry: Optional[RetryEngine] = None,
+        decoder: Optional[JsonDecoder] = None,
+        identities: Optional[IdentityPool] = None,
+    ):
+        # Size each proxy's connection pool to the number of in-flight requests it may carry
+        self.scraper = InstagramScraper(
+            proxies=proxies,
+            pool_maxsize=per_proxy_concurrency,
+            state_store=state_store,
+            rate_limiter=rate_limiter,
+            proxy_pool=proxy_pool,
+            response_cache=response_cache,
+            validation=validation,
+            base_url=base_url,
+            metrics=metrics,
+            discovery=discovery,
+            retry=retry,
+            decoder=decoder,
+            identities=identities,
+        )
+        self.max_concurrency = max_concurrency
+        self.per_proxy_concurrency = per_proxy_concurrency
+        self.rate_limiter = self.scraper.rate_limiter
+        self.metrics = self.scraper.metrics
+        self.retry = self.scraper.retry
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._proxy_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def _run(self, func, *args):
+        """Run a blocking scraper call under the global and per-proxy caps"""
+        # Never block the event loop waiting for a warm-up
+        identity = self.scraper.identities.acquire(wait=False) if self.scraper.identities else None
+        proxy = identity.proxy if identity else self.scraper.proxy_pool.acquire()
+        key = proxy_key(proxy)
+        proxy_limit = self._proxy_limits.setdefault(key, asyncio.Semaphore(self.per_proxy_concurrency))
+
+        # Wait for the proxy's token before taking a worker slot
+        await self.rate_limiter.acquire_async(key)
+
+        async with self._global_limit:
+            async with proxy_limit:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, func, *args, proxy, identity)
+
+    async def _load(self, endpoint: str, username: str, func, *args):
+        """_run retried through the retry engine, each attempt on a freshly picked proxy; None once it gives up"""
+        try:
+            return await self.retry.call_async(
+                self._run, func, *args, endpoint=endpoint, can_rotate=len(self.scraper.proxy_pool) > 1
+            )
+        except FetchError as e:
+            self.scraper._gave_up(endpoint, e, username)
+            return None
+
+    async def get_profile(self, username: str) -> Optional[InstagramProfile]:
+        """Fetch Instagram profile data"""
+        user = self.scraper._cached_profile_user(username) or await self._load(
+            "web_profile_info", username, self.scraper._fetch_profile_user, username
+        )
+        if not user:
+            return None
+
+        return self.scraper._parse_profile(user)
+
+    async def get_posts(self, username: str, max_posts: Optional[int] = 100, incremental: bool = False) -> List[InstagramPost]:
+        """
+        Fetch posts for one username. Pages are requested one after another
+        because each request needs the previous page's end_cursor.
+
+        Args:
+            username: Instagram username
+            max_posts: Maximum number of posts to fetch (None = all posts)
+            incremental: Stop at posts already recorded in the state store
+
+        Returns:
+            List of InstagramPost objects
+        """
+        all_posts = []
+        async for page_posts, _ in self.aiter_posts(username, max_posts=max_posts, incremental=incremental):
+            all_posts.extend(page_posts)
+
+        return all_posts
+
+    async def aiter_posts(
+        self,
+        username: str,
+        max_posts: Optional[int] = None,
+        end_cursor: Optional[str] = None,
+        incremental: bool = False,
+    ) -> AsyncIterator[Tuple[List[InstagramPost], InstagramPagination]]:
+        """
+        Async twin of InstagramScraper.iter_posts: yields each page as it arrives.
+
+        Args:
+            username: Instagram username
+            max_posts: Maximum number of posts to yield (None = all posts)
+            end_cursor: Cursor to resume pagination from (None = newest posts)
+            incremental: Stop at posts already recorded in the state store
+
+        Yields:
+            (posts on this page, pagination state after this page)
+        """
+        high_water = None
+        if incremental and self.scraper.state_store:
+            high_water = self.scraper.state_store.get(username)
+
+        outcome = {}
+        async for page in self._aiter_post_pages(username, max_posts, end_cursor, high_water, set(), outcome):
+            yield page
+
+        self.scraper._commit_high_water(username, outcome.get("newest"), outcome.get("complete", False), high_water)
+
+    async def _aiter_post_pages(
+        self,
+        username: str,
+        max_posts: Optional[int],
+        end_cursor: Optional[str],
+        high_water: Optional[dict],
+        seen_ids: set,
+        outcome: dict,
+    ):
+        """
+        Pagination loop behind aiter_posts; the per-page decisions are the sync
+        scraper's TimelineWalk. Async generators cannot return a value, so
+        "complete" and "newest" are written into the outcome dict instead.
+        """
+        walk = TimelineWalk(self.scraper, username, max_posts, end_cursor, high_water, seen_ids)
+        outcome["complete"] = False
+        outcome["newest"] = None
+
+        while not walk.done:
+            variables = walk.variables()
+            posts_data = self.scraper._cached_posts_page(variables) or await self._load(
+                "graphql", username, self.scraper._fetch_posts_page, variables
+            )
+            page = walk.advance(posts_data)
+            outcome["complete"], outcome["newest"] = walk.complete, walk.newest
+            if page:
+                yield page
+
+    async def get_profile_with_posts(
+        self, username: str, max_posts: Optional[int] = 100, incremental: bool = False
+    ) -> Tuple[Optional[InstagramProfile], List[InstagramPost]]:
+        """
+        Async twin of InstagramScraper.get_profile_with_posts: the first page of
+        posts comes from web_profile_info, GraphQL pagination continues from its cursor.
+        """
+        scraper = self.scraper
+        user = scraper._cached_profile_user(username) or await self._load(
+            "web_profile_info", username, scraper._fetch_profile_user, username
+        )
+        if not user:
+            return None, []
+
+        profile = scraper._parse_profile(user)
+
+        high_water = None
+        if incremental and scraper.state_store:
+            high_water = scraper.state_store.get(username)
+
+        seen_ids = set()
+        posts, complete, end_cursor = scraper._embedded_page(user, username, max_posts, high_water, seen_ids)
+        newest = scraper._newest_post(None, posts)
+
+        if end_cursor:
+            remaining = max_posts - len(posts) if max_posts else None
+            outcome = {}
+            async for page_posts, _ in self._aiter_post_pages(username, remaining, end_cursor, high_water, seen_ids, outcome):
+                posts.extend(page_posts)
+
+            complete = outcome["complete"]
+            if outcome["newest"]:
+                newest = scraper._newest_post(newest, [outcome["newest"]])
+
+        scraper._commit_high_water(username, newest, complete, high_water)
+        return profile, posts
+
+    async def scrape_username(
+        self, username: str, max_posts: Optional[int] = 100, incremental: bool = False
+    ) -> Tuple[Optional[InstagramProfile], List[InstagramPost]]:
+        """Fetch profile and posts for one username, saving a request via the embedded first page"""
+        return await self.get_profile_with_posts(username, max_posts=max_posts, incremental=incremental)
+
+    async def scrape_many(
+        self, usernames: Iterable[str], max_posts: Optional[int] = 100, incremental: bool = False
+    ) -> Dict[str, Tuple[Optional[InstagramProfile], List[InstagramPost]]]:
+        """
+        Scrape profile and posts for many usernames concurrently.
+
+        Args:
+            usernames: Instagram usernames (duplicates are scraped once)
+            max_posts: Maximum number of posts per username (None = all posts)
+            incremental: Stop each timeline at posts already recorded in the state store
+
+        Returns:
+            Dict of username -> (InstagramProfile or None, list of InstagramPost)
+        """
+        unique = list(dict.fromkeys(usernames))
+
+        results = await asyncio.gather(
+            *(self.scrape_username(username, max_posts=max_posts, incremental=incremental) for username in unique),
+            return_exceptions=True,
+        )
+
+        scraped = {}
+        for username, result in zip(unique, results):
+            if isinstance(result, Exception):
+                self.metrics.event(
+                    "scrape_failed", f"Error: @{username} failed - {result}", logging.ERROR,
+                    username=username, error=repr(result),
+                )
+                scraped[username] = (None, [])
+            else:
+                scraped[username] = result
+
+        return scraped
+
+    def close(self):
+        """Shut down the worker thread pool and pooled sessions"""
+        self._executor.shutdown(wait=False)
+        self.scraper.session_pool.close()
@@ -1,10 +1,26 @@
 import requests
 import re
-import json
-from typing import Optional, Dict, Any
+import logging
+import threading
+from typing import Optional, Dict, Any, Tuple, Union, TYPE_CHECKING
 from dataclasses import dataclass, asdict
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.rate_limiter import AdaptiveRateLimiter
+from services.proxy_pool import ProxyPool
+from services.session_pool import proxy_key, TimedHTTPAdapter
+from services.metrics import Instrumentation, proxy_label
+from services.html_extract import extract_user_from_scripts, find_user_in_json
+from services.retry import RetryEngine, FetchError
+from services import json_codec
+from services.identity_pool import IdentityPool
 import time
 
+if TYPE_CHECKING:
+    # html_parse_pool imports the parsing functions from this module
+    from services.html_parse_pool import HtmlParsePool
+
 
 @dataclass
 class InstagramProfile:
@@ -28,8 +44,32 @@ class InstagramProfile:
 class InstagramScraper:
     """Instagram scraper that parses embedded JSON from HTML pages"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+        base_url: str = "https://www.instagram.com",
+        metrics: Optional[Instrumentation] = None,
+        retry: Optional[RetryEngine] = None,
+        identities: Optional[IdentityPool] = None,
+        parse_pool: Optional["HtmlParsePool"] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.metrics = metrics or Instrumentation()
+        
+        # Share the limiter, proxy pool and retry engine with the API scraper to pace both against the same proxies
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.proxy_pool = proxy_pool or ProxyPool()
+        self.retry = retry or RetryEngine(metrics=self.metrics)
+        self.identities = identities
+        
+        # Parser processes for the HTML; without one, pages are parsed on the fetching thread
+        self.parse_pool = parse_pool
+        
         self.session = requests.Session()
+        adapter = TimedHTTPAdapter(self.metrics.record_connect)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
@@ -44,218 +84,301 @@ class InstagramScraper:
             "Cache-Control": "max-age=0",
         })
     
-    def get_profile(self, username: str, retry_count: int = 3) -> Optional[InstagramProfile]:
+    def get_profile(
+        self,
+        username: str,
+        retry_count: int = 3,
+        cancel: Optional[threading.Event] = None,
+        raise_not_found: bool = False,
+    ) -> Optional[InstagramProfile]:
         """
         Fetch Instagram profile by parsing embedded JSON from HTML page.
         
         Args:
             username: Instagram username
-            retry_count: Number of retry attempts
+            retry_count: Maximum attempts (the retry engine decides which failures are retried)
+            cancel: When set (e.g. another strategy already won), stop before the next attempt
+            raise_not_found: Raise the FetchError (status_code 404) for a missing profile instead of returning None
             
         Returns:
             InstagramProfile object or None if failed
         """
-        url = f"https://www.instagram.com/{username}/"
+        url = f"{self.base_url}/{username}/"
+        
+        try:
+            return self.retry.call(
+                self._fetch_profile, url, username, cancel,
+                endpoint="profile_html", can_rotate=len(self.proxy_pool) > 1,
+                cancel=cancel, max_attempts=retry_count,
+            )
+        except FetchError as e:
+            if raise_not_found and e.status_code == 404:
+                raise
+            if e.status_code != 404 and not (cancel and cancel.is_set()):
+                self.metrics.event(
+                    "request_failed", f"Error: profile_html for @{username} failed - {e}", logging.ERROR,
+                    endpoint="profile_html", username=username, status=e.status_code, error=str(e),
+                )
+            return None
+        except Exception as e:
+            self.metrics.event(
+                "unexpected_error", f"Unexpected Error: {e}", logging.ERROR, username=username, error=repr(e)
+            )
+            return None
+    
+    def _fetch_profile(self, url: str, username: str, cancel: Optional[threading.Event]) -> InstagramProfile:
+        """One paced attempt through the next identity or proxy; raises FetchError on failure"""
+        identity = self.identities.acquire() if self.identities else None
+        proxy = identity.proxy if identity else self.proxy_pool.acquire()
+        session = identity.session if identity else self.session
+        # The identity's UA and client hints replace ours; its cookie jar rides on its session
+        headers = {**self.session.headers, **identity.fingerprint} if identity else None
+        rate_key = proxy_key(proxy)
+        
+        # Throttling below slows later attempts through this proxy
+        self.rate_limiter.acquire(rate_key)
+        if cancel and cancel.is_set():
+            raise FetchError("Cancelled")
+        started = time.monotonic()
         
-        for attempt in range(retry_count):
-            try:
-                print(f"\n[Attempt {attempt + 1}/{retry_count}] Fetching profile: @{username}")
-                
-                response = self.session.get(url, timeout=15)
-                response.raise_for_status()
-                
-                html = response.text
-                
-                # Try multiple extraction methods
-                user_data = self._extract_user_data(html, username)
-                
-                if not user_data:
-                    print(f"⚠️ Could not extract user data from HTML")
-                    if attempt < retry_count - 1:
-                        wait_time = 2 ** attempt  # Exponential backoff
-                        print(f"Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        continue
-                    return None
-                
-                # Parse and create profile
-                profile = self._parse_profile(user_data, username)
-                print(f"✅ Successfully scraped @{username}")
-                return profile
-                
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    print(f"❌ Profile not found: @{username}")
-                    return None
-                elif e.response.status_code == 429:
-                    print(f"⚠️ Rate limited. Waiting before retry...")
-                    time.sleep(5 * (attempt + 1))
-                else:
-                    print(f"❌ HTTP Error {e.response.status_code}: {e}")
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Request Error: {e}")
-                
-            except Exception as e:
-                print(f"❌ Unexpected Error: {e}")
+        try:
+            self.metrics.event(
+                "attempt", f"Fetching profile: @{username}", logging.DEBUG, username=username, proxy=proxy_label(rate_key),
+            )
+            
+            with self.metrics.stage("fetch", endpoint="profile_html"):
+                response = session.get(url, proxies=proxy, headers=headers, timeout=15)
+            self.metrics.record_response("profile_html", rate_key, response, started)
+            response.raise_for_status()
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=True)
             
-            if attempt < retry_count - 1:
-                wait_time = 2 ** attempt
-                print(f"Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=status_code == 404, status_code=status_code)
+            if identity:
+                self.identities.report(identity, ok=False, status_code=status_code)
+            if status_code == 404:
+                self.metrics.event("not_found", f"Profile not found: @{username}", logging.WARNING, username=username)
+            elif status_code == 429:
+                self.metrics.event(
+                    "rate_limited", f"Rate limited on @{username}. Switching proxy before retry...", logging.WARNING,
+                    username=username, proxy=proxy_label(rate_key),
+                )
+                self.rate_limiter.on_throttle(rate_key)
+            else:
+                self.metrics.event(
+                    "http_error", f"HTTP Error {status_code}: {e}", logging.WARNING,
+                    endpoint="profile_html", status=status_code, username=username,
+                )
+            raise FetchError(f"HTTP {status_code} from profile_html", status_code) from e
+            
+        except requests.exceptions.RequestException as e:
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=False)
+            self.metrics.record_request("profile_html", rate_key, "error", None, time.monotonic() - started)
+            self.metrics.event(
+                "request_error", f"Request Error: {e}", logging.WARNING,
+                endpoint="profile_html", username=username, error=repr(e),
+            )
+            raise FetchError(str(e)) from e
+        
+        # Try multiple extraction methods
+        if self.parse_pool:
+            # Raw bytes: decoding happens in the parser process too
+            profile, method, parse_time = self.parse_pool.parse(response.content, username, response.encoding)
+        else:
+            profile, method, parse_time = parse_profile_html(response.text, username)
+        self.metrics.parse.observe(parse_time, kind="profile_html")
+        if method:
+            self.metrics.event("extracted", EXTRACTED_MESSAGES[method], logging.DEBUG, method=method)
         
-        return None
+        if not profile:
+            self.metrics.event(
+                "extract_failed", f"Could not extract user data from HTML for @{username}", logging.WARNING,
+                username=username, bytes=len(response.content),
+            )
+            # Usually a login wall or challenge page: a soft block
+            self.rate_limiter.on_throttle(rate_key)
+            if identity:
+                self.identities.report(identity, ok=False)
+            raise FetchError("Could not extract user data from HTML")
+        
+        self.rate_limiter.on_success(rate_key)
+        if identity:
+            self.identities.report(identity, ok=True, response=response)
+        self.metrics.event("profile_scraped", f"Successfully scraped @{username}", username=username)
+        return profile
     
     def _extract_user_data(self, html: str, username: str) -> Optional[Dict[str, Any]]:
         """
         Extract user data from HTML using multiple methods.
         Instagram frequently changes their HTML structure.
         """
-        # Method 1: window._sharedData (legacy format)
-        user_data = self._try_shared_data(html)
-        if user_data:
-            print("📦 Found data in window._sharedData")
-            return user_data
-        
-        # Method 2: <script type="application/json"> tags (current format)
-        user_data = self._try_json_scripts(html, username)
+        user_data, method = extract_user_data(html, username)
         if user_data:
-            print("📦 Found data in JSON script tags")
-            return user_data
-        
-        # Method 3: ld+json schema
-        user_data = self._try_ld_json(html, username)
-        if user_data:
-            print("📦 Found data in ld+json schema")
-            return user_data
-        
-        return None
+            self.metrics.event("extracted", EXTRACTED_MESSAGES[method], logging.DEBUG, method=method)
+        return user_data
     
     def _try_shared_data(self, html: str) -> Optional[Dict[str, Any]]:
         """Extract from window._sharedData (older Instagram format)"""
-        try:
-            pattern = r'window\._sharedData\s*=\s*({.+?});>'
-            match = re.search(pattern, html, re.DOTALL)
-            
-            if match:
-                data = json.loads(match.group(1))
-                user = data.get('entry_data', {}).get('ProfilePage', [{}])[0].get('graphql', {}).get('user')
-                return user
-        except Exception as e:
-            pass
-        
-        return None
+        return try_shared_data(html)
     
     def _try_json_scripts(self, html: str, username: str) -> Optional[Dict[str, Any]]:
         """Extract from <script type="application/json"> tags (newer format)"""
-        try:
-            # Find all JSON script tags
-            pattern = r'<script type="application/json"[^>]*>({.+?})</script>'
-            matches = re.findall(pattern, html, re.DOTALL)
-            
-            for match in matches:
-                try:
-                    data = json.loads(match)
-                    # Recursively search for user data
-                    user_data = self._find_user_in_json(data, username)
-                    if user_data:
-                        return user_data
-                except json.JSONDecodeError:
-                    continue
-        except Exception:
-            pass
-        
-        return None
+        return try_json_scripts(html, username)
     
     def _try_ld_json(self, html: str, username: str) -> Optional[Dict[str, Any]]:
         """Extract from ld+json schema (limited data)"""
-        try:
-            pattern = r'<script type="application/ld\+json">({.+?})</script>'
-            match = re.search(pattern, html, re.DOTALL)
-            
-            if match:
-                data = json.loads(match.group(1))
-                # This format has very limited data, mainly for SEO
-                # Return a minimal structure if it matches the username
-                if data.get('mainEntityOfPage', {}).get('url', '').endswith(f'/{username}/'):
-                    return {
-                        'username': username,
-                        'full_name': data.get('name'),
-                        'biography': data.get('description'),
-                    }
-        except Exception:
-            pass
-        
-        return None
+        return try_ld_json(html, username)
     
     def _find_user_in_json(self, data: Any, username: str) -> Optional[Dict[str, Any]]:
         """
-        Recursively search nested JSON for user profile data.
+        Search nested JSON for user profile data.
         Looks for objects with username and follower data.
         """
-        if isinstance(data, dict):
-            # Check if this is user profile data
-            if (data.get('username') == username and 
-                ('edge_followed_by' in data or 'follower_count' in data)):
-                return data
-            
-            # Recursively check all values
-            for key, value in data.items():
-                result = self._find_user_in_json(value, username)
-                if result:
-                    return result
-        
-        elif isinstance(data, list):
-            for item in data:
-                result = self._find_user_in_json(item, username)
-                if result:
-                    return result
-        
-        return None
+        return find_user_in_json(data, username)
     
     def _parse_profile(self, user_data: Dict[str, Any], username: str) -> InstagramProfile:
         """Parse user data into InstagramProfile object"""
+        return parse_profile(user_data, username)
+
+
+# Module-level so the extraction can also run in a parser process (see html_parse_pool)
+
+EXTRACTED_MESSAGES = {
+    "shared_data": "Found data in window._sharedData",
+    "json_scripts": "Found data in JSON script tags",
+    "ld_json": "Found data in ld+json schema",
+}
+
+
+def try_shared_data(html: str) -> Optional[Dict[str, Any]]:
+    """Extract from window._sharedData (older Instagram format)"""
+    try:
+        pattern = r'window\._sharedData\s*=\s*({.+?});>'
+        match = re.search(pattern, html, re.DOTALL)
         
-        # Handle different data structures
-        follower_count = 0
-        following_count = 0
-        posts_count = 0
-        
-        # Try edge_followed_by format (GraphQL)
-        if 'edge_followed_by' in user_data:
-            follower_count = user_data['edge_followed_by'].get('count', 0)
-        elif 'follower_count' in user_data:
-            follower_count = user_data['follower_count']
-        
-        if 'edge_follow' in user_data:
-            following_count = user_data['edge_follow'].get('count', 0)
-        elif 'following_count' in user_data:
-            following_count = user_data['following_count']
-        
-        if 'edge_owner_to_timeline_media' in user_data:
-            posts_count = user_data['edge_owner_to_timeline_media'].get('count', 0)
-        elif 'media_count' in user_data:
-            posts_count = user_data['media_count']
-        
-        # Get profile picture URL (try HD first, fallback to regular)
-        profile_pic = (user_data.get('profile_pic_url_hd') or 
-                      user_data.get('profile_pic_url'))
-        
-        # Get category (try multiple fields)
-        category = (user_data.get('category_name') or 
-                   user_data.get('business_category_name') or
-                   user_data.get('category'))
+        if match:
+            data = json_codec.loads(match.group(1))
+            user = data.get('entry_data', {}).get('ProfilePage', [{}])[0].get('graphql', {}).get('user')
+            return user
+    except Exception as e:
+        pass
+    
+    return None
+
+
+def try_json_scripts(html: str, username: str) -> Optional[Dict[str, Any]]:
+    """Extract from <script type="application/json"> tags (newer format)"""
+    try:
+        return extract_user_from_scripts(html, username)
+    except Exception:
+        pass
+    
+    return None
+
+
+def try_ld_json(html: str, username: str) -> Optional[Dict[str, Any]]:
+    """Extract from ld+json schema (limited data)"""
+    try:
+        pattern = r'<script type="application/ld\+json">({.+?})</script>'
+        match = re.search(pattern, html, re.DOTALL)
         
-        return InstagramProfile(
-            username=user_data.get('username', username),
-            full_name=user_data.get('full_name'),
-            biography=user_data.get('biography'),
-            follower_count=follower_count,
-            following_count=following_count,
-            posts_count=posts_count,
-            profile_picture_url=profile_pic,
-            is_verified=user_data.get('is_verified', False),
-            category=category,
-            external_url=user_data.get('external_url'),
-        )
+        if match:
+            data = json_codec.loads(match.group(1))
+            # This format has very limited data, mainly for SEO
+            # Return a minimal structure if it matches the username
+            if data.get('mainEntityOfPage', {}).get('url', '').endswith(f'/{username}/'):
+                return {
+                    'username': username,
+                    'full_name': data.get('name'),
+                    'biography': data.get('description'),
+                }
+    except Exception:
+        pass
+    
+    return None
 
+
+def extract_user_data(html: str, username: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Try each extraction method in turn; returns (user data, method that found it)"""
+    # Method 1: window._sharedData (legacy format)
+    user_data = try_shared_data(html)
+    if user_data:
+        return user_data, "shared_data"
+    
+    # Method 2: <script type="application/json"> tags (current format)
+    user_data = try_json_scripts(html, username)
+    if user_data:
+        return user_data, "json_scripts"
+    
+    # Method 3: ld+json schema
+    user_data = try_ld_json(html, username)
+    if user_data:
+        return user_data, "ld_json"
+    
+    return None, None
+
+
+def parse_profile(user_data: Dict[str, Any], username: str) -> InstagramProfile:
+    """Parse user data into InstagramProfile object"""
+    
+    # Handle different data structures
+    follower_count = 0
+    following_count = 0
+    posts_count = 0
+    
+    # Try edge_followed_by format (GraphQL)
+    if 'edge_followed_by' in user_data:
+        follower_count = user_data['edge_followed_by'].get('count', 0)
+    elif 'follower_count' in user_data:
+        follower_count = user_data['follower_count']
+    
+    if 'edge_follow' in user_data:
+        following_count = user_data['edge_follow'].get('count', 0)
+    elif 'following_count' in user_data:
+        following_count = user_data['following_count']
+    
+    if 'edge_owner_to_timeline_media' in user_data:
+        posts_count = user_data['edge_owner_to_timeline_media'].get('count', 0)
+    elif 'media_count' in user_data:
+        posts_count = user_data['media_count']
+    
+    # Get profile picture URL (try HD first, fallback to regular)
+    profile_pic = (user_data.get('profile_pic_url_hd') or 
+                  user_data.get('profile_pic_url'))
+    
+    # Get category (try multiple fields)
+    category = (user_data.get('category_name') or 
+               user_data.get('business_category_name') or
+               user_data.get('category'))
+    
+    return InstagramProfile(
+        username=user_data.get('username', username),
+        full_name=user_data.get('full_name'),
+        biography=user_data.get('biography'),
+        follower_count=follower_count,
+        following_count=following_count,
+        posts_count=posts_count,
+        profile_picture_url=profile_pic,
+        is_verified=user_data.get('is_verified', False),
+        category=category,
+        external_url=user_data.get('external_url'),
+    )
+
+
+def parse_profile_html(
+    body: Union[str, bytes],
+    username: str,
+    encoding: Optional[str] = None,
+) -> Tuple[Optional[InstagramProfile], Optional[str], float]:
+    """
+    Decode, extract and parse one profile page.
+    
+    Returns:
+        (InstagramProfile or None, extraction method, parse seconds)
+    """
+    started = time.perf_counter()
+    html = body.decode(encoding or "utf-8", errors="replace") if isinstance(body, bytes) else body
+    user_data, method = extract_user_data(html, username)
+    profile = parse_profile(user_data, username) if user_data else None
+    return profile, method, time.perf_counter() - started
@@ -0,0 +1,301 @@
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.instagram_api import InstagramScraper
+from services.writers import OutputWriter
+
+JOB_KINDS = ("profile", "posts")
+
+
+@dataclass
+class LeasedJob:
+    """A job currently leased by one worker"""
+    job_id: str
+    kind: str
+    username: str
+    start_cursor: Optional[str]
+    max_pages: Optional[int]
+    attempts: int
+
+
+class LeaseQueue:
+    """
+    Shared job queue with visibility-timeout leases (SQLite stand-in for a
+    shared backend such as Redis).
+
+    A leased job stays invisible to other workers until its lease expires; the
+    owner extends it with heartbeat(). Jobs whose lease expires (crashed or
+    stalled worker) become leasable again, up to max_attempts.
+    """
+
+    def __init__(self, path: str = "lease_queue.db", max_attempts: int = 5):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lease_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    start_cursor TEXT,
+                    max_pages INTEGER,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lease_jobs_status ON lease_jobs (status, lease_expires)")
+
+    def enqueue(
+        self,
+        kind: str,
+        username: str,
+        start_cursor: Optional[str] = None,
+        max_pages: Optional[int] = None,
+    ) -> str:
+        """
+        Add a job. The id is derived from kind/username/cursor, so enqueueing a
+        range that is already pending or leased is a no-op; a range that finished
+        (done or failed) is reset to pending so it can be scraped again.
+
+        Args:
+            kind: "profile" or "posts"
+            username: Instagram username
+            start_cursor: For posts jobs, the end_cursor to start paginating from
+            max_pages: For posts jobs, how many pages this job covers (None = to the end)
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = f"{kind}:{username}:{start_cursor or ''}"
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO lease_jobs (job_id, kind, username, start_cursor, max_pages, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = 'pending', max_pages = excluded.max_pages, attempts = 0,
+                    lease_owner = NULL, lease_expires = NULL, created_at = excluded.created_at
+                WHERE lease_jobs.status IN ('done', 'failed')
+                """,
+                (job_id, kind, username, start_cursor, max_pages, time.time()),
+            )
+        return job_id
+
+    def lease(self, worker_id: str, visibility_timeout: float = 120.0) -> Optional[LeasedJob]:
+        """Lease the oldest pending job, or one whose previous lease has expired"""
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used up their attempts are parked as failed
+                self._conn.execute(
+                    """
+                    UPDATE lease_jobs SET status = 'failed', lease_owner = NULL
+                    WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                    """,
+                    (now, self.max_attempts),
+                )
+                row = self._conn.execute(
+                    """
+                    SELECT job_id, kind, username, start_cursor, max_pages, attempts FROM lease_jobs
+                    WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+
+                if row:
+                    self._conn.execute(
+                        """
+                        UPDATE lease_jobs
+                        SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                        WHERE job_id = ?
+                        """,
+                        (worker_id, now + visibility_timeout, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if not row:
+            return None
+        job_id, kind, username, start_cursor, max_pages, attempts = row
+        return LeasedJob(job_id, kind, username, start_cursor, max_pages, attempts + 1)
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = 120.0) -> bool:
+        """Extend a lease; returns False if the worker no longer owns the job"""
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE lease_jobs SET lease_expires = ?
+                WHERE job_id = ? AND lease_owner = ? AND status = 'leased'
+                """,
+                (time.time() + visibility_timeout, job_id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a job done; returns False if the lease was lost meanwhile"""
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE lease_jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL
+                WHERE job_id = ? AND lease_owner = ? AND status = 'leased'
+                """,
+                (job_id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def release(self, job_id: str, worker_id: str):
+        """Give a job back after a failure so another worker can retry it"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE lease_jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_owner = NULL, lease_expires = NULL
+                WHERE job_id = ? AND lease_owner = ?
+                """,
+                (self.max_attempts, job_id, worker_id),
+            )
+
+    def counts(self):
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM lease_jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseWorker:
+    """
+    One node in multi-worker mode: leases jobs, keeps the lease alive with a
+    heartbeat thread while scraping, and writes results through an idempotent
+    writer (e.g. SqliteWriter) so a job re-run after a crash never duplicates rows.
+
+    A posts job covers up to pages_per_job pages; if the timeline continues,
+    the follow-up range is enqueued from the last end_cursor.
+    """
+
+    def __init__(
+        self,
+        scraper: InstagramScraper,
+        queue: LeaseQueue,
+        writer: OutputWriter,
+        worker_id: Optional[str] = None,
+        visibility_timeout: float = 120.0,
+        heartbeat_interval: float = 30.0,
+        pages_per_job: int = 10,
+        poll_interval: float = 5.0,
+    ):
+        self.scraper = scraper
+        self.queue = queue
+        self.writer = writer
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.pages_per_job = pages_per_job
+        self.poll_interval = poll_interval
+
+    def _heartbeat(self, job: LeasedJob, done: threading.Event, lost: threading.Event):
+        while not done.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job.job_id, self.worker_id, self.visibility_timeout):
+                lost.set()
+                return
+
+    def _execute(self, job: LeasedJob, lost: threading.Event) -> bool:
+        if job.kind == "profile":
+            profile = self.scraper.get_profile(job.username)
+            if not profile:
+                return False
+            self.writer.write_profile(profile)
+            return True
+
+        max_pages = job.max_pages or self.pages_per_job
+        pages = self.scraper.iter_pages(job.username, end_cursor=job.start_cursor, with_profile=False)
+        page_count = 0
+
+        while True:
+            try:
+                _, page_posts, pagination = next(pages)
+            except StopIteration as stop:
+                # False when a page failed to fetch: the whole range is retried
+                return stop.value
+
+            if lost.is_set():
+                return False
+
+            self.writer.write_posts(page_posts)
+            page_count += 1
+
+            if page_count >= max_pages:
+                pages.close()
+                if pagination.has_next_page and pagination.end_cursor:
+                    self.queue.enqueue("posts", job.username, start_cursor=pagination.end_cursor, max_pages=job.max_pages)
+                return True
+
+    def run_job(self, job: LeasedJob) -> bool:
+        """Execute one leased job under a heartbeat; returns True if it completed"""
+        done = threading.Event()
+        lost = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, done, lost), daemon=True)
+        beat.start()
+
+        try:
+            ok = self._execute(job, lost)
+        except Exception as e:
+            self.scraper.metrics.event(
+                "job_failed", f"Error: job {job.job_id} failed - {e}", logging.ERROR,
+                job_id=job.job_id, worker_id=self.worker_id, error=repr(e),
+            )
+            ok = False
+        finally:
+            done.set()
+            beat.join()
+
+        if lost.is_set():
+            self.scraper.metrics.event(
+                "lease_lost", f"Warning: lost lease on {job.job_id}; another worker will redo it", logging.WARNING,
+                job_id=job.job_id, worker_id=self.worker_id,
+            )
+            return False
+
+        if ok:
+            return self.queue.complete(job.job_id, self.worker_id)
+
+        self.queue.release(job.job_id, self.worker_id)
+        return False
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None):
+        """Lease and run jobs until stop_event is set"""
+        stop_event = stop_event or threading.Event()
+
+        while not stop_event.is_set():
+            job = self.queue.lease(self.worker_id, self.visibility_timeout)
+            if not job:
+                stop_event.wait(self.poll_interval)
+                continue
+            self.run_job(job)
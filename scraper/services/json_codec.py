@@ -0,0 +1,176 @@
+import json
+from typing import Optional, List, Dict, Any, Union, Callable, TypedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Fastest first; "auto" picks the first one installed
+BACKENDS = ("orjson", "msgspec", "json")
+
+# Responses with a projection schema
+KINDS = ("graphql", "web_profile_info")
+
+
+# Projection schemas: only the keys post_mapper, discovery and _parse_profile read.
+# msgspec skips every other key (and whole sub-trees under them) without building
+# Python objects, and decodes TypedDicts straight to plain dicts, so the mappers
+# run unchanged. The functional syntax is needed for keys like "__typename" and "in".
+_Url = TypedDict("_Url", {"url": Optional[str]}, total=False)
+_Count = TypedDict("_Count", {"count": Optional[int]}, total=False)
+_Text = TypedDict("_Text", {"text": Optional[str]}, total=False)
+_TextEdge = TypedDict("_TextEdge", {"node": _Text}, total=False)
+_TextEdges = TypedDict("_TextEdges", {"edges": List[_TextEdge]}, total=False)
+_Username = TypedDict("_Username", {"username": Optional[str]}, total=False)
+_UserRef = TypedDict("_UserRef", {"user": Optional[_Username]}, total=False)
+_UserRefEdge = TypedDict("_UserRefEdge", {"node": _UserRef}, total=False)
+_UserRefEdges = TypedDict("_UserRefEdges", {"edges": List[_UserRefEdge]}, total=False)
+_Usertags = TypedDict("_Usertags", {"in": List[_UserRef]}, total=False)
+_ImageVersions = TypedDict("_ImageVersions", {"candidates": List[_Url]}, total=False)
+_Location = TypedDict(
+    "_Location", {"id": Union[int, str, None], "name": Optional[str], "slug": Optional[str]}, total=False
+)
+_Node = TypedDict("_Node", {
+    "__typename": Optional[str],
+    "id": Union[int, str, None],
+    "pk": Union[int, str, None],
+    "code": Optional[str],
+    "shortcode": Optional[str],
+    "product_type": Optional[str],
+    "media_type": Optional[int],
+    "is_video": Optional[bool],
+    "taken_at": Optional[int],
+    "taken_at_timestamp": Optional[int],
+    "caption": Union[_Text, str, None],
+    "edge_media_to_caption": _TextEdges,
+    "like_count": Optional[int],
+    "comment_count": Optional[int],
+    "view_count": Optional[int],
+    "video_view_count": Optional[int],
+    "edge_liked_by": Optional[_Count],
+    "edge_media_preview_like": Optional[_Count],
+    "edge_media_to_comment": _Count,
+    "image_versions2": _ImageVersions,
+    "display_url": Optional[str],
+    "video_versions": List[_Url],
+    "video_url": Optional[str],
+    "location": Optional[_Location],
+    "carousel_media_count": Optional[int],
+    "carousel_media": Optional[List["_Node"]],
+    "edge_sidecar_to_children": "_NodeEdges",
+    "usertags": Optional[_Usertags],
+    "coauthor_producers": Optional[List[_Username]],
+    "edge_media_to_tagged_user": Optional[_UserRefEdges],
+    "timeline_pinned_user_ids": Any,
+    "pinned_for_users": Any,
+}, total=False)
+_NodeEdge = TypedDict("_NodeEdge", {"node": _Node}, total=False)
+_NodeEdges = TypedDict("_NodeEdges", {"edges": List[_NodeEdge]}, total=False)
+_Timeline = TypedDict("_Timeline", {"edges": List[_NodeEdge], "page_info": Any, "count": Optional[int]}, total=False)
+_ProfileUser = TypedDict("_ProfileUser", {
+    "username": str,
+    "full_name": Optional[str],
+    "biography": Optional[str],
+    "edge_followed_by": _Count,
+    "edge_follow": _Count,
+    "edge_owner_to_timeline_media": _Timeline,
+    "profile_pic_url": Optional[str],
+    "profile_pic_url_hd": Optional[str],
+    "is_verified": Optional[bool],
+    "category_name": Optional[str],
+    "business_category_name": Optional[str],
+    "external_url": Optional[str],
+}, total=False)
+_GraphqlData = TypedDict("_GraphqlData", {
+    "xdt_api__v1__feed__user_timeline_graphql_connection": Optional[_Timeline],
+    "user": Optional[_ProfileUser],
+}, total=False)
+_GraphqlResponse = TypedDict(
+    "_GraphqlResponse", {"data": Optional[_GraphqlData], "errors": Any, "status": Any, "message": Any}, total=False
+)
+_ProfileData = TypedDict("_ProfileData", {"user": Optional[_ProfileUser]}, total=False)
+_ProfileResponse = TypedDict(
+    "_ProfileResponse", {"data": Optional[_ProfileData], "status": Any, "message": Any}, total=False
+)
+
+_SCHEMAS = {"graphql": _GraphqlResponse, "web_profile_info": _ProfileResponse}
+
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+    installed = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+    return [name for name in BACKENDS if installed[name]]
+
+
+class JsonDecoder:
+    """
+    Decodes response bodies with the fastest installed backend (orjson, msgspec,
+    then the stdlib), raising ValueError on bad input whichever is used.
+
+    With projection=True (needs msgspec), decode() of a "graphql" or
+    "web_profile_info" body keeps only the fields the scrapers read, skipping
+    e.g. the image_versions2 candidate sizes and the rest of each node. A body
+    that doesn't fit the schema falls back to a full decode.
+    """
+
+    def __init__(self, backend: str = "auto", projection: bool = False):
+        if backend == "auto":
+            backend = available_backends()[0]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        if backend not in available_backends():
+            raise ImportError(f"The '{backend}' JSON backend is not installed")
+        if projection and msgspec is None:
+            raise ImportError("Projection decoding requires the 'msgspec' package")
+
+        self.backend = backend
+        self.projection = projection
+        self.loads: Callable[[Union[bytes, str]], Any] = self._make_loads(backend)
+        self._projections: Dict[str, Any] = {}
+        if projection:
+            self._projections = {kind: msgspec.json.Decoder(schema) for kind, schema in _SCHEMAS.items()}
+
+    def _make_loads(self, backend: str) -> Callable[[Union[bytes, str]], Any]:
+        if backend == "orjson":
+            # orjson.JSONDecodeError already subclasses ValueError
+            return orjson.loads
+        if backend == "json":
+            return json.loads
+
+        decoder = msgspec.json.Decoder()
+
+        def loads(data: Union[bytes, str]) -> Any:
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+
+        return loads
+
+    def decode(self, data: Union[bytes, str], kind: Optional[str] = None) -> Any:
+        """Decode a response body; kind ("graphql" / "web_profile_info") enables its projection"""
+        projection = self._projections.get(kind)
+        if projection is None:
+            return self.loads(data)
+
+        try:
+            return projection.decode(data)
+        except msgspec.ValidationError:
+            # Valid JSON in an unexpected shape: keep every field and let the caller judge it
+            return self.loads(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+_default = JsonDecoder()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode with the fastest installed backend (no projection)"""
+    return _default.loads(data)
@@ -0,0 +1,421 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+import requests
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramPost
+from services.session_pool import SessionPool, proxy_key
+from services.proxy_pool import ProxyPool
+from services.metrics import Instrumentation
+
+
+@dataclass
+class MediaResult:
+    """Outcome for one media URL of one post"""
+    url: str
+    status: str  # downloaded, deduplicated, cached or failed
+    sha256: Optional[str] = None
+    path: Optional[str] = None
+    size: int = 0
+    instagram_id: Optional[str] = None
+    kind: Optional[str] = None
+    position: int = 0
+
+
+def media_key(url: str) -> str:
+    """
+    Identity of a CDN URL: host-independent path without the query string, which
+    carries signatures and expiry (oh=, oe=) that change between scrapes.
+    """
+    return urlsplit(url).path
+
+
+class MediaDownloader:
+    """
+    Downloads post media concurrently into a content-addressed store.
+
+    Bodies stream to {output_dir}/partial/ in chunks while being hashed, then
+    move to {output_dir}/objects/ab/<sha256>.<ext>; media whose content is
+    already stored (reposts, the same file under another URL) is kept once.
+    A partial file left by an interrupted download is resumed with an HTTP
+    Range request. media.db maps URLs and post media slots to hashes, so media
+    already fetched is skipped without a request.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "media",
+        workers: int = 8,
+        chunk_size: int = 256 * 1024,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        proxy_pool: Optional[ProxyPool] = None,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.proxy_pool = proxy_pool or ProxyPool()
+        self.metrics = metrics or Instrumentation()
+
+        self.objects_dir = os.path.join(output_dir, "objects")
+        self.partial_dir = os.path.join(output_dir, "partial")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+        self.session_pool = SessionPool(
+            headers={
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+                # Byte ranges and Content-Length must refer to the stored bytes
+                "Accept-Encoding": "identity",
+            },
+            pool_maxsize=workers,
+            on_connect=self.metrics.record_connect,
+        )
+        self.proxy_pool.add_remove_hook(self.session_pool.remove)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        self._conn = sqlite3.connect(os.path.join(output_dir, "media.db"), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS media (
+                    url_key TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    downloaded_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS post_media (
+                    instagram_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY (instagram_id, kind, position)
+                )
+                """
+            )
+
+    def download_posts(self, posts: Iterable[InstagramPost]) -> List[MediaResult]:
+        """Download every display and video URL of the given posts; see iter_download_posts"""
+        return list(self.iter_download_posts(posts))
+
+    def iter_download_posts(self, posts: Iterable[InstagramPost]) -> Iterator[MediaResult]:
+        """
+        Download every display and video URL of the given posts, yielding each
+        MediaResult as it finishes (completion order, not input order).
+
+        posts is consumed lazily with at most 2 x workers downloads queued, and
+        only those are held in memory, so a streaming source (e.g. pages from
+        iter_posts) is never buffered whole. Each post -> hash link is written
+        as soon as its download finishes.
+        """
+        slots = threading.BoundedSemaphore(self.workers * 2)
+        finished: "queue.Queue[MediaResult]" = queue.Queue()
+        outstanding = 0
+
+        for post, kind, position, url in self._media_slots(posts):
+            slots.acquire()
+            future = self._submit(url)
+            future.add_done_callback(self._on_slot_done(slots, finished, url, post.instagram_id, kind, position))
+            outstanding += 1
+
+            while True:
+                try:
+                    result = finished.get_nowait()
+                except queue.Empty:
+                    break
+                outstanding -= 1
+                yield result
+
+        while outstanding:
+            yield finished.get()
+            outstanding -= 1
+
+    def _on_slot_done(
+        self,
+        slots: threading.BoundedSemaphore,
+        finished: "queue.Queue[MediaResult]",
+        url: str,
+        instagram_id: str,
+        kind: str,
+        position: int,
+    ):
+        """Done-callback for one post media slot: link it to its hash and hand the result over"""
+        def done(future: Future):
+            try:
+                result = future.result()
+                result = MediaResult(result.url, result.status, result.sha256, result.path, result.size,
+                                     instagram_id, kind, position)
+                if result.sha256:
+                    self._link(instagram_id, kind, position, result.sha256)
+            except Exception as e:
+                self.metrics.event(
+                    "media_failed", f"Error: media for {instagram_id} failed - {e!r}", logging.ERROR,
+                    url_key=media_key(url), instagram_id=instagram_id, error=repr(e),
+                )
+                result = MediaResult(url, "failed", instagram_id=instagram_id, kind=kind, position=position)
+            finally:
+                slots.release()
+            finished.put(result)
+        return done
+
+    def download(self, url: str) -> MediaResult:
+        """Download a single URL (blocking)"""
+        return self._submit(url).result()
+
+    def _media_slots(self, posts: Iterable[InstagramPost]) -> Iterator[Tuple[InstagramPost, str, int, str]]:
+        for post in posts:
+            for position, url in enumerate(post.display_urls):
+                yield post, "display", position, url
+            for position, url in enumerate(post.video_urls):
+                yield post, "video", position, url
+
+    def _submit(self, url: str) -> Future:
+        """One download per URL key at a time; concurrent callers share the future"""
+        key = media_key(url)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._download, url)
+            self._inflight[key] = future
+        # Outside the lock: an already finished future runs the callback right here
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: str, future: Future):
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _download(self, url: str) -> MediaResult:
+        key = media_key(url)
+        known = self._lookup(key)
+        if known and os.path.exists(known[1]):
+            return MediaResult(url, "cached", known[0], known[1], known[2])
+
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        partial = os.path.join(self.partial_dir, name + ".part")
+        meta_path = os.path.join(self.partial_dir, name + ".json")
+
+        for attempt in range(self.max_retries):
+            try:
+                fetched = self._fetch(url, partial, meta_path)
+            except requests.exceptions.RequestException as e:
+                self.metrics.event(
+                    "media_error", f"Media download error (attempt {attempt + 1}): {e}", logging.WARNING,
+                    url_key=key, attempt=attempt + 1, error=repr(e),
+                )
+                time.sleep(min(2 ** attempt, 10))
+                continue
+            except Exception as e:
+                # e.g. a truncated partial-meta file: start over on the next run
+                self.metrics.event(
+                    "media_failed", f"Error: media download failed - {e!r}", logging.ERROR,
+                    url_key=key, error=repr(e),
+                )
+                self._discard(partial, meta_path)
+                break
+
+            if fetched is None:
+                break
+            digest, size, content_type = fetched
+            return self._store(url, key, partial, meta_path, digest, size, content_type)
+
+        return MediaResult(url, "failed")
+
+    def _fetch(self, url: str, partial: str, meta_path: str) -> Optional[Tuple[str, int, Optional[str]]]:
+        """
+        Stream url into the partial file, resuming from its current size.
+
+        Returns (sha256, size, content type), None for a permanent failure; raises
+        RequestException for failures worth retrying (the partial file is kept).
+        """
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        meta = {}
+        if offset and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # Only resume if the file is unchanged; otherwise the server sends it whole
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+
+        proxy = self.proxy_pool.acquire()
+        session = self.session_pool.get(proxy)
+        started = time.monotonic()
+
+        with session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code == 416 and offset:
+                # Nothing left to send: the partial is complete if it matches the full length
+                total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                self._record(proxy, resp, started, 0)
+                if total.isdigit() and int(total) == offset:
+                    return self._hash_file(partial), offset, meta.get("content_type")
+                self._discard(partial, meta_path)
+                raise requests.exceptions.RetryError(f"Stale partial download for {media_key(url)}")
+
+            if resp.status_code >= 400:
+                self._record(proxy, resp, started, 0)
+                self.proxy_pool.report(proxy, time.monotonic() - started, ok=resp.status_code < 500, status_code=resp.status_code)
+                if resp.status_code in (403, 404, 410):
+                    self.metrics.event(
+                        "media_gone", f"Media unavailable: HTTP {resp.status_code}", logging.WARNING,
+                        url_key=media_key(url), status=resp.status_code,
+                    )
+                    self._discard(partial, meta_path)
+                    return None
+                resp.raise_for_status()
+
+            hasher = hashlib.sha256()
+            if resp.status_code == 206:
+                start = resp.headers.get("Content-Range", "").removeprefix("bytes ").partition("-")[0]
+                if not start.isdigit() or int(start) != offset:
+                    self._discard(partial, meta_path)
+                    raise requests.exceptions.RetryError(f"Unexpected Content-Range for {media_key(url)}")
+                self._hash_file(partial, hasher)
+                mode = "ab"
+            else:
+                # 200: no resume (first attempt, or the file changed), start over
+                offset = 0
+                mode = "wb"
+
+            content_type = resp.headers.get("Content-Type", "").split(";")[0] or None
+            expected = resp.headers.get("Content-Length")
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "url": url,
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "content_type": content_type,
+                }, f)
+
+            received = 0
+            with open(partial, mode) as out:
+                try:
+                    for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                        out.write(chunk)
+                        hasher.update(chunk)
+                        received += len(chunk)
+                except requests.exceptions.RequestException:
+                    self.proxy_pool.report(proxy, time.monotonic() - started, ok=False)
+                    raise
+
+            self._record(proxy, resp, started, received)
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=True)
+
+        if expected and expected.isdigit() and received != int(expected):
+            raise requests.exceptions.ChunkedEncodingError(
+                f"Got {received} of {expected} bytes for {media_key(url)}"
+            )
+        return hasher.hexdigest(), offset + received, content_type
+
+    def _record(self, proxy, resp: requests.Response, started: float, size: int):
+        self.metrics.record_request(
+            "media", proxy_key(proxy), resp.status_code, resp.elapsed.total_seconds(),
+            time.monotonic() - started, size,
+        )
+
+    def _hash_file(self, path: str, hasher=None) -> str:
+        hasher = hasher or hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _discard(self, *paths: str):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _store(
+        self,
+        url: str,
+        key: str,
+        partial: str,
+        meta_path: str,
+        digest: str,
+        size: int,
+        content_type: Optional[str],
+    ) -> MediaResult:
+        """Move a finished partial into the object store, unless that content is already there"""
+        extension = os.path.splitext(key)[1] or mimetypes.guess_extension(content_type or "") or ""
+        directory = os.path.join(self.objects_dir, digest[:2])
+        path = os.path.join(directory, digest + extension)
+
+        if os.path.exists(path):
+            self._discard(partial, meta_path)
+            status = "deduplicated"
+        else:
+            os.makedirs(directory, exist_ok=True)
+            os.replace(partial, path)
+            self._discard(meta_path)
+            status = "downloaded"
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media (url_key, sha256, path, size, downloaded_at) VALUES (?, ?, ?, ?, ?)",
+                (key, digest, path, size, time.time()),
+            )
+        return MediaResult(url, status, digest, path, size)
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, str, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT sha256, path, size FROM media WHERE url_key = ?", (key,)
+            ).fetchone()
+
+    def _link(self, instagram_id: str, kind: str, position: int, digest: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO post_media (instagram_id, kind, position, sha256) VALUES (?, ?, ?, ?)",
+                (instagram_id, kind, position, digest),
+            )
+
+    def media_for_post(self, instagram_id: str) -> List[Dict[str, object]]:
+        """Stored media of a post in display/video order"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT pm.kind, pm.position, pm.sha256, m.path FROM post_media pm
+                LEFT JOIN media m ON m.sha256 = pm.sha256
+                WHERE pm.instagram_id = ?
+                GROUP BY pm.kind, pm.position
+                ORDER BY pm.kind, pm.position
+                """,
+                (instagram_id,),
+            ).fetchall()
+        return [{"kind": kind, "position": position, "sha256": digest, "path": path}
+                for kind, position, digest, path in rows]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.proxy_pool.remove_remove_hook(self.session_pool.remove)
+        self.session_pool.close()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,280 @@
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, List, Tuple, Callable, Any
+
+LOGGER_NAME = "scraper"
+
+# Seconds; covers a fast cached page up to a request that hits the 15s timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+SIZE_BUCKETS = (1024, 8192, 32768, 131072, 524288, 2097152, 8388608)
+COUNT_BUCKETS = (0, 1, 3, 6, 12, 24, 50)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def proxy_label(key: str) -> str:
+    """Proxy key with any user:password@ removed, safe to use as a label or log field"""
+    scheme, sep, rest = key.rpartition("://")
+    return f"{scheme}{sep}{rest.rpartition('@')[2]}"
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            # Index len(buckets) is the +Inf bucket
+            row[bisect.bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            row = self._values.get(_label_key(labels))
+            return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, row in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, row):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative:g}")
+                cumulative += row[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {cumulative:g}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {row[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def serve(self, port: int = 9100, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Expose /metrics for a Prometheus scraper on a background thread"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event, message and the event's fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": getattr(record, "event", record.name),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: int = logging.INFO, json_logs: bool = False, stream=None):
+    """Attach a stderr (or `stream`) handler to the scraper logger: plain text or JSON lines"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonLogFormatter() if json_logs else logging.Formatter("%(message)s"))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+class Instrumentation:
+    """
+    Metrics, structured events and profiler hooks shared by the scrapers.
+
+    Each request records TTFB (headers received), download time, bytes and
+    status per endpoint and proxy; each page records parse time and posts per
+    page. event() logs through the "scraper" logger (configure_logging picks
+    text or JSON) and fans out to hooks, as do stage() timings, so a profiler
+    can attach with add_hook() without touching the scrapers.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, logger: Optional[logging.Logger] = None):
+        self.registry = registry or MetricsRegistry()
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+        self._hooks: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        r = self.registry
+        self.requests = r.counter("scraper_requests_total", "HTTP requests by endpoint, proxy and status")
+        self.response_bytes = r.counter("scraper_response_bytes_total", "Response body bytes received")
+        self.ttfb = r.histogram("scraper_request_ttfb_seconds", "Time until response headers arrived")
+        self.download = r.histogram("scraper_request_download_seconds", "Time spent reading the response body")
+        self.request_size = r.histogram("scraper_response_size_bytes", "Response body size", SIZE_BUCKETS)
+        self.connect = r.histogram("scraper_connect_seconds", "New connection setup (DNS + TCP + TLS) per host")
+        self.parse = r.histogram("scraper_parse_seconds", "Time turning a response into models")
+        self.page_posts = r.histogram("scraper_posts_per_page", "Posts produced per timeline page", COUNT_BUCKETS)
+        self.posts = r.counter("scraper_posts_total", "Posts produced")
+        self.stages = r.histogram("scraper_stage_seconds", "Wall time per instrumented stage")
+
+    def add_hook(self, hook: Callable[[str, Dict[str, Any]], None]):
+        """Call hook(event, fields) for every event and stage start/end"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[str, Dict[str, Any]], None]):
+        self._hooks.remove(hook)
+
+    def event(self, event: str, message: str, level: int = logging.INFO, **fields):
+        """Log a structured event; formatting is skipped when nobody is listening"""
+        for hook in self._hooks:
+            hook(event, fields)
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, message, extra={"event": event, "fields": fields})
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """Time a block as a stage; hooks see stage_start/stage_end around it"""
+        for hook in self._hooks:
+            hook("stage_start", {"stage": name, **fields})
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.stages.observe(duration, stage=name)
+            for hook in self._hooks:
+                hook("stage_end", {"stage": name, "duration": duration, **fields})
+
+    def record_request(
+        self,
+        endpoint: str,
+        proxy: str,
+        status: Any,
+        ttfb: Optional[float],
+        total: float,
+        size: int = 0,
+    ):
+        """One HTTP exchange; status is the code, or "error" when no response arrived"""
+        proxy = proxy_label(proxy)
+        self.requests.inc(endpoint=endpoint, proxy=proxy, status=status)
+        if ttfb is not None:
+            self.ttfb.observe(ttfb, endpoint=endpoint)
+            self.download.observe(max(0.0, total - ttfb), endpoint=endpoint)
+        if size:
+            self.response_bytes.inc(size, endpoint=endpoint)
+            self.request_size.observe(size, endpoint=endpoint)
+
+        if self._hooks or self.logger.isEnabledFor(logging.DEBUG):
+            self.event(
+                "request", f"{endpoint} {status} in {total * 1000:.0f} ms via {proxy}", logging.DEBUG,
+                endpoint=endpoint, proxy=proxy, status=status, ttfb=ttfb, total=total, bytes=size,
+            )
+
+    def record_response(self, endpoint: str, proxy: str, resp, started: float):
+        """record_request from a requests.Response; started is the time.monotonic() before sending"""
+        total = time.monotonic() - started
+        self.record_request(endpoint, proxy, resp.status_code, resp.elapsed.total_seconds(), total, len(resp.content))
+
+    def record_page(
+        self,
+        username: str,
+        page: int,
+        posts: int,
+        parse_time: float,
+        has_next_page: bool,
+        end_cursor: Optional[str],
+    ):
+        """One timeline page turned into posts"""
+        self.parse.observe(parse_time, kind="posts_page")
+        self.page_posts.observe(posts)
+        self.posts.inc(posts)
+        self.event(
+            "page", f"Fetched {posts} posts on page {page} for @{username}", logging.INFO,
+            username=username, page=page, posts=posts, parse_time=parse_time,
+            has_next_page=has_next_page, end_cursor=end_cursor,
+        )
+
+    def record_connect(self, host: str, seconds: float):
+        self.connect.observe(seconds, host=host)
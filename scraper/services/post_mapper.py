@@ -0,0 +1,188 @@
+from typing import Optional, List, Dict, Any, Tuple
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pydantic import TypeAdapter
+from models.instagram import InstagramPost
+
+# "strict": InstagramPost(...) per post, "batch": one TypeAdapter call per page.
+# "trusted" is kept as an alias of "batch": skipping validation with model_construct
+# measured slower than batch validation, and writing model internals by hand is fragile.
+VALIDATION_MODES = ("strict", "batch", "trusted")
+
+_POST_LIST = TypeAdapter(List[InstagramPost])
+
+
+def get_media_type(node: dict) -> str:
+    """Determine media type from node data"""
+    product_type = node.get("product_type", "")
+    if product_type == "clips":
+        return "REEL"
+
+    media_type = node.get("media_type")
+    if media_type == 2:
+        return "VIDEO"
+    elif media_type == 8:
+        return "CAROUSEL"
+    elif media_type == 1:
+        return "IMAGE"
+
+    if node.get("__typename") == "GraphSidecar":
+        return "CAROUSEL"
+
+    if node.get("is_video"):
+        return "VIDEO"
+    elif node.get("carousel_media_count") or node.get("carousel_media"):
+        return "CAROUSEL"
+
+    return "IMAGE"
+
+
+def get_caption(node: dict) -> Optional[str]:
+    """Extract caption from node data"""
+    caption = node.get("caption")
+    if caption:
+        if isinstance(caption, dict):
+            return caption.get("text")
+        return caption
+
+    edges = node.get("edge_media_to_caption", {}).get("edges", [])
+    if edges:
+        return edges[0].get("node", {}).get("text")
+
+    return None
+
+
+def get_display_url(node: dict) -> Optional[str]:
+    """Extract display URL from node data"""
+    img_versions = node.get("image_versions2", {}).get("candidates", [])
+    if img_versions:
+        return img_versions[0].get("url")
+
+    return node.get("display_url")
+
+
+def get_video_url(node: dict) -> Optional[str]:
+    """Extract video URL from node data"""
+    video_versions = node.get("video_versions", [])
+    if video_versions:
+        return video_versions[0].get("url")
+
+    return node.get("video_url")
+
+
+def get_location(node: dict) -> Optional[dict]:
+    """Extract location from node data"""
+    location = node.get("location")
+    if location:
+        return {
+            "id": location.get("id"),
+            "name": location.get("name"),
+            "slug": location.get("slug")
+        }
+    return None
+
+
+def _as_str(value: Any) -> Any:
+    """Ids arrive as str or int depending on the endpoint (pk is numeric)"""
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _as_int(value: Any) -> Any:
+    """Counts and timestamps as int; anything unconvertible is left for validation to reject"""
+    if value is None or type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def post_key(node: dict) -> Optional[str]:
+    """Id used to dedupe nodes across pages"""
+    return node.get("code") or node.get("shortcode") or node.get("id") or node.get("pk")
+
+
+def node_fields(node: dict, username: str) -> Dict[str, Any]:
+    """
+    Map a timeline node to InstagramPost field values.
+    Handles both the v1 feed shape (code, taken_at, carousel_media) and the
+    GraphQL shape embedded in web_profile_info (shortcode, edge_* counts).
+    Ids come out as str and counts as int whichever shape the node has.
+    """
+    # Collect display and video URLs for carousel items
+    display_urls = []
+    video_urls = []
+    carousel_items = node.get("carousel_media") or [
+        edge["node"] for edge in node.get("edge_sidecar_to_children", {}).get("edges", [])
+    ]
+
+    for item in carousel_items or (node,):
+        display_url = get_display_url(item)
+        video_url = get_video_url(item)
+        if display_url:
+            display_urls.append(display_url)
+        if video_url:
+            video_urls.append(video_url)
+
+    like_count = node.get("like_count")
+    if like_count is None:
+        like_count = (node.get("edge_liked_by") or node.get("edge_media_preview_like") or {}).get("count", 0)
+
+    comment_count = node.get("comment_count")
+    if comment_count is None:
+        comment_count = node.get("edge_media_to_comment", {}).get("count", 0)
+
+    view_count = node.get("view_count")
+    if view_count is None:
+        view_count = node.get("video_view_count")
+
+    return {
+        "post_id": _as_str(node.get("code") or node.get("shortcode")),
+        "instagram_id": _as_str(node.get("id") or node.get("pk")),
+        "media_type": get_media_type(node),
+        "caption": get_caption(node),
+        "like_count": _as_int(like_count),
+        "comment_count": _as_int(comment_count),
+        "timestamp": _as_int(node.get("taken_at") or node.get("taken_at_timestamp")),
+        "display_urls": display_urls,
+        "video_urls": video_urls,
+        "view_count": _as_int(view_count),
+        "location": get_location(node),
+        "owner_username": username,
+    }
+
+
+def map_nodes(
+    nodes: List[dict],
+    username: str,
+    seen_ids: set,
+    mode: str = "strict",
+) -> Tuple[List[InstagramPost], List[dict]]:
+    """
+    Convert a page of timeline nodes into InstagramPosts in one batch.
+
+    Args:
+        nodes: Timeline nodes (edge["node"]) for one page
+        username: Owner username stamped on every post
+        seen_ids: Ids already emitted; duplicates are skipped and new ids added
+        mode: One of VALIDATION_MODES
+
+    Returns:
+        (posts, the nodes they were built from, in the same order)
+    """
+    kept = []
+    rows = []
+    for node in nodes:
+        key = post_key(node)
+        if key in seen_ids:
+            continue
+        seen_ids.add(key)
+        kept.append(node)
+        rows.append(node_fields(node, username))
+
+    if mode in ("batch", "trusted"):
+        return _POST_LIST.validate_python(rows), kept
+    if mode == "strict":
+        return [InstagramPost(**row) for row in rows], kept
+    raise ValueError(f"Unknown validation mode: {mode}")
@@ -0,0 +1,283 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramProfile, InstagramPost
+from services.writers import OutputWriter
+
+POST_METRICS = ("like_count", "comment_count", "view_count")
+PROFILE_METRICS = ("follower_count", "following_count", "posts_count")
+
+_POST_COLUMNS = (
+    "instagram_id", "post_id", "owner_username", "media_type", "caption", "like_count",
+    "comment_count", "view_count", "timestamp", "display_urls", "video_urls", "location",
+)
+
+
+class PostStore(OutputWriter):
+    """
+    Queryable SQLite store of the latest profiles and posts plus engagement history.
+
+    Posts are upserted by instagram_id (profiles by username) into typed columns
+    indexed on (owner_username, timestamp), and every write also appends a
+    snapshot of like/comment/view counts (follower/following/post counts for
+    profiles), so growth over any window is an indexed query.
+    """
+
+    def __init__(self, path: str = "instagram_store.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    username TEXT PRIMARY KEY,
+                    full_name TEXT,
+                    biography TEXT,
+                    follower_count INTEGER NOT NULL,
+                    following_count INTEGER NOT NULL,
+                    posts_count INTEGER NOT NULL,
+                    profile_picture_url TEXT,
+                    is_verified INTEGER NOT NULL,
+                    category TEXT,
+                    external_url TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS posts (
+                    instagram_id TEXT PRIMARY KEY,
+                    post_id TEXT NOT NULL,
+                    owner_username TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    caption TEXT,
+                    like_count INTEGER NOT NULL,
+                    comment_count INTEGER NOT NULL,
+                    view_count INTEGER,
+                    timestamp INTEGER,
+                    display_urls TEXT NOT NULL,
+                    video_urls TEXT NOT NULL,
+                    location TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_posts_owner_timestamp ON posts (owner_username, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_posts_post_id ON posts (post_id);
+                CREATE TABLE IF NOT EXISTS post_snapshots (
+                    instagram_id TEXT NOT NULL,
+                    scraped_at REAL NOT NULL,
+                    like_count INTEGER NOT NULL,
+                    comment_count INTEGER NOT NULL,
+                    view_count INTEGER,
+                    PRIMARY KEY (instagram_id, scraped_at)
+                );
+                CREATE TABLE IF NOT EXISTS profile_snapshots (
+                    username TEXT NOT NULL,
+                    scraped_at REAL NOT NULL,
+                    follower_count INTEGER NOT NULL,
+                    following_count INTEGER NOT NULL,
+                    posts_count INTEGER NOT NULL,
+                    PRIMARY KEY (username, scraped_at)
+                );
+                """
+            )
+
+    def write_profile(self, profile: InstagramProfile, scraped_at: Optional[float] = None):
+        """Upsert a profile and append a follower/following/posts snapshot"""
+        now = time.time() if scraped_at is None else scraped_at
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO profiles (username, full_name, biography, follower_count, following_count, posts_count,
+                                      profile_picture_url, is_verified, category, external_url, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    full_name = excluded.full_name,
+                    biography = excluded.biography,
+                    follower_count = excluded.follower_count,
+                    following_count = excluded.following_count,
+                    posts_count = excluded.posts_count,
+                    profile_picture_url = excluded.profile_picture_url,
+                    is_verified = excluded.is_verified,
+                    category = excluded.category,
+                    external_url = excluded.external_url,
+                    last_seen = excluded.last_seen
+                """,
+                (profile.username, profile.full_name, profile.biography, profile.follower_count,
+                 profile.following_count, profile.posts_count, profile.profile_picture_url,
+                 int(profile.is_verified), profile.category, profile.external_url, now, now),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profile_snapshots VALUES (?, ?, ?, ?, ?)",
+                (profile.username, now, profile.follower_count, profile.following_count, profile.posts_count),
+            )
+
+    def write_posts(self, posts: List[InstagramPost], scraped_at: Optional[float] = None):
+        """Upsert posts by instagram_id and append one engagement snapshot each"""
+        if not posts:
+            return
+        now = time.time() if scraped_at is None else scraped_at
+
+        rows = [
+            (post.instagram_id, post.post_id, post.owner_username, post.media_type, post.caption,
+             post.like_count, post.comment_count, post.view_count, post.timestamp,
+             json.dumps(post.display_urls), json.dumps(post.video_urls),
+             json.dumps(post.location, ensure_ascii=False) if post.location else None, now, now)
+            for post in posts
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO posts (instagram_id, post_id, owner_username, media_type, caption, like_count,
+                                   comment_count, view_count, timestamp, display_urls, video_urls, location,
+                                   first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(instagram_id) DO UPDATE SET
+                    post_id = excluded.post_id,
+                    owner_username = excluded.owner_username,
+                    media_type = excluded.media_type,
+                    caption = excluded.caption,
+                    like_count = excluded.like_count,
+                    comment_count = excluded.comment_count,
+                    view_count = excluded.view_count,
+                    timestamp = excluded.timestamp,
+                    display_urls = excluded.display_urls,
+                    video_urls = excluded.video_urls,
+                    location = excluded.location,
+                    last_seen = excluded.last_seen
+                """,
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO post_snapshots VALUES (?, ?, ?, ?, ?)",
+                [(post.instagram_id, now, post.like_count, post.comment_count, post.view_count) for post in posts],
+            )
+
+    def _to_post(self, row: Tuple) -> InstagramPost:
+        values = dict(zip(_POST_COLUMNS, row))
+        values["display_urls"] = json.loads(values["display_urls"])
+        values["video_urls"] = json.loads(values["video_urls"])
+        values["location"] = json.loads(values["location"]) if values["location"] else None
+        return InstagramPost(**values)
+
+    def get_profile(self, username: str) -> Optional[InstagramProfile]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT username, full_name, biography, follower_count, following_count, posts_count,
+                       profile_picture_url, is_verified, category, external_url
+                FROM profiles WHERE username = ?
+                """,
+                (username,),
+            ).fetchone()
+        if not row:
+            return None
+        fields = dict(zip(InstagramProfile.model_fields, row))
+        fields["is_verified"] = bool(fields["is_verified"])
+        return InstagramProfile(**fields)
+
+    def get_post(self, instagram_id: str) -> Optional[InstagramPost]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_POST_COLUMNS)} FROM posts WHERE instagram_id = ?", (instagram_id,)
+            ).fetchone()
+        return self._to_post(row) if row else None
+
+    def posts_by(
+        self,
+        username: str,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[InstagramPost]:
+        """A user's posts newest first, optionally limited to a taken-at range (unix seconds)"""
+        query = f"SELECT {', '.join(_POST_COLUMNS)} FROM posts WHERE owner_username = ?"
+        params: List[Any] = [username]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp < ?"
+            params.append(until)
+        query += " ORDER BY timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_post(row) for row in rows]
+
+    def top_gainers(
+        self,
+        username: str,
+        metric: str = "like_count",
+        since: Optional[float] = None,
+        limit: int = 10,
+    ) -> List[Tuple[InstagramPost, int]]:
+        """
+        A user's posts ranked by how much `metric` grew since `since` (scrape time,
+        default one week ago). Growth is measured from the last snapshot at or
+        before `since` (or the first one after it) to the latest snapshot.
+        """
+        if metric not in POST_METRICS:
+            raise ValueError(f"Unknown post metric: {metric}")
+        since = time.time() - 7 * 86400 if since is None else since
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                WITH windowed AS (
+                    SELECT s.instagram_id, s.scraped_at, s.{metric} AS value
+                    FROM posts p
+                    JOIN post_snapshots s ON s.instagram_id = p.instagram_id
+                    WHERE p.owner_username = ?
+                      AND s.scraped_at >= COALESCE(
+                          (SELECT MAX(b.scraped_at) FROM post_snapshots b
+                           WHERE b.instagram_id = p.instagram_id AND b.scraped_at <= ?), ?)
+                ),
+                gains AS (
+                    SELECT DISTINCT instagram_id,
+                        LAST_VALUE(value) OVER w - FIRST_VALUE(value) OVER w AS gain
+                    FROM windowed
+                    WINDOW w AS (PARTITION BY instagram_id ORDER BY scraped_at
+                                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+                )
+                SELECT {', '.join('p.' + c for c in _POST_COLUMNS)}, g.gain
+                FROM gains g JOIN posts p ON p.instagram_id = g.instagram_id
+                WHERE g.gain IS NOT NULL
+                ORDER BY g.gain DESC
+                LIMIT ?
+                """,
+                (username, since, since, limit),
+            ).fetchall()
+        return [(self._to_post(row[:-1]), row[-1]) for row in rows]
+
+    def post_history(self, instagram_id: str) -> List[Dict[str, Any]]:
+        """Engagement snapshots of one post, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT scraped_at, {', '.join(POST_METRICS)} FROM post_snapshots WHERE instagram_id = ? ORDER BY scraped_at",
+                (instagram_id,),
+            ).fetchall()
+        return [dict(zip(("scraped_at",) + POST_METRICS, row)) for row in rows]
+
+    def profile_history(self, username: str) -> List[Dict[str, Any]]:
+        """Follower/following/posts count snapshots of one profile, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT scraped_at, {', '.join(PROFILE_METRICS)} FROM profile_snapshots WHERE username = ? ORDER BY scraped_at",
+                (username,),
+            ).fetchall()
+        return [dict(zip(("scraped_at",) + PROFILE_METRICS, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,167 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Callable
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramProfile
+from services import instagram_api, instagram_html
+from services.metrics import Instrumentation
+from services.retry import FetchError
+
+STRATEGIES = ("api", "html")
+
+
+class HedgedProfileFetcher:
+    """
+    One get_profile over both strategies: the JSON API and the HTML page.
+
+    The primary strategy runs first. If it fails, or is still running after the
+    hedge delay (its running p95 latency once min_samples successes are known,
+    default_hedge_delay before that), the secondary is started too and the first
+    good profile wins. The loser's result is discarded, and it is told to stop
+    before any further retry. A 404 is a definite answer: it ends the fetch
+    without hedging, so a missing profile costs one request.
+    """
+
+    def __init__(
+        self,
+        api_scraper: Optional[instagram_api.InstagramScraper] = None,
+        html_scraper: Optional[instagram_html.InstagramScraper] = None,
+        primary: str = "api",
+        hedge_percentile: float = 0.95,
+        hedge_after: Optional[float] = None,
+        default_hedge_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        workers: int = 8,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        if primary not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {primary}")
+
+        self.api_scraper = api_scraper or instagram_api.InstagramScraper()
+        # Share pacing, proxy health and the retry budget so both strategies see the same proxies
+        self.html_scraper = html_scraper or instagram_html.InstagramScraper(
+            rate_limiter=self.api_scraper.rate_limiter,
+            proxy_pool=self.api_scraper.proxy_pool,
+            base_url=self.api_scraper.base_url,
+            metrics=self.api_scraper.metrics,
+            retry=self.api_scraper.retry,
+            identities=self.api_scraper.identities,
+        )
+        self.primary = primary
+        self.secondary = "html" if primary == "api" else "api"
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.metrics = metrics or self.api_scraper.metrics
+
+        self._latencies: Dict[str, deque] = {name: deque(maxlen=window) for name in STRATEGIES}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers * 2)
+        self._results = self.metrics.registry.counter(
+            "scraper_hedged_profiles_total", "Hedged profile fetches by winning strategy and whether a hedge fired"
+        )
+
+    def hedge_delay(self) -> float:
+        """How long the primary gets before the secondary is started"""
+        if self.hedge_after is not None:
+            return self.hedge_after
+
+        with self._lock:
+            samples = sorted(self._latencies[self.primary])
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        return samples[min(len(samples) - 1, int(self.hedge_percentile * len(samples)))]
+
+    def latency_percentile(self, strategy: str, fraction: float) -> Optional[float]:
+        """Running latency percentile of a strategy's successful fetches"""
+        with self._lock:
+            samples = sorted(self._latencies[strategy])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def _fetch_api(self, username: str, cancel: threading.Event) -> Optional[InstagramProfile]:
+        return self.api_scraper.get_profile(username, raise_not_found=True, cancel=cancel)
+
+    def _fetch_html(self, username: str, cancel: threading.Event) -> Optional[InstagramProfile]:
+        profile = self.html_scraper.get_profile(username, cancel=cancel, raise_not_found=True)
+        # The HTML scraper has its own dataclass with the same fields
+        return InstagramProfile(**profile.to_dict()) if profile else None
+
+    def _start(self, strategy: str, username: str, cancel: threading.Event) -> Future:
+        fetch: Callable = self._fetch_api if strategy == "api" else self._fetch_html
+        started = time.monotonic()
+        # The caller's context carries its retry deadline into the pool thread
+        future = self._executor.submit(contextvars.copy_context().run, fetch, username, cancel)
+
+        def record(done: Future):
+            # Latecomers are recorded too, otherwise hedging would hide the slow tail
+            if not done.cancelled() and done.exception() is None and done.result() is not None:
+                with self._lock:
+                    self._latencies[strategy].append(time.monotonic() - started)
+
+        future.add_done_callback(record)
+        return future
+
+    def _strategy_error(self, strategy: str, username: str, error: Exception):
+        self.metrics.event(
+            "strategy_error", f"Error: {strategy} profile fetch for @{username} failed - {error}",
+            logging.ERROR, strategy=strategy, username=username, error=repr(error),
+        )
+
+    def get_profile(self, username: str) -> Optional[InstagramProfile]:
+        """First good profile from either strategy, or None if both fail"""
+        cancel = threading.Event()
+        futures = {self._start(self.primary, username, cancel): self.primary}
+        hedged = False
+        delay = self.hedge_delay()
+
+        try:
+            while futures:
+                timeout = None if hedged else delay
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    strategy = futures.pop(future)
+                    try:
+                        profile = future.result()
+                    except FetchError as e:
+                        if e.status_code == 404:
+                            self._results.inc(winner="not_found", hedged=str(hedged).lower())
+                            return None
+                        self._strategy_error(strategy, username, e)
+                        profile = None
+                    except Exception as e:
+                        self._strategy_error(strategy, username, e)
+                        profile = None
+
+                    if profile:
+                        self._results.inc(winner=strategy, hedged=str(hedged).lower())
+                        return profile
+
+                if not hedged:
+                    # Primary failed, or it is slower than the hedge delay
+                    hedged = True
+                    self.metrics.event(
+                        "hedge", f"Hedging @{username} with {self.secondary} after {delay:.2f}s",
+                        logging.DEBUG, username=username, strategy=self.secondary, delay=delay,
+                    )
+                    futures[self._start(self.secondary, username, cancel)] = self.secondary
+
+            self._results.inc(winner="none", hedged=str(hedged).lower())
+            return None
+        finally:
+            cancel.set()
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.session_pool import proxy_key
+
+
+class ProxyStats:
+    """Health counters for one proxy entry"""
+
+    def __init__(self, proxy: Dict[str, str], initial_latency: float):
+        self.proxy = proxy
+        self.latency_ewma = initial_latency
+        self.error_rate = 0.0
+        self.throttle_count = 0
+        self.throttle_rate = 0.0
+        self.requests = 0
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+        self.quarantine_seconds = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+
+    def score(self) -> float:
+        """Higher is better: fast proxies with few recent errors and 429s"""
+        penalty = 1.0 + 4.0 * self.error_rate + 2.0 * self.throttle_rate
+        return 1.0 / (max(self.latency_ewma, 0.01) * penalty)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ewma": round(self.latency_ewma, 3),
+            "error_rate": round(self.error_rate, 3),
+            "throttle_count": self.throttle_count,
+            "throttle_rate": round(self.throttle_rate, 3),
+            "requests": self.requests,
+            "quarantined": self.quarantined_until > time.monotonic(),
+            "score": round(self.score(), 3),
+        }
+
+
+class ProxyPool:
+    """
+    Health-scored proxy pool shared by the API and HTML scrapers.
+
+    Proxies are picked at random weighted by score. A proxy that fails
+    `failure_threshold` times in a row (or gets rate limited) is quarantined;
+    once the quarantine expires it gets a single probe request, and each
+    failed probe doubles the quarantine up to `max_quarantine_seconds`. A probe
+    whose outcome is not reported within `probe_timeout` counts as failed.
+    """
+
+    def __init__(
+        self,
+        proxies: Optional[List[Dict[str, str]]] = None,
+        ewma_alpha: float = 0.2,
+        failure_threshold: int = 3,
+        quarantine_seconds: float = 60.0,
+        max_quarantine_seconds: float = 900.0,
+        initial_latency: float = 1.0,
+        probe_timeout: float = 60.0,
+    ):
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.base_quarantine_seconds = quarantine_seconds
+        self.max_quarantine_seconds = max_quarantine_seconds
+        self.initial_latency = initial_latency
+        self.probe_timeout = probe_timeout
+
+        self._stats: Dict[str, ProxyStats] = {}
+        self._lock = threading.Lock()
+        self._remove_hooks: List[Callable[[Dict[str, str]], None]] = []
+
+        for proxy in proxies or []:
+            self.add(proxy)
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def add(self, proxy: Dict[str, str]):
+        """Add a proxy at runtime (no-op if already present)"""
+        with self._lock:
+            key = proxy_key(proxy)
+            if key not in self._stats:
+                self._stats[key] = ProxyStats(proxy, self.initial_latency)
+
+    def add_remove_hook(self, hook: Callable[[Dict[str, str]], None]):
+        """Call hook(proxy) when a proxy is removed, e.g. SessionPool.remove to close its connections"""
+        self._remove_hooks.append(hook)
+
+    def remove_remove_hook(self, hook: Callable[[Dict[str, str]], None]):
+        self._remove_hooks.remove(hook)
+
+    def remove(self, proxy: Dict[str, str]):
+        """Remove a proxy at runtime, along with the sessions registered through add_remove_hook"""
+        with self._lock:
+            removed = self._stats.pop(proxy_key(proxy), None)
+        if removed:
+            for hook in list(self._remove_hooks):
+                hook(removed.proxy)
+
+    def acquire(self) -> Optional[Dict[str, str]]:
+        """
+        Pick a proxy for the next request.
+
+        Returns:
+            Proxy dict, or None when the pool is empty (direct connection)
+        """
+        with self._lock:
+            if not self._stats:
+                return None
+
+            now = time.monotonic()
+            healthy = []
+            for stats in self._stats.values():
+                if stats.probing and now - stats.probe_started > self.probe_timeout:
+                    # The probe's request was abandoned without a report()
+                    self._quarantine(stats)
+                if stats.quarantined_until > now:
+                    continue
+                if stats.quarantined_until and not stats.probing:
+                    # Quarantine expired: let exactly one probe request through
+                    stats.probing = True
+                    stats.probe_started = now
+                    return stats.proxy
+                if not stats.probing:
+                    healthy.append(stats)
+
+            if not healthy:
+                # Everything is quarantined; fall back to whichever recovers first
+                stats = min(self._stats.values(), key=lambda s: s.quarantined_until)
+                return stats.proxy
+
+            chosen = random.choices(healthy, weights=[s.score() for s in healthy])[0]
+            return chosen.proxy
+
+    def report(self, proxy: Optional[Dict[str, str]], latency: float, ok: bool, status_code: Optional[int] = None):
+        """Record the outcome of a request made through proxy"""
+        if not proxy:
+            return
+
+        with self._lock:
+            stats = self._stats.get(proxy_key(proxy))
+            if stats is None:
+                return
+
+            alpha = self.ewma_alpha
+            stats.requests += 1
+            stats.latency_ewma = (1 - alpha) * stats.latency_ewma + alpha * latency
+            stats.error_rate = (1 - alpha) * stats.error_rate + alpha * (0.0 if ok else 1.0)
+            # Decays like error_rate, so a past burst of 429s stops weighing on the score
+            stats.throttle_rate = (1 - alpha) * stats.throttle_rate + alpha * (1.0 if status_code == 429 else 0.0)
+
+            if status_code == 429:
+                stats.throttle_count += 1
+
+            if ok:
+                stats.consecutive_failures = 0
+                stats.quarantined_until = 0.0
+                stats.quarantine_seconds = 0.0
+                stats.probing = False
+                return
+
+            stats.consecutive_failures += 1
+            if stats.probing or status_code == 429 or stats.consecutive_failures >= self.failure_threshold:
+                self._quarantine(stats)
+
+    def _quarantine(self, stats: ProxyStats):
+        if stats.quarantine_seconds:
+            stats.quarantine_seconds = min(self.max_quarantine_seconds, stats.quarantine_seconds * 2)
+        else:
+            stats.quarantine_seconds = self.base_quarantine_seconds
+        stats.quarantined_until = time.monotonic() + stats.quarantine_seconds
+        stats.probing = False
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Health snapshot per proxy"""
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self._stats.items()}
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.success_streak = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-proxy/identity token buckets with AIMD rate control.
+
+    Each key starts at initial_rate requests/sec. Every `success_streak`
+    consecutive successes add `increase_step`; a 429 or empty page multiplies
+    the rate by `decrease_factor`.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 0.5,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+        burst: float = 1.0,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        success_streak: int = 10,
+    ):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.success_streak = success_streak
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.initial_rate, self.burst)
+            self._buckets[key] = bucket
+        return bucket
+
+    def reserve(self, key: str) -> float:
+        """Reserve a request slot for key and return the delay before it may be sent"""
+        with self._lock:
+            return self._bucket(key).reserve()
+
+    def acquire(self, key: str):
+        """Block until a request for key may be sent"""
+        delay = self.reserve(key)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, key: str):
+        """Wait without blocking the event loop until a request for key may be sent"""
+        delay = self.reserve(key)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self, key: str):
+        """Additive increase after a streak of successful requests"""
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.success_streak += 1
+            if bucket.success_streak >= self.success_streak:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+                bucket.success_streak = 0
+
+    def on_throttle(self, key: str):
+        """Multiplicative decrease after a 429 or an empty page"""
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket._refill(time.monotonic())
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.success_streak = 0
+
+    def rates(self) -> Dict[str, float]:
+        """Current requests/sec per key"""
+        with self._lock:
+            return {key: bucket.rate for key, bucket in self._buckets.items()}
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.json_codec import loads
+
+
+class ResponseCache:
+    """
+    On-disk (SQLite) cache of decoded JSON responses.
+
+    Entries are keyed on URL plus the request params (GraphQL doc_id and
+    variables), expire after a per-endpoint TTL, and the least recently used
+    entries are evicted once the stored bodies exceed max_bytes.
+    """
+
+    DEFAULT_TTLS = {
+        "web_profile_info": 3600.0,
+        "graphql": 1800.0,
+    }
+
+    def __init__(
+        self,
+        path: str = "response_cache.db",
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 600.0,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            # Running byte total of the stored bodies, kept up to date on every insert and delete
+            self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def make_key(self, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Hash of the URL and its params in a stable order"""
+        raw = url + "\n" + json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Return the cached JSON body, or None on a miss or expired entry"""
+        key = self.make_key(url, params)
+        now = time.time()
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT body, expires_at, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if not row or row[1] <= now:
+                if row:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._total -= row[2]
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return loads(row[0])
+
+    def set(self, endpoint: str, url: str, params: Optional[Dict[str, Any]], data: Any):
+        """Store a JSON body under the endpoint's TTL, then evict LRU entries past max_bytes"""
+        key = self.make_key(url, params)
+        body = json.dumps(data, ensure_ascii=False)
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        ttl = self.ttls.get(endpoint, self.default_ttl)
+
+        with self._lock, self._conn:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses (key, endpoint, body, size, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, endpoint, body, size, now + ttl, now),
+            )
+            self._total += size - (replaced[0] if replaced else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        now = time.time()
+        expired = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE expires_at <= ?", (now,)
+        ).fetchone()[0]
+        if expired:
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._total -= expired
+
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if self._total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size in bytes"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._total}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,217 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Callable, Any
+from tenacity import Retrying, AsyncRetrying, RetryCallState, retry_if_exception, wait_random_exponential
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.metrics import Instrumentation
+
+# What to do after a failed attempt
+DROP = "drop"          # permanent (e.g. 404): give up at once
+ROTATE = "rotate"      # this proxy is throttled or blocked: retry right away through another one
+BACKOFF = "backoff"    # transient (5xx, timeouts, soft blocks): retry after a jittered exponential delay
+
+STATUS_ACTIONS = {
+    400: DROP,
+    401: ROTATE,
+    403: ROTATE,
+    404: DROP,
+    410: DROP,
+    429: ROTATE,
+}
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("retry_deadline", default=None)
+
+
+class FetchError(Exception):
+    """A failed request attempt; status_code is None when no usable response came back"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RetryBudget:
+    """
+    Global cap on retries, shared by everything using one RetryEngine.
+
+    Every first attempt deposits `ratio` tokens (up to max_tokens) and every
+    retry spends one, so retries stay below roughly ratio x traffic. When a
+    whole endpoint is failing the budget drains and requests fail fast instead
+    of multiplying the load (a retry storm).
+    """
+
+    def __init__(self, ratio: float = 0.2, initial_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = initial_tokens
+        self._lock = threading.Lock()
+
+    def record_attempt(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class RetryEngine:
+    """
+    Status-aware retries (built on tenacity) shared by the scrapers.
+
+    An attempt raises FetchError to fail; STATUS_ACTIONS decides whether that
+    drops the request, rotates to another proxy (each attempt picks its own
+    proxy) or backs off with full-jitter exponential delays. Retrying stops at
+    max_attempts, at the deadline set with deadline(), or when the shared
+    RetryBudget runs dry.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        rotate_delay: float = 0.0,
+        budget: Optional[RetryBudget] = None,
+        status_actions: Optional[Dict[int, str]] = None,
+        metrics: Optional[Instrumentation] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.rotate_delay = rotate_delay
+        self.budget = budget or RetryBudget()
+        self.status_actions = {**STATUS_ACTIONS, **(status_actions or {})}
+        self.metrics = metrics or Instrumentation()
+
+        self._backoff = wait_random_exponential(multiplier=base_delay, max=max_delay)
+        self._retries = self.metrics.registry.counter("scraper_retries_total", "Retried attempts by endpoint and action")
+        self._giveups = self.metrics.registry.counter(
+            "scraper_retry_giveups_total", "Requests abandoned by endpoint and reason"
+        )
+
+    def classify(self, error: BaseException) -> str:
+        """DROP, ROTATE or BACKOFF for a failed attempt"""
+        if not isinstance(error, FetchError):
+            return DROP
+        status = error.status_code
+        if status is None or status >= 500:
+            return BACKOFF
+        return self.status_actions.get(status, DROP)
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+        Bound every retried call made in this block (same thread or task) to
+        `seconds` from now; nested deadlines keep the earlier one.
+        """
+        current = _deadline.get()
+        deadline = time.monotonic() + seconds
+        token = _deadline.set(deadline if current is None else min(current, deadline))
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the current deadline, or None without one"""
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _policy(self, retrying_cls, endpoint: str, can_rotate: bool, cancel: Optional[threading.Event], max_attempts: int):
+        def should_retry(error: BaseException) -> bool:
+            if self.classify(error) == DROP:
+                self._giveups.inc(endpoint=endpoint, reason="drop")
+                return False
+            return True
+
+        def wait(state: RetryCallState) -> float:
+            if can_rotate and self.classify(state.outcome.exception()) == ROTATE:
+                return self.rotate_delay
+            return self._backoff(state)
+
+        def stop(state: RetryCallState) -> bool:
+            reason = None
+            time_left = self.time_left()
+            if state.attempt_number >= max_attempts:
+                reason = "attempts"
+            elif cancel is not None and cancel.is_set():
+                reason = "cancelled"
+            elif time_left is not None and state.upcoming_sleep >= time_left:
+                reason = "deadline"
+            elif not self.budget.try_spend():
+                reason = "budget"
+
+            if reason:
+                self._giveups.inc(endpoint=endpoint, reason=reason)
+            return reason is not None
+
+        def before_sleep(state: RetryCallState):
+            error = state.outcome.exception()
+            action = self.classify(error)
+            self._retries.inc(endpoint=endpoint, action=action)
+            self.metrics.event(
+                "retry", f"Retrying {endpoint} in {state.upcoming_sleep:.2f}s ({action}): {error}", logging.DEBUG,
+                endpoint=endpoint, action=action, attempt=state.attempt_number,
+                delay=state.upcoming_sleep, status=getattr(error, "status_code", None),
+            )
+
+        return retrying_cls(
+            retry=retry_if_exception(should_retry),
+            wait=wait,
+            stop=stop,
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+
+    def _start(self, endpoint: str):
+        time_left = self.time_left()
+        if time_left is not None and time_left <= 0:
+            self._giveups.inc(endpoint=endpoint, reason="deadline")
+            raise FetchError(f"Deadline passed before {endpoint} request")
+        self.budget.record_attempt()
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        endpoint: str = "request",
+        can_rotate: bool = False,
+        cancel: Optional[threading.Event] = None,
+        max_attempts: Optional[int] = None,
+    ) -> Any:
+        """
+        Run fn(*args) until it returns, retrying FetchErrors per policy.
+
+        Args:
+            endpoint: Label for metrics and logs
+            can_rotate: Whether another proxy is available; without one ROTATE falls back to backoff
+            cancel: Stop retrying once set
+            max_attempts: Override the engine's attempt limit for this call
+
+        Raises:
+            FetchError: The last failure, once retrying stops
+        """
+        self._start(endpoint)
+        policy = self._policy(Retrying, endpoint, can_rotate, cancel, max_attempts or self.max_attempts)
+        return policy(fn, *args)
+
+    async def call_async(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        endpoint: str = "request",
+        can_rotate: bool = False,
+        cancel: Optional[threading.Event] = None,
+        max_attempts: Optional[int] = None,
+    ) -> Any:
+        """call() for coroutine functions; waits with asyncio.sleep"""
+        self._start(endpoint)
+        policy = self._policy(AsyncRetrying, endpoint, can_rotate, cancel, max_attempts or self.max_attempts)
+        return await policy(fn, *args)
@@ -0,0 +1,350 @@
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Optional, List
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from services.instagram_api import InstagramScraper
+from services.retry import FetchError
+from services.writers import OutputWriter
+
+# Queues from architecture.txt
+QUEUES = ("discovery", "profile", "post")
+
+# Rescrape interval (seconds) and base priority per tier
+TIERS = {
+    "popular": {"interval": 3600.0, "priority": 100},
+    "new": {"interval": 86400.0, "priority": 50},
+    "discovery": {"interval": 7 * 86400.0, "priority": 10},
+}
+
+# Popular accounts are rescraped hourly only while it's daytime in their timezone
+ACTIVE_HOURS = (8, 24)
+FAILURE_RETRY_SECONDS = 600.0
+# After this many consecutive failures a job gives up on retrying (see ScrapeQueue.complete)
+MAX_FAILURES = 5
+
+
+@dataclass
+class ScheduledJob:
+    """One account in one queue"""
+    username: str
+    queue: str
+    tier: str
+    priority: int
+    next_due: float
+    utc_offset: Optional[int] = None
+    last_scraped: Optional[float] = None
+    failures: int = 0
+
+
+class ScrapeQueue:
+    """
+    Durable priority queue of accounts (SQLite by default).
+
+    Each (username, queue) row has a next-due timestamp; pop_due hands out due
+    rows in priority order and marks them in progress until complete() is called.
+    """
+
+    def __init__(self, path: str = "scrape_queue.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    username TEXT NOT NULL,
+                    queue TEXT NOT NULL,
+                    tier TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    next_due REAL NOT NULL,
+                    utc_offset INTEGER,
+                    last_scraped REAL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    leased_at REAL,
+                    PRIMARY KEY (username, queue)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (leased_at, next_due, priority)")
+
+    def add(
+        self,
+        username: str,
+        queue: str = "profile",
+        tier: str = "new",
+        priority: Optional[int] = None,
+        utc_offset: Optional[int] = None,
+        due: Optional[float] = None,
+    ):
+        """Add an account to a queue; re-adding keeps the earlier due time and the higher priority"""
+        if queue not in QUEUES:
+            raise ValueError(f"Unknown queue: {queue}")
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier: {tier}")
+
+        priority = TIERS[tier]["priority"] if priority is None else priority
+        due = time.time() if due is None else due
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (username, queue, tier, priority, next_due, utc_offset)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username, queue) DO UPDATE SET
+                    tier = excluded.tier,
+                    priority = MAX(jobs.priority, excluded.priority),
+                    next_due = MIN(jobs.next_due, excluded.next_due),
+                    utc_offset = COALESCE(excluded.utc_offset, jobs.utc_offset)
+                """,
+                (username, queue, tier, priority, due, utc_offset),
+            )
+
+    def pop_due(self, limit: int = 1, now: Optional[float] = None) -> List[ScheduledJob]:
+        """Claim up to `limit` due jobs, highest priority first"""
+        now = time.time() if now is None else now
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT username, queue, tier, priority, next_due, utc_offset, last_scraped, failures
+                    FROM jobs
+                    WHERE leased_at IS NULL AND next_due <= ?
+                    ORDER BY priority DESC, next_due ASC
+                    LIMIT ?
+                    """,
+                    (now, limit),
+                ).fetchall()
+
+                self._conn.executemany(
+                    "UPDATE jobs SET leased_at = ? WHERE username = ? AND queue = ?",
+                    [(now, row[0], row[1]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return [ScheduledJob(*row) for row in rows]
+
+    def complete(self, job: ScheduledJob, ok: bool = True, now: Optional[float] = None) -> bool:
+        """
+        Release a job and schedule its next run (a growing retry delay on failure).
+
+        After MAX_FAILURES failures in a row a discovery job is dropped and any
+        other job waits for its regular tier interval. Returns False if dropped.
+        """
+        now = time.time() if now is None else now
+
+        if ok:
+            next_due = next_due_time(job, now)
+            failures = 0
+            last_scraped = now
+        elif job.failures + 1 >= MAX_FAILURES:
+            if job.queue == "discovery":
+                self.remove(job.username, queue=job.queue)
+                return False
+            next_due = next_due_time(job, now)
+            failures = 0
+            last_scraped = job.last_scraped
+        else:
+            failures = job.failures + 1
+            next_due = now + FAILURE_RETRY_SECONDS * failures
+            last_scraped = job.last_scraped
+
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET leased_at = NULL, next_due = ?, last_scraped = ?, failures = ?
+                WHERE username = ? AND queue = ?
+                """,
+                (next_due, last_scraped, failures, job.username, job.queue),
+            )
+        return True
+
+    def remove(self, username: str, queue: Optional[str] = None):
+        """Drop an account from one queue, or from all of them"""
+        with self._lock:
+            if queue:
+                self._conn.execute("DELETE FROM jobs WHERE username = ? AND queue = ?", (username, queue))
+            else:
+                self._conn.execute("DELETE FROM jobs WHERE username = ?", (username,))
+
+    def release_stale(self, older_than: float = 3600.0):
+        """Return jobs claimed by a crashed run to the queue"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET leased_at = NULL WHERE leased_at IS NOT NULL AND leased_at < ?",
+                (time.time() - older_than,),
+            )
+
+    def next_due(self) -> Optional[float]:
+        """Earliest due time among unclaimed jobs"""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_due) FROM jobs WHERE leased_at IS NULL").fetchone()
+        return row[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def next_due_time(job: ScheduledJob, now: float) -> float:
+    """Next run for a job after a successful scrape, honouring its tier and timezone"""
+    due = now + TIERS[job.tier]["interval"]
+
+    if job.tier == "popular" and job.utc_offset is not None:
+        local_hour = time.gmtime(due + job.utc_offset * 3600).tm_hour
+        start, end = ACTIVE_HOURS
+        if not start <= local_hour < end:
+            # Overnight locally: wait until the start of the active window
+            hours_until_start = (start - local_hour) % 24
+            due = (due // 3600 + hours_until_start) * 3600
+
+    return due
+
+
+class Scheduler:
+    """
+    Drives a worker pool from a ScrapeQueue.
+
+    profile jobs refresh the profile, post jobs fetch new posts (incrementally
+    when the scraper has a state store), and discovery jobs check a handle
+    exists before promoting it to the profile and post queues. An account that
+    answers 404 is removed from every queue.
+    """
+
+    def __init__(
+        self,
+        scraper: InstagramScraper,
+        queue: ScrapeQueue,
+        writer: Optional[OutputWriter] = None,
+        workers: int = 4,
+        max_posts: Optional[int] = 100,
+        poll_interval: float = 5.0,
+        job_deadline: Optional[float] = 300.0,
+    ):
+        self.scraper = scraper
+        self.queue = queue
+        self.writer = writer
+        self.workers = workers
+        self.max_posts = max_posts
+        self.poll_interval = poll_interval
+        # Retries inside one job stop once it has run this long (None = attempt limits only)
+        self.job_deadline = job_deadline
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._writer_lock = threading.Lock()
+
+    def _save(self, profile, posts):
+        if not self.writer:
+            return
+        with self._writer_lock:
+            self.scraper.save_with_writer(self.writer, profile, posts)
+
+    def _run_job(self, job: ScheduledJob) -> bool:
+        if job.queue == "profile":
+            profile = self.scraper.get_profile(job.username, raise_not_found=True)
+            if profile:
+                self._save(profile, [])
+            return profile is not None
+
+        if job.queue == "post":
+            profile, posts = self.scraper.get_profile_with_posts(
+                job.username, max_posts=self.max_posts, incremental=True, raise_not_found=True
+            )
+            if profile:
+                self._save(profile, posts)
+            return profile is not None
+
+        profile = self.scraper.get_profile(job.username, raise_not_found=True)
+        if not profile:
+            return False
+
+        self._save(profile, [])
+        self.queue.add(job.username, queue="profile", tier="new")
+        self.queue.add(job.username, queue="post", tier="new")
+        self.queue.remove(job.username, queue="discovery")
+        return True
+
+    def _job_failed(self, job: ScheduledJob, error: Exception):
+        self.scraper.metrics.event(
+            "job_failed", f"Error: {job.queue} job for @{job.username} failed - {error}", logging.ERROR,
+            queue=job.queue, username=job.username, error=repr(error),
+        )
+
+    def _process(self, job: ScheduledJob):
+        try:
+            if self.job_deadline is None:
+                ok = self._run_job(job)
+            else:
+                with self.scraper.retry.deadline(self.job_deadline):
+                    ok = self._run_job(job)
+        except FetchError as e:
+            if e.status_code != 404:
+                self._job_failed(job, e)
+                ok = False
+            else:
+                # "404 - Remove from queue" (architecture.txt)
+                self.scraper.metrics.event(
+                    "account_removed", f"@{job.username} does not exist; removed from the queues",
+                    logging.WARNING, queue=job.queue, username=job.username,
+                )
+                self.queue.remove(job.username)
+                return
+        except Exception as e:
+            self._job_failed(job, e)
+            ok = False
+
+        if job.queue == "discovery" and ok:
+            return
+        if not self.queue.complete(job, ok=ok):
+            self.scraper.metrics.event(
+                "job_dropped", f"Warning: dropped {job.queue} job for @{job.username} after {MAX_FAILURES} failures",
+                logging.WARNING, queue=job.queue, username=job.username,
+            )
+
+    def run_once(self) -> int:
+        """Run one batch of due jobs across the worker pool; returns how many ran"""
+        jobs = self.queue.pop_due(limit=self.workers)
+        list(self._executor.map(self._process, jobs))
+        return len(jobs)
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None):
+        """Keep every worker busy with due jobs until stop_event is set"""
+        stop_event = stop_event or threading.Event()
+        self.queue.release_stale()
+        in_flight = set()
+
+        while not stop_event.is_set():
+            free = self.workers - len(in_flight)
+            if free:
+                for job in self.queue.pop_due(limit=free):
+                    in_flight.add(self._executor.submit(self._process, job))
+
+            if in_flight:
+                _, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                continue
+
+            next_due = self.queue.next_due()
+            delay = self.poll_interval if next_due is None else min(self.poll_interval, max(0.0, next_due - time.time()))
+            stop_event.wait(delay)
+
+        wait(in_flight)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.writer:
+            self.writer.close()
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Optional, Dict, Callable
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+def proxy_key(proxy: Optional[Dict[str, str]]) -> str:
+    """Stable identifier for a proxy entry ("direct" when no proxy is used)"""
+    if not proxy:
+        return "direct"
+    return proxy.get("https") or proxy.get("http") or "direct"
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that reports how long each new connection took to set up
+    (DNS + TCP + TLS; urllib3 does not expose them separately) via on_connect(host, seconds).
+    Direct and HTTP(S)-proxied connections are timed; SOCKS proxies keep urllib3's own pools.
+    """
+
+    def __init__(self, on_connect: Callable[[str, float], None], **kwargs):
+        self.on_connect = on_connect
+        self._pool_classes = self._timed_pool_classes(on_connect)
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _timed_pool_classes(on_connect: Callable[[str, float], None]) -> Dict[str, type]:
+        def timed(connection_cls):
+            class TimedConnection(connection_cls):
+                def connect(self):
+                    started = time.perf_counter()
+                    super().connect()
+                    on_connect(self.host, time.perf_counter() - started)
+            return TimedConnection
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = timed(HTTPConnection)
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = timed(HTTPSConnection)
+
+        return {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        # Proxied requests get their own ProxyManager, which would otherwise use untimed pools
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+
+class SessionPool:
+    """
+    One keep-alive requests.Session per proxy entry.
+
+    Each session mounts an HTTPAdapter with its own connection pool, carries the
+    base headers once, and is closed after sitting idle for idle_timeout seconds.
+    With on_connect set, new connections report their setup time to it.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        idle_timeout: float = 90.0,
+        on_connect: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.headers = headers or {}
+        self.on_connect = on_connect
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self, proxy: Optional[Dict[str, str]]) -> requests.Session:
+        session = requests.Session()
+        if self.on_connect:
+            adapter = TimedHTTPAdapter(
+                self.on_connect, pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+            )
+        else:
+            adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        if proxy:
+            session.proxies.update(proxy)
+        return session
+
+    def get(self, proxy: Optional[Dict[str, str]] = None) -> requests.Session:
+        """Return the pooled session for a proxy, creating it on first use"""
+        key = proxy_key(proxy)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session(proxy)
+                self._sessions[key] = session
+
+            self._last_used[key] = now
+            return session
+
+    def evict_idle(self):
+        """Close sessions that have not been used within idle_timeout"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _evict_idle(self, now: float):
+        for key, last_used in list(self._last_used.items()):
+            if now - last_used > self.idle_timeout:
+                self._sessions.pop(key).close()
+                del self._last_used[key]
+
+    def remove(self, proxy: Optional[Dict[str, str]]):
+        """Close and forget the session for a proxy"""
+        key = proxy_key(proxy)
+        with self._lock:
+            session = self._sessions.pop(key, None)
+            self._last_used.pop(key, None)
+        if session:
+            session.close()
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._last_used.clear()
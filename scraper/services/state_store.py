@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+
+class ScrapeStateStore:
+    """
+    SQLite-backed high-water marks per username.
+
+    Records the newest post (instagram_id + timestamp) seen for each account so
+    incremental scrapes can stop paginating once they reach known posts.
+    """
+
+    def __init__(self, path: str = "scrape_state.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS high_water_marks (
+                    username TEXT PRIMARY KEY,
+                    instagram_id TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        """Return {"instagram_id", "timestamp"} for the newest known post, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT instagram_id, timestamp FROM high_water_marks WHERE username = ?",
+                (username,),
+            ).fetchone()
+
+        if not row:
+            return None
+        return {"instagram_id": row[0], "timestamp": row[1]}
+
+    def update(self, username: str, instagram_id: str, timestamp: int):
+        """Advance the high-water mark; older timestamps never move it backwards"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO high_water_marks (username, instagram_id, timestamp, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    instagram_id = excluded.instagram_id,
+                    timestamp = excluded.timestamp,
+                    updated_at = excluded.updated_at
+                WHERE excluded.timestamp >= high_water_marks.timestamp
+                """,
+                (username, instagram_id, timestamp, time.time()),
+            )
+
+    def reset(self, username: str):
+        """Forget the high-water mark so the next scrape walks the full timeline"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM high_water_marks WHERE username = ?", (username,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
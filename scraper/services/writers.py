@@ -0,0 +1,295 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models.instagram import InstagramProfile, InstagramPost
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class OutputWriter:
+    """Base class for writers; profiles and posts are written as separate streams"""
+
+    # Batched writers buffer rows across writes and start a new file on every flush(),
+    # so callers must not flush them per page; on_flush runs once buffered rows are on disk
+    batched = False
+    on_flush: Optional[Callable[[], None]] = None
+
+    def write_profile(self, profile: InstagramProfile):
+        raise NotImplementedError
+
+    def write_posts(self, posts: List[InstagramPost]):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonWriter(OutputWriter):
+    """The original {username}_data.json format: one indented file per account, written on close"""
+
+    def __init__(self, output_dir: str = "."):
+        self.output_dir = output_dir
+        self._profiles: Dict[str, Optional[InstagramProfile]] = {}
+        self._posts: Dict[str, List[InstagramPost]] = {}
+
+    def write_profile(self, profile: InstagramProfile):
+        self._profiles[profile.username] = profile
+        self._posts.setdefault(profile.username, [])
+
+    def write_posts(self, posts: List[InstagramPost]):
+        for post in posts:
+            self._profiles.setdefault(post.owner_username, None)
+            self._posts.setdefault(post.owner_username, []).append(post)
+
+    def flush(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for username, posts in self._posts.items():
+            profile = self._profiles.get(username)
+            data = {
+                "profile": profile.model_dump() if profile else None,
+                "posts": [post.model_dump() for post in posts]
+            }
+            path = os.path.join(self.output_dir, f"{username}_data.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+class NdjsonWriter(OutputWriter):
+    """
+    Append-only newline-delimited JSON: profiles.ndjson and posts.ndjson.
+
+    compression="gzip" or "zstd" appends a new compressed frame per run, which
+    standard readers decode as one continuous stream.
+    """
+
+    EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+    def __init__(self, output_dir: str = ".", compression: Optional[str] = None):
+        if compression not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+
+        self.output_dir = output_dir
+        self.compression = compression
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._profiles = self._open("profiles")
+        self._posts = self._open("posts")
+
+    def _open(self, stream: str):
+        path = os.path.join(self.output_dir, f"{stream}.ndjson{self.EXTENSIONS[self.compression]}")
+        if self.compression == "gzip":
+            return gzip.open(path, "at", encoding="utf-8")
+        if self.compression == "zstd":
+            return zstandard.open(path, "at", encoding="utf-8")
+        return open(path, "a", encoding="utf-8")
+
+    def write_profile(self, profile: InstagramProfile):
+        self._profiles.write(json.dumps(profile.model_dump(), ensure_ascii=False) + "\n")
+
+    def write_posts(self, posts: List[InstagramPost]):
+        self._posts.writelines(json.dumps(post.model_dump(), ensure_ascii=False) + "\n" for post in posts)
+
+    def flush(self):
+        self._profiles.flush()
+        self._posts.flush()
+
+    def close(self):
+        self._profiles.close()
+        self._posts.close()
+
+
+class ParquetWriter(OutputWriter):
+    """
+    Batched columnar output partitioned by owner_username:
+    {output_dir}/posts/owner_username={username}/part-*.parquet (profiles likewise by username).
+
+    Rows are buffered and both streams written once either reaches batch_size,
+    or on close. location is stored as a JSON string so the schema stays stable.
+    """
+
+    batched = True
+
+    def __init__(self, output_dir: str = ".", batch_size: int = 10000, compression: str = "zstd"):
+        if pa is None:
+            raise ImportError("Parquet output requires the 'pyarrow' package")
+
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.compression = compression
+        self._profile_rows: List[Dict[str, Any]] = []
+        self._post_rows: List[Dict[str, Any]] = []
+        self._part = 0
+
+        self.profile_schema = pa.schema([
+            ("username", pa.string()),
+            ("full_name", pa.string()),
+            ("biography", pa.string()),
+            ("follower_count", pa.int64()),
+            ("following_count", pa.int64()),
+            ("posts_count", pa.int64()),
+            ("profile_picture_url", pa.string()),
+            ("is_verified", pa.bool_()),
+            ("category", pa.string()),
+            ("external_url", pa.string()),
+        ])
+        self.post_schema = pa.schema([
+            ("post_id", pa.string()),
+            ("instagram_id", pa.string()),
+            ("media_type", pa.string()),
+            ("caption", pa.string()),
+            ("like_count", pa.int64()),
+            ("comment_count", pa.int64()),
+            ("timestamp", pa.int64()),
+            ("display_urls", pa.list_(pa.string())),
+            ("video_urls", pa.list_(pa.string())),
+            ("view_count", pa.int64()),
+            ("location", pa.string()),
+            ("owner_username", pa.string()),
+        ])
+
+    def write_profile(self, profile: InstagramProfile):
+        self._profile_rows.append(profile.model_dump())
+        if len(self._profile_rows) >= self.batch_size:
+            self.flush()
+
+    def write_posts(self, posts: List[InstagramPost]):
+        for post in posts:
+            row = post.model_dump()
+            row["location"] = json.dumps(row["location"], ensure_ascii=False) if row["location"] else None
+            self._post_rows.append(row)
+        if len(self._post_rows) >= self.batch_size:
+            self.flush()
+
+    def _write_partitioned(self, stream: str, rows: List[Dict[str, Any]], schema, partition_key: str):
+        by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_key.setdefault(row[partition_key], []).append(row)
+
+        self._part += 1
+        for key, key_rows in by_key.items():
+            directory = os.path.join(self.output_dir, stream, f"{partition_key}={key}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{int(time.time() * 1000)}-{os.getpid()}-{self._part}.parquet")
+            table = pa.Table.from_pylist(key_rows, schema=schema)
+            pq.write_table(table, path, compression=self.compression)
+
+    def _flush_profiles(self):
+        if self._profile_rows:
+            self._write_partitioned("profiles", self._profile_rows, self.profile_schema, "username")
+            self._profile_rows = []
+
+    def _flush_posts(self):
+        if self._post_rows:
+            self._write_partitioned("posts", self._post_rows, self.post_schema, "owner_username")
+            self._post_rows = []
+
+    def flush(self):
+        self._flush_profiles()
+        self._flush_posts()
+        if self.on_flush:
+            self.on_flush()
+
+
+class SqliteWriter(OutputWriter):
+    """
+    Idempotent output: profiles upserted by username and posts by instagram_id,
+    so a job that is retried or run twice never produces duplicate rows.
+    """
+
+    def __init__(self, path: str = "scrape_results.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles (username TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS posts (
+                    instagram_id TEXT PRIMARY KEY,
+                    owner_username TEXT NOT NULL,
+                    timestamp INTEGER,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+
+    def write_profile(self, profile: InstagramProfile):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (username, data) VALUES (?, ?)",
+                (profile.username, json.dumps(profile.model_dump(), ensure_ascii=False)),
+            )
+
+    def write_posts(self, posts: List[InstagramPost]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO posts (instagram_id, owner_username, timestamp, data) VALUES (?, ?, ?, ?)",
+                [
+                    (post.instagram_id, post.owner_username, post.timestamp,
+                     json.dumps(post.model_dump(), ensure_ascii=False))
+                    for post in posts
+                ],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_writer(fmt: str, output_dir: str = ".", **kwargs) -> OutputWriter:
+    """
+    Build a writer by name.
+
+    Args:
+        fmt: "json", "ndjson", "ndjson.gz", "ndjson.zst", "parquet", "sqlite" or "store"
+        output_dir: Directory the writer creates its files in
+    """
+    if fmt == "json":
+        return JsonWriter(output_dir)
+    if fmt == "ndjson":
+        return NdjsonWriter(output_dir, **kwargs)
+    if fmt == "ndjson.gz":
+        return NdjsonWriter(output_dir, compression="gzip")
+    if fmt == "ndjson.zst":
+        return NdjsonWriter(output_dir, compression="zstd")
+    if fmt == "parquet":
+        return ParquetWriter(output_dir, **kwargs)
+    if fmt == "sqlite":
+        os.makedirs(output_dir, exist_ok=True)
+        return SqliteWriter(os.path.join(output_dir, "scrape_results.db"))
+    if fmt == "store":
+        # Imported here: post_store builds on OutputWriter from this module
+        from services.post_store import PostStore
+        os.makedirs(output_dir, exist_ok=True)
+        return PostStore(os.path.join(output_dir, "instagram_store.db"))
+    raise ValueError(f"Unknown output format: {fmt}")
@@ -0,0 +1,110 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from services.instagram_api import InstagramScraper
+from services.state_store import ScrapeStateStore
+
+
+def node(n, pinned=False):
+    node = {"pk": str(n), "id": str(n), "code": f"C{n}", "taken_at": 1000 + n, "media_type": 1}
+    if pinned:
+        node["timeline_pinned_user_ids"] = [1]
+    return node
+
+
+def pages(*page_nodes):
+    """posts_data for each page, newest first, chained by cursor"""
+    result = []
+    for i, nodes in enumerate(page_nodes):
+        last = i == len(page_nodes) - 1
+        result.append({
+            "edges": [{"node": n} for n in nodes],
+            "page_info": {"has_next_page": not last, "end_cursor": None if last else f"cursor{i + 1}"},
+        })
+    return result
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ScrapeStateStore(str(tmp_path / "state.db"))
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def scraper(store):
+    return InstagramScraper(state_store=store)
+
+
+def serve(scraper, page_list):
+    """Answer timeline requests from page_list (None = a failed page); returns the cursors asked for"""
+    requested = []
+
+    def load(variables, use_cache=True):
+        cursor = variables.get("after")
+        requested.append(cursor)
+        index = 0 if cursor is None else int(cursor[len("cursor"):])
+        return page_list[index]
+
+    scraper._load_posts_page = load
+    return requested
+
+
+def scrape(scraper, **kwargs):
+    return [p.instagram_id for page, _ in scraper.iter_posts("alice", incremental=True, **kwargs) for p in page]
+
+
+def test_first_run_records_the_newest_post(scraper, store):
+    serve(scraper, pages([node(9), node(8), node(7)], [node(6), node(5)]))
+    assert scrape(scraper) == ["9", "8", "7", "6", "5"]
+    assert store.get("alice")["instagram_id"] == "9"
+
+
+def test_known_post_ends_the_scan(scraper, store):
+    store.update("alice", "7", 1007)
+    requested = serve(scraper, pages([node(11), node(10), node(9)], [node(8), node(7), node(6)], [node(5)]))
+
+    assert scrape(scraper) == ["11", "10", "9", "8"]
+    # The page after the known post is never fetched
+    assert requested == [None, "cursor1"]
+    assert store.get("alice") == {"instagram_id": "11", "timestamp": 1011}
+
+
+def test_old_pinned_post_does_not_end_the_scan(scraper, store):
+    store.update("alice", "7", 1007)
+    serve(scraper, pages([node(2, pinned=True), node(9), node(8), node(7)]))
+    assert scrape(scraper) == ["9", "8"]
+    assert store.get("alice")["instagram_id"] == "9"
+
+
+def test_failed_page_leaves_the_high_water_mark(scraper, store):
+    store.update("alice", "7", 1007)
+    page_list = pages([node(11), node(10)], [node(9), node(8)], [node(7)])
+    page_list[1] = None
+    serve(scraper, page_list)
+
+    # Posts 9 and 8 were never seen, so moving the mark to 11 would skip them for good
+    assert scrape(scraper) == ["11", "10"]
+    assert store.get("alice")["instagram_id"] == "7"
+
+
+def test_truncated_page_leaves_the_high_water_mark(scraper, store):
+    store.update("alice", "7", 1007)
+    serve(scraper, pages([node(11), node(10), node(9)], [node(8), node(7)]))
+    assert scrape(scraper, max_posts=2) == ["11", "10"]
+    assert store.get("alice")["instagram_id"] == "7"
+
+
+def test_iter_pages_returns_complete(scraper):
+    page_list = pages([node(3)], [node(2)])
+    serve(scraper, page_list)
+    walk = scraper.iter_pages("alice", with_profile=False)
+    assert [posts[0].instagram_id for _, posts, _ in walk] == ["3", "2"]
+
+    page_list[1] = None
+    walk = scraper.iter_pages("alice", with_profile=False)
+    next(walk)
+    with pytest.raises(StopIteration) as stop:
+        next(walk)
+    assert stop.value.value is False
@@ -0,0 +1,73 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from services.job_lease import LeaseQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = LeaseQueue(str(tmp_path / "lease.db"), max_attempts=2)
+    yield q
+    q.close()
+
+
+def test_enqueue_is_idempotent_while_pending(queue):
+    assert queue.enqueue("profile", "alice") == queue.enqueue("profile", "alice")
+    assert queue.counts() == {"pending": 1}
+
+
+def test_leased_job_is_invisible_until_expiry(queue):
+    queue.enqueue("profile", "alice")
+    job = queue.lease("w1", visibility_timeout=60)
+    assert job.username == "alice" and job.attempts == 1
+    assert queue.lease("w2") is None
+
+    # Re-enqueueing a leased job must not hand it to a second worker
+    queue.enqueue("profile", "alice")
+    assert queue.lease("w2") is None
+
+
+def test_expired_lease_is_released_to_another_worker(queue):
+    queue.enqueue("profile", "alice")
+    job = queue.lease("w1", visibility_timeout=-1)
+    retry = queue.lease("w2")
+    assert retry.job_id == job.job_id and retry.attempts == 2
+    # The stale owner can no longer heartbeat or complete it
+    assert not queue.heartbeat(job.job_id, "w1")
+    assert not queue.complete(job.job_id, "w1")
+    assert queue.complete(job.job_id, "w2")
+
+
+def test_expired_lease_past_max_attempts_is_parked_failed(queue):
+    queue.enqueue("profile", "alice")
+    queue.lease("w1", visibility_timeout=-1)
+    queue.lease("w2", visibility_timeout=-1)
+    assert queue.lease("w3") is None
+    assert queue.counts() == {"failed": 1}
+
+
+def test_release_requeues_until_max_attempts(queue):
+    queue.enqueue("profile", "alice")
+    job = queue.lease("w1")
+    queue.release(job.job_id, "w1")
+    assert queue.counts() == {"pending": 1}
+    job = queue.lease("w1")
+    queue.release(job.job_id, "w1")
+    assert queue.counts() == {"failed": 1}
+
+
+@pytest.mark.parametrize("finish", ["complete", "fail"])
+def test_finished_job_can_be_enqueued_again(queue, finish):
+    queue.enqueue("profile", "alice")
+    for _ in range(queue.max_attempts):
+        job = queue.lease("w1")
+        if finish == "complete":
+            queue.complete(job.job_id, "w1")
+            break
+        queue.release(job.job_id, "w1")
+
+    queue.enqueue("profile", "alice")
+    assert queue.counts() == {"pending": 1}
+    job = queue.lease("w1")
+    assert job.username == "alice" and job.attempts == 1
@@ -0,0 +1,95 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import threading
+import pytest
+from services.instagram_api import InstagramScraper
+from services.metrics import Instrumentation
+from services.profile_fetcher import HedgedProfileFetcher
+from services.retry import FetchError
+
+PROFILE = {
+    "username": "alice",
+    "follower_count": 1,
+    "following_count": 2,
+    "posts_count": 3,
+    "is_verified": False,
+}
+
+
+class HtmlProfile(dict):
+    def to_dict(self):
+        return dict(self)
+
+
+class FakeApi:
+    """Stands in for instagram_api.InstagramScraper; blocks until cancelled unless told otherwise"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.cancelled = threading.Event()
+
+    def get_profile(self, username, raise_not_found=False, cancel=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        if cancel.wait(5):
+            self.cancelled.set()
+        return None
+
+
+class FakeHtml:
+    def __init__(self):
+        self.calls = 0
+
+    def get_profile(self, username, cancel=None, raise_not_found=False):
+        self.calls += 1
+        return HtmlProfile(PROFILE)
+
+
+@pytest.fixture
+def make_fetcher():
+    fetchers = []
+
+    def make(api, html):
+        fetcher = HedgedProfileFetcher(api, html, hedge_after=0.01, metrics=Instrumentation())
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_slow_primary_is_hedged_and_cancelled(make_fetcher):
+    api, html = FakeApi(), FakeHtml()
+    profile = make_fetcher(api, html).get_profile("alice")
+
+    assert profile.username == "alice"
+    assert html.calls == 1
+    # The losing API fetch is told to stop as soon as the HTML one wins
+    assert api.cancelled.wait(1)
+
+
+def test_not_found_ends_the_fetch_without_hedging(make_fetcher):
+    api, html = FakeApi(error=FetchError("Not found", 404)), FakeHtml()
+    assert make_fetcher(api, html).get_profile("alice") is None
+    assert api.calls == 1
+    assert html.calls == 0
+
+
+def test_failed_primary_falls_back_to_secondary(make_fetcher):
+    api, html = FakeApi(error=FetchError("Server error", 503)), FakeHtml()
+    assert make_fetcher(api, html).get_profile("alice").username == "alice"
+
+
+def test_cancelled_api_fetch_sends_nothing():
+    scraper = InstagramScraper()
+    sent = []
+    scraper._fetch_profile_user = lambda *args: sent.append(args)
+    cancel = threading.Event()
+    cancel.set()
+
+    assert scraper.get_profile("alice", cancel=cancel) is None
+    assert sent == []
@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from services.rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.fixture
+def limiter():
+    return AdaptiveRateLimiter(
+        initial_rate=1.0, min_rate=0.2, max_rate=1.2, increase_step=0.1, decrease_factor=0.5, success_streak=3,
+    )
+
+
+def test_throttle_halves_the_rate_down_to_min_rate(limiter):
+    limiter.on_throttle("p")
+    assert limiter.rates()["p"] == pytest.approx(0.5)
+    limiter.on_throttle("p")
+    limiter.on_throttle("p")
+    assert limiter.rates()["p"] == pytest.approx(0.2)
+
+
+def test_throttle_drains_the_bucket(limiter):
+    limiter.on_throttle("p")
+    # The burst token is gone, so the next request waits a full interval
+    assert limiter.reserve("p") == pytest.approx(2.0, rel=0.05)
+
+
+def test_success_streak_recovers_the_rate_up_to_max_rate(limiter):
+    limiter.on_throttle("p")
+    for _ in range(3):
+        limiter.on_success("p")
+    assert limiter.rates()["p"] == pytest.approx(0.6)
+
+    for _ in range(30):
+        limiter.on_success("p")
+    assert limiter.rates()["p"] == pytest.approx(1.2)
+
+
+def test_throttle_resets_the_success_streak(limiter):
+    limiter.on_success("p")
+    limiter.on_success("p")
+    limiter.on_throttle("p")
+    limiter.on_success("p")
+    assert limiter.rates()["p"] == pytest.approx(0.5)
+
+
+def test_keys_are_paced_independently(limiter):
+    limiter.on_throttle("a")
+    assert limiter.reserve("b") == 0.0
+    assert limiter.rates() == {"a": pytest.approx(0.5), "b": 1.0}
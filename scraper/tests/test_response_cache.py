@@ -0,0 +1,99 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import json
+import time
+import pytest
+from services.response_cache import ResponseCache
+
+URL = "https://www.instagram.com/graphql/query"
+
+
+def size(data):
+    return len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = ResponseCache(str(tmp_path / f"cache{len(caches)}.db"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_hit_is_keyed_on_params(make_cache):
+    cache = make_cache()
+    cache.set("graphql", URL, {"after": "a"}, {"page": 1})
+    assert cache.get("graphql", URL, {"after": "a"}) == {"page": 1}
+    assert cache.get("graphql", URL, {"after": "b"}) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_entry_is_a_miss_and_is_dropped(make_cache):
+    cache = make_cache(ttls={"graphql": 0})
+    cache.set("graphql", URL, None, {"page": 1})
+    cache.set("web_profile_info", URL, {"u": "alice"}, {"user": 1})
+
+    assert cache.get("graphql", URL) is None
+    # Other endpoints keep their own TTL
+    assert cache.get("web_profile_info", URL, {"u": "alice"}) == {"user": 1}
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == size({"user": 1})
+
+
+def test_size_is_counted_in_utf8_bytes(make_cache):
+    cache = make_cache()
+    data = {"caption": "café ☕"}
+    cache.set("graphql", URL, None, data)
+    assert cache.stats()["bytes"] == size(data) > len(json.dumps(data, ensure_ascii=False))
+
+    # Replacing an entry does not count it twice
+    cache.set("graphql", URL, None, data)
+    assert cache.stats()["bytes"] == size(data)
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(make_cache):
+    body = {"data": "x" * 100}
+    cache = make_cache(max_bytes=2 * size(body))
+    for key in ("a", "b"):
+        cache.set("graphql", URL, {"k": key}, body)
+        time.sleep(0.01)
+    cache.get("graphql", URL, {"k": "a"})
+    time.sleep(0.01)
+
+    cache.set("graphql", URL, {"k": "c"}, body)
+    assert cache.get("graphql", URL, {"k": "b"}) is None
+    assert cache.get("graphql", URL, {"k": "a"}) == body
+    assert cache.get("graphql", URL, {"k": "c"}) == body
+    assert cache.stats()["bytes"] == 2 * size(body)
+
+
+def test_expired_entries_go_before_live_ones(make_cache):
+    body = {"data": "x" * 100}
+    cache = make_cache(ttls={"graphql": 0}, max_bytes=2 * size(body))
+    cache.set("graphql", URL, {"k": "old"}, body)
+    time.sleep(0.01)
+    cache.set("web_profile_info", URL, {"k": "a"}, body)
+    cache.set("web_profile_info", URL, {"k": "b"}, body)
+
+    assert cache.get("web_profile_info", URL, {"k": "a"}) == body
+    assert cache.get("web_profile_info", URL, {"k": "b"}) == body
+
+
+def test_running_total_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path)
+    cache.set("graphql", URL, None, {"page": 1})
+    cache.close()
+
+    cache = ResponseCache(path)
+    assert cache.stats()["bytes"] == size({"page": 1})
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+    cache.close()
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import time
+import pytest
+from services.retry import FetchError, RetryBudget, RetryEngine
+
+
+def failing(status_code, calls, side_effect=None):
+    def fn():
+        calls.append(time.monotonic())
+        if side_effect:
+            side_effect()
+        raise FetchError("boom", status_code)
+    return fn
+
+
+def test_budget_deposits_a_fraction_of_each_first_attempt():
+    budget = RetryBudget(ratio=0.5, initial_tokens=0)
+    assert not budget.try_spend()
+    budget.record_attempt()
+    budget.record_attempt()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_budget_caps_stored_tokens():
+    budget = RetryBudget(ratio=1.0, initial_tokens=0, max_tokens=2)
+    for _ in range(5):
+        budget.record_attempt()
+    assert budget.tokens == 2
+
+
+def test_drained_budget_fails_fast():
+    engine = RetryEngine(max_attempts=5, base_delay=0, budget=RetryBudget(ratio=0, initial_tokens=1))
+
+    calls = []
+    with pytest.raises(FetchError):
+        engine.call(failing(503, calls))
+    # The only token paid for one retry
+    assert len(calls) == 2
+
+    calls.clear()
+    with pytest.raises(FetchError):
+        engine.call(failing(503, calls))
+    assert len(calls) == 1
+
+
+def test_not_found_is_not_retried():
+    engine = RetryEngine(max_attempts=5, base_delay=0)
+    calls = []
+    with pytest.raises(FetchError) as error:
+        engine.call(failing(404, calls))
+    assert error.value.status_code == 404
+    assert len(calls) == 1
+    assert engine.budget.tokens == pytest.approx(10.2)
+
+
+def test_passed_deadline_sends_nothing():
+    engine = RetryEngine(base_delay=0)
+    calls = []
+    with engine.deadline(0):
+        with pytest.raises(FetchError):
+            engine.call(failing(503, calls))
+    assert calls == []
+
+
+def test_deadline_stops_retries_once_the_wait_would_overrun_it():
+    engine = RetryEngine(max_attempts=10, base_delay=0)
+    calls = []
+    with engine.deadline(0.05):
+        with pytest.raises(FetchError):
+            engine.call(failing(503, calls, side_effect=lambda: time.sleep(0.06)))
+    assert len(calls) == 1
+
+
+def test_nested_deadline_keeps_the_earlier_one():
+    engine = RetryEngine()
+    assert engine.time_left() is None
+    with engine.deadline(1):
+        with engine.deadline(60):
+            assert engine.time_left() <= 1
+        assert engine.time_left() <= 1
+    assert engine.time_left() is None
+
+
+def test_cancel_stops_retrying():
+    engine = RetryEngine(max_attempts=5, base_delay=0)
+    cancel = threading.Event()
+    calls = []
+    with pytest.raises(FetchError):
+        engine.call(failing(503, calls, side_effect=cancel.set), cancel=cancel)
+    assert len(calls) == 1